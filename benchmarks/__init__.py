@@ -0,0 +1,30 @@
+"""
+Performance Benchmarks
+
+This package contains standalone benchmark scripts for the performance-critical
+parts of the chat application. Every script can be run from the project root,
+for example:
+
+    python -m benchmarks.bench_frame_decoder
+
+Main Components:
+- bench_frame_decoder.py: Stream framing throughput with coalesced TCP segments
+- bench_zero_copy.py: In-place decoding of large frames and vectored group fan-out
+- bench_codec.py: ASCII versus binary frame encoding and decoding
+- bench_dispatcher.py: Purpose handler table versus the former if/elif chain
+- bench_snowflake.py: Snowflake ID throughput and collision check
+- bench_fanout.py: Group message fan-out to local members and remote servers
+- bench_group_snapshot.py: Group membership reads under concurrent joins and leaves
+- bench_client_registry.py: Client activity updates and lookups, single lock versus striped registry
+- bench_heartbeat.py: Heartbeat PINGs and timeouts, full scans versus the timing wheel
+- bench_translation.py: PING latency behind translations, inline versus the worker pool
+- bench_translation_cache.py: Translation throughput and hit rate of the translation cache
+- bench_translation_batching.py: Backend calls and latency with single-flight and micro-batching
+- bench_group_translation.py: Backend calls of group messages, client-side versus pre-translated per language
+- bench_language_detection.py: Language detection calls per second, langdetect versus the memoized detector
+- bench_reminder_wheel.py: Insert rate, memory and firing jitter of 1M reminders, heap versus timing wheel
+- bench_reminder_journal.py: Sustained SET_REMINDER ingest with the reminder journal, and its replay on restart
+
+The benchmarks only use the shared modules and synthetic data, so they run
+without a GUI, without network access and without other servers.
+"""
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the client registry
+
+Receiver threads record activity for random clients, the way every received
+frame does, while other threads look up connections for routing and a
+heartbeat thread keeps sweeping over all clients. Compared are:
+
+1. locked: one dictionary of per-client dicts behind a single lock, the way
+   client_info was used before
+2. ClientRegistry with the HeartbeatWheel: lock-striped shards, lock-free
+   lookups, shard-by-shard iteration, activity recorded per connection
+   without a lock
+
+Reported are touches and lookups per second of all threads together, the
+number of completed heartbeat sweeps and the 99.9th percentile time of one
+touch.
+"""
+
+import os
+import random
+import sys
+import time
+from threading import Lock, Thread
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from server.client_registry import ClientEntry, ClientRegistry  # noqa: E402
+from server.heartbeat import HeartbeatWheel  # noqa: E402
+
+CLIENTS = 10_000
+RECEIVERS = [2, 8]
+ROUTERS = 2
+SECONDS = 2.0
+
+
+class LockedClients:
+    """client_info dictionary behind one lock."""
+
+    def __init__(self):
+        self.client_info = {}
+        self.client_info_lock = Lock()
+
+    def add(self, user_id):
+        with self.client_info_lock:
+            self.client_info[user_id] = {'socket': object(), 'last_active': time.time()}
+        return user_id
+
+    def touch(self, user_id):
+        with self.client_info_lock:
+            if user_id in self.client_info:
+                self.client_info[user_id]['last_active'] = time.time()
+
+    def connection(self, user_id):
+        with self.client_info_lock:
+            info = self.client_info.get(user_id)
+            return info['socket'] if info else None
+
+    def sweep(self):
+        with self.client_info_lock:
+            return [(user_id, info['socket'], info['last_active']) for user_id, info in self.client_info.items()]
+
+
+class StripedClients:
+    """ClientRegistry, activity goes to the heartbeat wheel of the connection."""
+
+    def __init__(self):
+        self.clients = ClientRegistry()
+        self.heartbeats = HeartbeatWheel(10, 30)
+
+    def add(self, user_id):
+        connection = object()
+        self.clients.add(ClientEntry(user_id, connection, 'Server_4', '127.0.0.1', 0))
+        self.heartbeats.add(connection, None, None)
+        return connection
+
+    def touch(self, connection):
+        self.heartbeats.touch(connection)
+
+    def connection(self, user_id):
+        return self.clients.connection(user_id)
+
+    def sweep(self):
+        return [(entry.user_id, entry.socket) for entry in self.clients]
+
+
+def run(store, receivers):
+    """Return (touches/s, lookups/s, sweeps, p99.9 touch ms)."""
+    user_ids = [f'user{n}' for n in range(CLIENTS)]
+    # What a receiver has at hand for each client: the userId or the connection
+    touch_keys = [store.add(user_id) for user_id in user_ids]
+    deadline = time.perf_counter() + SECONDS
+    latencies = []
+    lookups = []
+    sweeps = [0]
+
+    def receiver(seed):
+        rng = random.Random(seed)
+        perf_counter = time.perf_counter
+        touch = store.touch
+        mine = []
+        start = perf_counter()
+        while start < deadline:
+            touch(touch_keys[rng.randrange(CLIENTS)])
+            end = perf_counter()
+            mine.append(end - start)
+            start = end
+        latencies.append(mine)
+
+    def router(seed):
+        rng = random.Random(seed)
+        connection = store.connection
+        count = 0
+        while time.perf_counter() < deadline:
+            connection(user_ids[rng.randrange(CLIENTS)])
+            count += 1
+        lookups.append(count)
+
+    def heartbeat():
+        while time.perf_counter() < deadline:
+            store.sweep()
+            sweeps[0] += 1
+
+    threads = ([Thread(target=receiver, args=(n,)) for n in range(receivers)] +
+               [Thread(target=router, args=(1000 + n,)) for n in range(ROUTERS)] + [Thread(target=heartbeat)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    touches = sorted(latency for chunk in latencies for latency in chunk)
+    p999 = touches[int(len(touches) * 0.999)] * 1000
+    return len(touches) / SECONDS, sum(lookups) / SECONDS, sweeps[0], p999
+
+
+def main():
+    print(f"{'store':>8} {'receivers':>10} {'touches/s':>12} {'lookups/s':>12} {'sweeps':>7} {'p99.9 ms':>9}")
+    for receivers in RECEIVERS:
+        for name, store_cls in (('locked', LockedClients), ('striped', StripedClients)):
+            touches, lookups, sweeps, p999 = run(store_cls(), receivers)
+            print(f"{name:>8} {receivers:>10} {touches:>12,.0f} {lookups:>12,.0f} {sweeps:>7} {p999:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the ASCII and binary frame codecs
+
+Encodes and decodes the same stream of frames with both codecs for a few
+typical payload sizes: heartbeats, short chat messages and larger group
+messages. Besides frames per second, the bytes on the wire per frame show how
+much header overhead the binary format saves.
+"""
+
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.PackingandUnpacking import ASCII_CODEC, BINARY_CODEC, FrameDecoder  # noqa: E402
+
+FRAME_COUNT = 200_000
+FRAMES_PER_SEGMENT = 100
+CASES = [
+    ('PING', 0),
+    ('MESSAGE', 48),
+    ('MESSAGE', 512),
+    ('MESSAGE_ACK', 24),
+]
+
+
+def bench_encode(codec, purpose, payload):
+    """Return (frames, seconds, bytes per frame) for encoding FRAME_COUNT frames."""
+    pack = codec.pack
+    start = time.perf_counter()
+    for _ in range(FRAME_COUNT):
+        frame = pack(purpose, payload)
+    return FRAME_COUNT, time.perf_counter() - start, len(frame)
+
+
+def bench_decode(codec, purpose, payload):
+    """Return (frames, seconds) for decoding FRAME_COUNT frames in coalesced segments."""
+    segment = codec.pack(purpose, payload) * FRAMES_PER_SEGMENT
+    segments = [segment] * (FRAME_COUNT // FRAMES_PER_SEGMENT)
+    decoder = FrameDecoder()
+    decoded = 0
+    start = time.perf_counter()
+    for data in segments:
+        decoded += len(decoder.feed(data))
+    return decoded, time.perf_counter() - start
+
+
+def main():
+    print(f"{FRAME_COUNT} frames per case, {FRAMES_PER_SEGMENT} frames per decoded segment")
+    print(f"{'purpose':>12} {'payload':>8} {'codec':>7} {'bytes/frame':>12} {'encode frames/s':>16} {'decode frames/s':>16}")
+    for purpose, size in CASES:
+        payload = b'x' * size
+        for codec in (ASCII_CODEC, BINARY_CODEC):
+            encoded, encode_seconds, frame_size = bench_encode(codec, purpose, payload)
+            decoded, decode_seconds = bench_decode(codec, purpose, payload)
+            print(f"{purpose:>12} {size:>8} {codec.name:>7} {frame_size:>12} "
+                  f"{encoded / encode_seconds:>16,.0f} {decoded / decode_seconds:>16,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark for purpose dispatch
+
+Compares an if/elif chain over the client purposes, in the order the server
+used to test them, with the dict lookup of server.dispatcher.Dispatcher, with
+and without per-purpose timing. The handlers do nothing, so the numbers are
+the pure dispatch overhead per frame.
+"""
+
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from server.dispatcher import Dispatcher  # noqa: E402
+
+FRAME_COUNT = 1_000_000
+PURPOSES = [
+    'PING', 'PONG', 'MESSAGE', 'MESSAGE_ACK', 'MODIFY_GROUP', 'LEAVE_GROUP', 'INVITE_GROUP',
+    'QUERY_GROUP_MEMBERS', 'JOIN_GROUP', 'SEARCH_USERS', 'SEARCH_USERS_RESP', 'SET_REMINDER', 'TRANSLATE',
+]
+CASES = ['PING', 'MESSAGE', 'SET_REMINDER', 'TRANSLATE']
+
+
+def handler(conn, user_id, payload):
+    pass
+
+
+def chain(purpose, conn, user_id, payload):
+    """The shape of the former if/elif dispatch"""
+    if purpose == 'PING':
+        handler(conn, user_id, payload)
+    elif purpose == 'PONG':
+        handler(conn, user_id, payload)
+    elif purpose == 'MESSAGE':
+        handler(conn, user_id, payload)
+    elif purpose == 'MESSAGE_ACK':
+        handler(conn, user_id, payload)
+    elif purpose == 'MODIFY_GROUP':
+        handler(conn, user_id, payload)
+    elif purpose == 'LEAVE_GROUP':
+        handler(conn, user_id, payload)
+    elif purpose == 'INVITE_GROUP':
+        handler(conn, user_id, payload)
+    elif purpose == 'QUERY_GROUP_MEMBERS':
+        handler(conn, user_id, payload)
+    elif purpose == 'JOIN_GROUP':
+        handler(conn, user_id, payload)
+    elif purpose == 'SEARCH_USERS':
+        handler(conn, user_id, payload)
+    elif purpose == 'SEARCH_USERS_RESP':
+        handler(conn, user_id, payload)
+    elif purpose == 'SET_REMINDER':
+        handler(conn, user_id, payload)
+    elif purpose == 'TRANSLATE':
+        handler(conn, user_id, payload)
+
+
+def bench(dispatch, purpose):
+    """Return frames per second for dispatching FRAME_COUNT frames of one purpose."""
+    start = time.perf_counter()
+    for _ in range(FRAME_COUNT):
+        dispatch(purpose, None, 'user', b'')
+    return FRAME_COUNT / (time.perf_counter() - start)
+
+
+def main():
+    timed = Dispatcher('timed')
+    counted = Dispatcher('counted', timing=False)
+    for purpose in PURPOSES:
+        timed.register(purpose, handler)
+        counted.register(purpose, handler)
+
+    print(f"{FRAME_COUNT} frames per case")
+    print(f"{'purpose':>14} {'if/elif frames/s':>18} {'counted frames/s':>18} {'timed frames/s':>18}")
+    for purpose in CASES:
+        print(f"{purpose:>14} {bench(chain, purpose):>18,.0f} {bench(counted.dispatch, purpose):>18,.0f} "
+              f"{bench(timed.dispatch, purpose):>18,.0f}")
+    stats = timed.stats()['MESSAGE']
+    print(f"MESSAGE handler: {stats['count']} calls, avg {stats['avg_ms'] * 1000:.3f} us, max {stats['max_ms'] * 1000:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the group message fan-out stage
+
+A group message is delivered to groups of 10, 1,000 and 10,000 members. A
+part of the members lives on other servers, spread over a few links. Two
+ways of sending are compared on the server's bounded connection queues,
+without a writer draining them:
+
+1. per member: every member gets its own Packing() frame, remote members
+   get their own ChatMessage serialized and queued on the link one by one
+2. GroupFanout: members are partitioned once, local members share one
+   frame and every remote server gets one queue entry for all its members
+
+The members per second include partitioning and, for the per-member case,
+the lookups in the same dictionaries.
+"""
+
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.PackingandUnpacking import Packing  # noqa: E402
+from proto import Message_pb2  # noqa: E402
+from server.connection import QueuedConnection  # noqa: E402
+from server.fanout import GroupFanout  # noqa: E402
+
+GROUP_SIZES = [10, 1_000, 10_000]
+REMOTE_SHARE = 0.2  # Share of members on other servers
+REMOTE_SERVERS = 4
+MIN_SECONDS = 0.5
+
+
+class QueueOnlyConnection(QueuedConnection):
+    """Connection queue without a writer, the benchmark empties it between rounds."""
+
+    def __init__(self):
+        super().__init__(max_queue=1 << 30)
+
+    def _wake_writer(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+def build_group(size):
+    """Return (members, local connections, routes) of a synthetic group."""
+    members = [f'user{i:05d}' for i in range(size)]
+    remote_count = int(size * REMOTE_SHARE)
+    links = {f'Server_{n}': QueueOnlyConnection() for n in range(REMOTE_SERVERS)}
+    server_ids = list(links)
+    routes = {}
+    local = {}
+    for i, member in enumerate(members):
+        if i < remote_count:
+            server_id = server_ids[i % REMOTE_SERVERS]
+            routes[member] = (server_id, links[server_id])
+        else:
+            local[member] = QueueOnlyConnection()
+    return members, local, routes
+
+
+def build_message():
+    msg = Message_pb2.ChatMessage()
+    msg.messageSnowflake = 1
+    msg.author.userId = 'author'
+    msg.author.serverId = 'Server_4'
+    msg.group.groupId = 'bench'
+    msg.textContent = 'x' * 200
+    return msg
+
+
+def per_member(members, local, routes, msg):
+    """Deliver msg the way the server did before: one frame per member."""
+    payload = msg.SerializeToString()
+    for member in members:
+        connection = local.get(member)
+        if connection is not None:
+            connection.send(Packing('MESSAGE', payload))
+            continue
+        route = routes.get(member)
+        if route is not None:
+            server_id, link = route
+            forward = Message_pb2.ChatMessage()
+            forward.CopyFrom(msg)
+            forward.userOfGroup.user.userId = member
+            forward.userOfGroup.user.serverId = server_id
+            forward.userOfGroup.group.CopyFrom(msg.group)
+            link.send(Packing('MESSAGE', forward.SerializeToString()))
+
+
+def staged(fanout, members, msg):
+    """Deliver msg through the fan-out stage."""
+    payload = msg.SerializeToString()
+    plan = fanout.partition(members)
+    fanout.send(plan, payload, msg.group)
+
+
+def link_entries(routes):
+    """Return the number of queue entries on the links and clear them."""
+    links = {id(link): link for server_id, link in routes.values()}
+    entries = sum(len(link._queue) for link in links.values())
+    for link in links.values():
+        link._queue.clear()
+    return entries
+
+
+def clear(local, routes):
+    for connection in local.values():
+        connection._queue.clear()
+    link_entries(routes)
+
+
+def rate(func, members, local, routes):
+    """Return members per second of calling func() repeatedly for MIN_SECONDS."""
+    rounds = 0
+    seconds = 0.0
+    while seconds < MIN_SECONDS:
+        start = time.perf_counter()
+        func()
+        seconds += time.perf_counter() - start
+        rounds += 1
+        clear(local, routes)
+    return rounds * len(members) / seconds
+
+
+def main():
+    msg = build_message()
+    print(f"{'members':>8} {'per member/s':>14} {'fanout/s':>14} {'speedup':>8} {'link entries':>20}")
+    for size in GROUP_SIZES:
+        members, local, routes = build_group(size)
+        fanout = GroupFanout(lambda user_ids: {u: local[u] for u in user_ids if u in local}, routes.get)
+
+        # Queue entries on the links for one message
+        per_member(members, local, routes, msg)
+        before = link_entries(routes)
+        staged(fanout, members, msg)
+        after = link_entries(routes)
+        clear(local, routes)
+
+        old = rate(lambda: per_member(members, local, routes, msg), members, local, routes)
+        new = rate(lambda: staged(fanout, members, msg), members, local, routes)
+        print(f"{size:>8,} {old:>14,.0f} {new:>14,.0f} {new / old:>7.1f}x {f'{before} -> {after}':>20}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark for FrameDecoder
+
+Feeds the same stream of small frames to a FrameDecoder while packing more and
+more frames into every simulated TCP segment. A stream decoder should keep its
+frames per second steady no matter how the frames are segmented. The legacy
+one-shot Unpacking() is shown for comparison: it returns one frame per read, so
+coalesced frames are lost.
+"""
+
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.PackingandUnpacking import FrameDecoder, Packing, Unpacking  # noqa: E402
+
+FRAME_COUNT = 200_000
+PAYLOAD = b'x' * 48
+FRAMES_PER_SEGMENT = [1, 10, 100, 1000]
+
+
+def build_segments(frames_per_segment):
+    """Split a stream of FRAME_COUNT frames into segments of the given size."""
+    frame = Packing('MESSAGE', PAYLOAD)
+    segment = frame * frames_per_segment
+    return [segment] * (FRAME_COUNT // frames_per_segment)
+
+
+def bench_decoder(segments):
+    """Return (decoded frames, seconds) for FrameDecoder."""
+    decoder = FrameDecoder()
+    decoded = 0
+    start = time.perf_counter()
+    for segment in segments:
+        decoded += len(decoder.feed(segment))
+    return decoded, time.perf_counter() - start
+
+
+def bench_unpacking(segments):
+    """Return (decoded frames, seconds) for the legacy Unpacking()."""
+    decoded = 0
+    start = time.perf_counter()
+    for segment in segments:
+        purpose, length, payload = Unpacking(segment)
+        if purpose:
+            decoded += 1
+    return decoded, time.perf_counter() - start
+
+
+def main():
+    print(f"{FRAME_COUNT} frames, {len(PAYLOAD)} byte payload")
+    print(f"{'frames/segment':>15} {'decoder frames/s':>18} {'decoded':>9} {'Unpacking decoded':>18}")
+    for frames_per_segment in FRAMES_PER_SEGMENT:
+        segments = build_segments(frames_per_segment)
+        decoded, seconds = bench_decoder(segments)
+        legacy_decoded, _ = bench_unpacking(segments)
+        print(f"{frames_per_segment:>15} {decoded / seconds:>18,.0f} {decoded:>9} {legacy_decoded:>18}")
+
+
+if __name__ == '__main__':
+    main()
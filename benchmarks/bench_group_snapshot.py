@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark for group membership reads
+
+Many sender threads deliver group messages, which means reading the member
+list of a random group and iterating over it, while one thread keeps members
+joining and leaving. Two ways of storing the groups are compared:
+
+1. locked: dictionary of mutable member sets behind one lock, the way the
+   server stored them before, readers iterate while holding the lock
+2. GroupTable: immutable snapshots swapped on write, readers take no lock
+
+Reported are the reads per second of all senders together, the writes per
+second and the 99th and 99.9th percentile time of one read.
+"""
+
+import os
+import random
+import sys
+import time
+from threading import Lock, Thread
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from server.group_table import GroupTable  # noqa: E402
+
+GROUPS = 100
+MEMBERS = 200
+SENDERS = [1, 4, 16]
+SECONDS = 2.0
+
+
+class LockedGroups:
+    """Groups as mutable sets behind one lock."""
+
+    def __init__(self):
+        self.group_info = {}
+        self.group_info_lock = Lock()
+
+    def create(self, group_id, members):
+        with self.group_info_lock:
+            self.group_info[group_id] = {'members': set(members)}
+
+    def read(self, group_id):
+        count = 0
+        with self.group_info_lock:
+            for member in self.group_info[group_id]['members']:
+                count += 1
+        return count
+
+    def join(self, group_id, user_id):
+        with self.group_info_lock:
+            self.group_info[group_id]['members'].add(user_id)
+
+    def leave(self, group_id, user_id):
+        with self.group_info_lock:
+            self.group_info[group_id]['members'].discard(user_id)
+
+
+class SnapshotGroups:
+    """Groups as copy-on-write snapshots."""
+
+    def __init__(self):
+        self.groups = GroupTable()
+
+    def create(self, group_id, members):
+        self.groups.modify(group_id, group_id, ())
+        for member in members:
+            self.groups.add_member(group_id, member)
+
+    def read(self, group_id):
+        count = 0
+        for member in self.groups.members(group_id):
+            count += 1
+        return count
+
+    def join(self, group_id, user_id):
+        self.groups.add_member(group_id, user_id)
+
+    def leave(self, group_id, user_id):
+        self.groups.remove_member(group_id, user_id)
+
+
+def run(store, senders):
+    """Return (reads/s, writes/s, p99 read ms, p99.9 read ms) of senders threads reading while one thread writes."""
+    group_ids = [f'group{g}' for g in range(GROUPS)]
+    for group_id in group_ids:
+        store.create(group_id, [f'user{m}' for m in range(MEMBERS)])
+    latencies = []
+    writes = [0]
+    # Every thread stops on its own at the deadline, the main thread may not get to run in time
+    deadline = time.perf_counter() + SECONDS
+
+    def sender(seed):
+        rng = random.Random(seed)
+        perf_counter = time.perf_counter
+        read = store.read
+        mine = []
+        start = perf_counter()
+        while start < deadline:
+            group_id = group_ids[rng.randrange(GROUPS)]
+            read(group_id)
+            end = perf_counter()
+            mine.append(end - start)
+            start = end
+        latencies.append(mine)
+
+    def writer():
+        rng = random.Random(0)
+        while time.perf_counter() < deadline:
+            group_id = group_ids[rng.randrange(GROUPS)]
+            user_id = f'joiner{rng.randrange(1000)}'
+            store.join(group_id, user_id)
+            store.leave(group_id, user_id)
+            writes[0] += 2
+
+    threads = [Thread(target=sender, args=(n,)) for n in range(senders)] + [Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reads = sorted(latency for chunk in latencies for latency in chunk)
+    p99 = reads[int(len(reads) * 0.99)] * 1000
+    p999 = reads[int(len(reads) * 0.999)] * 1000
+    return len(reads) / SECONDS, writes[0] / SECONDS, p99, p999
+
+
+def main():
+    print(f"{'store':>10} {'senders':>8} {'reads/s':>12} {'writes/s':>10} {'p99 ms':>8} {'p99.9 ms':>9}")
+    for senders in SENDERS:
+        for name, store_cls in (('locked', LockedGroups), ('snapshot', SnapshotGroups)):
+            reads, writes, p99, p999 = run(store_cls(), senders)
+            print(f"{name:>10} {senders:>8} {reads:>12,.0f} {writes:>10,.0f} {p99:>8.3f} {p999:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
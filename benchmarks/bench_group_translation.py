@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark for pre-translated group messages
+
+A group of 500 members reads German, English, Chinese and Turkish. Every
+message is a new text, written in one of the languages. Compared are:
+
+1. client side: the server forwards the author's single translation, every
+   member that reads another language translates the text on its own
+2. pre-translated: the server translates the text once per language the
+   members read, in parallel on the TranslationService, and every member gets
+   its variant through GroupFanout
+
+The backend is the offline DictionaryBackend with a fixed latency per call.
+Reported are the backend calls per message and the time until every member
+of the group has the message in its language.
+"""
+
+import os
+import random
+import sys
+import time
+from threading import Event
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.translation_backends import DictionaryBackend  # noqa: E402
+from modules.translation_cache import TranslationCache  # noqa: E402
+from proto import Message_pb2  # noqa: E402
+from server.connection import QueuedConnection  # noqa: E402
+from server.fanout import GroupFanout  # noqa: E402
+from server.translation_service import TranslationService, gather, language_name  # noqa: E402
+
+MEMBERS = 500
+MESSAGES = 20
+LANGUAGES = [Message_pb2.DE, Message_pb2.EN, Message_pb2.ZH, Message_pb2.TR]
+BACKEND_LATENCY = 0.02
+
+
+class QueueOnlyConnection(QueuedConnection):
+    """Connection queue without a writer."""
+
+    def __init__(self):
+        super().__init__(max_queue=1 << 30)
+
+    def _wake_writer(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+def build_group(rng):
+    """Return ({userId: language}, {userId: connection})."""
+    languages = {f'user{n:03d}': rng.choice(LANGUAGES) for n in range(MEMBERS)}
+    return languages, {member: QueueOnlyConnection() for member in languages}
+
+
+def build_message(n, language):
+    msg = Message_pb2.ChatMessage()
+    msg.messageSnowflake = n
+    msg.author.userId = 'author'
+    msg.group.groupId = 'bench'
+    msg.translation.original_text = f'good morning, see you at the meeting number {n}'
+    msg.translation.target_language = language
+    return msg
+
+
+def run_client_side(languages, messages):
+    """Return (backend calls per message, seconds per message)."""
+    backend = DictionaryBackend(BACKEND_LATENCY)
+    calls = 0
+    start = time.perf_counter()
+    for msg in messages:
+        # The server translates into the author's target language only
+        target = msg.translation.target_language
+        backend.translate(msg.translation.original_text, 'en')
+        calls += 1
+        # Then every member reading another language translates on its own, all of them at the same time
+        readers = sum(1 for language in languages.values() if language != target)
+        calls += readers
+        time.sleep(BACKEND_LATENCY)
+    elapsed = time.perf_counter() - start
+    return calls / len(messages), elapsed / len(messages)
+
+
+def run_pre_translated(languages, connections, messages):
+    """Return (backend calls per message, seconds per message)."""
+    backend = DictionaryBackend(BACKEND_LATENCY)
+    service = TranslationService(backend, cache=TranslationCache(), batch_delay=0)
+    service.start()
+    fanout = GroupFanout(lambda members: {member: connections[member] for member in members}, lambda member: None)
+    group = Message_pb2.Group(groupId='bench')
+    start = time.perf_counter()
+    for msg in messages:
+        plan = fanout.partition(languages)
+        plans = plan.split(lambda member: languages[member])
+        futures = {language: service.submit(msg.translation.original_text, language_name(language))
+                   for language in plans}
+        sent = Event()
+
+        def send(done):
+            for language, future in futures.items():
+                variant = Message_pb2.ChatMessage()
+                variant.CopyFrom(msg)
+                variant.translation.target_language = language
+                variant.translation.translated_text = future.result()
+                fanout.send(plans[language], variant.SerializeToString(), group)
+            sent.set()
+
+        gather(list(futures.values())).add_done_callback(send)
+        sent.wait()
+    elapsed = time.perf_counter() - start
+    service.stop()
+    return backend.calls / len(messages), elapsed / len(messages)
+
+
+def main():
+    rng = random.Random(0)
+    languages, connections = build_group(rng)
+    messages = [build_message(n, rng.choice(LANGUAGES)) for n in range(MESSAGES)]
+    print(f"{'mode':>15} {'backend calls/msg':>18} {'ms/msg':>8}")
+    calls, seconds = run_client_side(languages, messages)
+    print(f"{'client side':>15} {calls:>18,.0f} {seconds * 1000:>8.1f}")
+    calls, seconds = run_pre_translated(languages, connections, messages)
+    print(f"{'pre-translated':>15} {calls:>18,.0f} {seconds * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
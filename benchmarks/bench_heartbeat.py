@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark for heartbeat scheduling
+
+Simulates one minute of a server with 10,000 and 100,000 connections on a
+virtual clock. Most connections send a frame every few seconds, a small share
+is idle and gets no answer to PINGs. Compared are:
+
+1. scan: the former monitor, every heartbeat_interval it walks all
+   connections, pings each of them and expires the ones idle for longer than
+   heartbeat_timeout
+2. HeartbeatWheel: deadlines per connection, polled every tick
+
+A PING costs the same in both: it is queued with send_frame() on a
+connection queue that has no writer, the PONG and the socket writes are not
+counted. Reported are the PINGs sent,
+the largest number of PINGs sent in one wake-up, the connections expired and
+the CPU time spent in the scheduler including the PINGs.
+"""
+
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from server.connection import QueuedConnection  # noqa: E402
+from server.heartbeat import TICK, HeartbeatWheel  # noqa: E402
+
+CONNECTIONS = [10_000, 100_000]
+IDLE_SHARE = 0.05  # Connections that never send anything
+ACTIVE_PERIOD = 5.0  # Seconds between frames of an active connection, on average
+INTERVAL = 10.0
+TIMEOUT = 30.0
+DURATION = 60.0
+
+
+class PingQueue(QueuedConnection):
+    """Connection queue without a writer that all PINGs go to."""
+
+    def __init__(self):
+        super().__init__(max_queue=1 << 30)
+
+    def _wake_writer(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def send_ping(self, connection=None):
+        self.send_frame('PING', b'')
+
+
+class Clock:
+    """Virtual time, moved forward by the simulation."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def activity(count, rng):
+    """Return {tick: [connection indexes that send a frame in that tick]}."""
+    frames = {}
+    ticks = int(DURATION / TICK)
+    for index in range(int(count * IDLE_SHARE), count):
+        at = rng.uniform(0, ACTIVE_PERIOD)
+        while at < DURATION:
+            frames.setdefault(int(at / TICK), []).append(index)
+            at += rng.uniform(0.5, 1.5) * ACTIVE_PERIOD
+    return frames, ticks
+
+
+def run_scan(count, frames, ticks):
+    """Return (pings, largest burst, expired, cpu seconds) of the full-scan monitor."""
+    clock = Clock()
+    last_active = {index: clock.now for index in range(count)}
+    send_ping = PingQueue().send_ping
+    pings = burst = expired = 0
+    next_scan = clock.now + INTERVAL
+    cpu = 0.0
+    for tick in range(ticks):
+        clock.now += TICK
+        for index in frames.get(tick, ()):
+            if index in last_active:
+                last_active[index] = clock.now
+        if clock.now < next_scan:
+            continue
+        next_scan += INTERVAL
+        start = time.process_time()
+        now = clock.now
+        sent = 0
+        for index, active in list(last_active.items()):
+            if now - active > TIMEOUT:
+                del last_active[index]
+                expired += 1
+                continue
+            send_ping(index)
+            sent += 1
+        cpu += time.process_time() - start
+        pings += sent
+        burst = max(burst, sent)
+    return pings, burst, expired, cpu
+
+
+def run_wheel(count, frames, ticks):
+    """Return (pings, largest burst, expired, cpu seconds) of the timing wheel."""
+    clock = Clock()
+    wheel = HeartbeatWheel(INTERVAL, TIMEOUT, clock=clock)
+    sent = [0]
+    send_ping = PingQueue().send_ping
+
+    def ping(connection):
+        send_ping(connection)
+        sent[0] += 1
+
+    def expire(connection):
+        pass
+
+    connections = list(range(count))
+    for connection in connections:
+        wheel.add(connection, ping, expire)
+    burst = 0
+    cpu = 0.0
+    for tick in range(ticks):
+        clock.now += TICK
+        for index in frames.get(tick, ()):
+            wheel.touch(connections[index])
+        before = sent[0]
+        start = time.process_time()
+        wheel.poll()
+        cpu += time.process_time() - start
+        burst = max(burst, sent[0] - before)
+    return wheel.pings, burst, wheel.expired, cpu
+
+
+def main():
+    print(f"{'connections':>11} {'scheduler':>9} {'pings':>9} {'max burst':>10} {'expired':>8} {'cpu ms':>8}")
+    for count in CONNECTIONS:
+        frames, ticks = activity(count, random.Random(count))
+        for name, run in (('scan', run_scan), ('wheel', run_wheel)):
+            pings, burst, expired, cpu = run(count, frames, ticks)
+            print(f"{count:>11,} {name:>9} {pings:>9,} {burst:>10,} {expired:>8,} {cpu * 1000:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
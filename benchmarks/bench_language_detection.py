@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for language detection
+
+Replays chat lines in German, English, Turkish and Chinese, short ones much
+more often than long ones, and many of them repeated. Compared are:
+
+1. langdetect: langdetect.detect() for every line, the way the Google
+   backend called it before
+2. LanguageDetector cold: script fast path and langdetect with a fixed seed,
+   every line seen for the first time
+3. LanguageDetector warm: the same lines again, answered by the fast path and
+   the memo
+
+Reported are detect calls per second, the share of lines whose language
+changed when they were detected a second time, and how the calls were
+answered. The detectors are compared with a fresh detector, so their memo
+does not hide changing results.
+"""
+
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.language_detection import LanguageDetector  # noqa: E402
+
+LINES = 2_000
+DISTINCT = 400
+
+SENTENCES = {
+    'de': ['ok', 'danke', 'bis morgen', 'wie geht es dir', 'ich komme später zum treffen',
+           'hast du die nachricht von gestern gelesen'],
+    'en': ['ok', 'thanks', 'see you', 'how are you', 'i will be late for the meeting',
+           'did you read the message from yesterday'],
+    'tr': ['tamam', 'teşekkürler', 'yarın görüşürüz', 'nasılsın', 'toplantıya geç kalacağım',
+           'dünkü mesajı okudun mu'],
+    'zh': ['好的', '谢谢', '明天见', '你好吗', '我开会要迟到了', '你看了昨天的消息吗'],
+}
+
+
+def chat_lines(rng):
+    """Return LINES chat lines drawn from DISTINCT variants, short lines are the most common."""
+    variants = []
+    for n in range(DISTINCT):
+        language = rng.choice(list(SENTENCES))
+        sentences = SENTENCES[language]
+        sentence = sentences[min(int(rng.expovariate(1.0)), len(sentences) - 1)]
+        variants.append(sentence if n < 40 else f'{sentence} {rng.choice(sentences)}')
+    return [rng.choice(variants) for _ in range(LINES)]
+
+
+def run_langdetect(lines):
+    """Return (calls/s, changed share)."""
+    from langdetect import detect
+    detect('warm up')  # Profiles are loaded outside of the measurement
+    start = time.perf_counter()
+    first = [detect(line) for line in lines]
+    elapsed = time.perf_counter() - start
+    second = [detect(line) for line in lines]
+    changed = sum(a != b for a, b in zip(first, second)) / len(lines)
+    return len(lines) / elapsed, changed
+
+
+def run_detector(detector, lines):
+    """Return (calls/s, changed share), the lines are detected again by a fresh detector without memo."""
+    start = time.perf_counter()
+    results = [detector.detect(line) for line in lines]
+    elapsed = time.perf_counter() - start
+    fresh = LanguageDetector()
+    again = [fresh.detect(line) for line in lines]
+    changed = sum(a != b for a, b in zip(results, again)) / len(lines)
+    return len(lines) / elapsed, changed
+
+
+def main():
+    lines = chat_lines(random.Random(0))
+    print(f"{'detector':>22} {'calls/s':>10} {'changed':>8}")
+    rate, changed = run_langdetect(lines)
+    print(f"{'langdetect':>22} {rate:>10,.0f} {changed:>8.1%}")
+
+    detector = LanguageDetector()
+    detector.preload()
+    unique = list(dict.fromkeys(lines))
+    rate, changed = run_detector(detector, unique)
+    print(f"{'LanguageDetector cold':>22} {rate:>10,.0f} {changed:>8.1%}")
+    rate, changed = run_detector(detector, lines)
+    print(f"{'LanguageDetector warm':>22} {rate:>10,.0f} {changed:>8.1%}")
+    print(detector.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the reminder journal
+
+Sustained SET_REMINDER ingest: 8 connection threads parse SetReminder
+payloads and add the reminders to a ReminderManagerWheel, as
+on_client_set_reminder() does, with countdowns between one minute and 30
+days. Compared are:
+
+1. no journal: reminders only live in memory
+2. fsync per record: every reminder is written and fsynced before
+   add_reminder() returns, the naive write-ahead log (fewer requests, it is
+   slow)
+3. ReminderJournal: records are buffered and written with one fsync per
+   sync_interval, the log is compacted into a snapshot every 100,000 records
+
+Reported are reminders per second, the p99 time of one add, the fsyncs, the
+records per fsync, the compactions and the size of the journal files. Then
+the server restarts: the journal of the last run is replayed into a new
+manager, and the time and the re-armed reminders are reported.
+
+The journal files go to a temporary directory next to the project, so the
+fsyncs hit the same disk as a server's would, not a RAM disk.
+"""
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+from threading import Thread, Lock
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from proto import Message_pb2  # noqa: E402
+from modules.reminder import ReminderManagerWheel  # noqa: E402
+from modules.reminder_journal import ReminderJournal  # noqa: E402
+
+REQUESTS = 200_000
+SYNC_EACH_REQUESTS = 5_000
+THREADS = 8
+SYNC_INTERVALS = [0.005, 0.05]
+
+
+class SyncEachRecord(ReminderJournal):
+    """Writes and fsyncs every record before returning, the naive write-ahead log."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._write_lock = Lock()
+
+    def _append(self, record):
+        with self._write_lock:
+            self.records += 1
+            self._write([record])
+
+
+def payloads(rng, count):
+    """Return serialized SetReminder payloads of count requests."""
+    result = []
+    for index in range(count):
+        request = Message_pb2.SetReminder()
+        request.user.userId = f'user{index % 5000}'
+        request.user.serverId = 'Server_4'
+        request.event = f'Reminder number {index}'
+        request.countdownSeconds = rng.randrange(60, 30 * 24 * 3600)
+        result.append(request.SerializeToString())
+    return result
+
+
+def ingest(manager, requests):
+    """Feed the requests from THREADS threads, returns (seconds, add latencies)."""
+    latencies = [[] for _ in range(THREADS)]
+
+    def connection(index):
+        add = manager.add_reminder
+        times = latencies[index]
+        for payload in requests[index::THREADS]:
+            start = time.perf_counter()
+            request = Message_pb2.SetReminder()
+            request.ParseFromString(payload)
+            add(request.user.userId, request.event, request.countdownSeconds)
+            times.append(time.perf_counter() - start)
+
+    threads = [Thread(target=connection, args=(index,)) for index in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, [latency for times in latencies for latency in times]
+
+
+def journal_bytes(path):
+    return sum(os.path.getsize(f'{path}{suffix}') for suffix in ('.log', '.log.sealed', '.snapshot')
+               if os.path.exists(f'{path}{suffix}'))
+
+
+def run(name, requests, journal):
+    """Return the result row of one configuration."""
+    manager = ReminderManagerWheel(None, journal=journal)
+    manager.start()
+    seconds, latencies = ingest(manager, requests)
+    manager.stop()
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    if journal is None:
+        return name, len(requests) / seconds, p99, 0, 0.0, 0, 0
+    stats = journal.stats()
+    return (name, len(requests) / seconds, p99, stats['syncs'], stats['records_per_sync'],
+            stats['compactions'], journal_bytes(journal.path))
+
+
+def main():
+    rng = random.Random(0)
+    requests = payloads(rng, REQUESTS)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(current_dir)) as directory:
+        rows = []
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            rows.append(run('no journal', requests, None))
+            rows.append(run('fsync per record', requests[:SYNC_EACH_REQUESTS],
+                            SyncEachRecord(os.path.join(directory, 'each'))))
+            for interval in SYNC_INTERVALS:
+                path = os.path.join(directory, f'batched{interval}')
+                rows.append(run(f'journal {interval * 1000:.0f} ms', requests, ReminderJournal(path, interval)))
+        print(f"{REQUESTS:,} SET_REMINDERs from {THREADS} threads "
+              f"({SYNC_EACH_REQUESTS:,} with fsync per record)\n")
+        print(f"{'journal':>17} {'reminders/s':>12} {'p99 us':>9} {'fsyncs':>7} {'records/fsync':>14} "
+              f"{'compactions':>12} {'MB':>6}")
+        for name, rate, p99, syncs, per_sync, compactions, size in rows:
+            print(f"{name:>17} {rate:>12,.0f} {p99:>9.1f} {syncs:>7,} {per_sync:>14,.1f} "
+                  f"{compactions:>12} {size / 1e6:>6.1f}")
+
+        # Restart on the journal of the last run
+        path = os.path.join(directory, f'batched{SYNC_INTERVALS[-1]}')
+        journal = ReminderJournal(path)
+        manager = ReminderManagerWheel(None, journal=journal)
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            manager.start()
+            seconds = time.perf_counter() - start
+            manager.stop()
+        print(f"\nRestart: replayed {journal.replayed:,} reminders in {seconds:.2f} s "
+              f"({journal.replayed / seconds:,.0f}/s), {journal.expired} expired, "
+              f"snapshot {os.path.getsize(journal.snapshot_path) / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
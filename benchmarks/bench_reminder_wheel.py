@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the reminder managers
+
+Adds 1,000,000 reminders with countdowns between one second and 30 days to
+ReminderManagerHeap and to ReminderManagerWheel. Measured are:
+
+1. insert: add_reminder() calls per second, as the connection threads make
+   them, and cancel() calls per second for the wheel (the heap cannot cancel)
+2. memory: bytes allocated for the pending reminders, traced with tracemalloc
+   in a separate pass because tracing slows the inserts down
+3. jitter: with the 1,000,000 reminders pending, 20,000 more come due within
+   the next few seconds and the manager's own worker thread fires them.
+   Reported is how late they fired (p50, p99, max), the wake-ups and the CPU
+   time the process spent meanwhile
+
+The dispatch stage of the managers is replaced by a recorder, so no server
+and no sockets are involved.
+The managers' log lines go to /dev/null.
+"""
+
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.reminder import ReminderManagerHeap, ReminderManagerWheel  # noqa: E402
+
+REMINDERS = 1_000_000
+MAX_COUNTDOWN = 30 * 24 * 3600  # Seconds
+DUE = 20_000  # Reminders firing during the jitter run
+DUE_START = 1.0  # Seconds until the first of them is due
+DUE_WINDOW = 4.0  # Seconds over which they are spread
+MANAGERS = [('heap', ReminderManagerHeap), ('wheel', ReminderManagerWheel)]
+
+
+class Recorder:
+    """Stands in for ReminderDispatcher.dispatch(), records how late every reminder fired."""
+
+    def __init__(self):
+        self.triggers = {}  # user_id -> trigger time
+        self.late = []
+        self.lock = threading.Lock()
+
+    def __call__(self, due):
+        now = time.time()
+        with self.lock:
+            for user_id, event in due:
+                trigger = self.triggers.get(user_id)
+                if trigger is not None:
+                    self.late.append(now - trigger)
+
+
+def countdowns(rng, count):
+    return [rng.uniform(1, MAX_COUNTDOWN) for _ in range(count)]
+
+
+def fill(manager, values):
+    """Add a reminder per countdown, returns (seconds, handles)."""
+    add = manager.add_reminder
+    start = time.perf_counter()
+    handles = [add(f'user{index % 1000}', 'event', countdown) for index, countdown in enumerate(values)]
+    return time.perf_counter() - start, handles
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def run_insert(name, factory, values):
+    """Return (adds/s, cancels/s or None)."""
+    manager = factory(None)
+    seconds, handles = fill(manager, values)
+    cancels = None
+    if hasattr(manager, 'cancel'):
+        start = time.perf_counter()
+        for handle in handles[::10]:
+            manager.cancel(handle)
+        cancels = len(handles[::10]) / (time.perf_counter() - start)
+    return len(values) / seconds, cancels
+
+
+def run_memory(name, factory, values):
+    """Return bytes allocated per pending reminder."""
+    tracemalloc.start()
+    manager = factory(None)
+    fill(manager, values)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return used / len(values)
+
+
+def run_jitter(name, factory, values, rng):
+    """Return (fired, p50 ms, p99 ms, max ms, wake-ups, cpu seconds)."""
+    recorder = Recorder()
+    manager = factory(None)
+    manager.dispatcher.dispatch = recorder
+    fill(manager, values)
+    for index in range(DUE):
+        countdown = DUE_START + rng.uniform(0, DUE_WINDOW)
+        user_id = f'due{index}'
+        recorder.triggers[user_id] = time.time() + countdown
+        manager.add_reminder(user_id, 'event', countdown)
+    # Count the worker's wake-ups at the primitive it waits on
+    waiter = manager.wheel_cond if name == 'wheel' else manager.wake_event
+    wait = waiter.wait
+    wakeups = [0]
+
+    def counted_wait(timeout=None):
+        wakeups[0] += 1
+        return wait(timeout)
+
+    waiter.wait = counted_wait
+    cpu = time.process_time()
+    manager.start()
+    time.sleep(DUE_START + DUE_WINDOW + 1.0)
+    manager.stop()
+    cpu = time.process_time() - cpu
+    late = recorder.late
+    return (len(late), percentile(late, 0.5) * 1000, percentile(late, 0.99) * 1000, max(late) * 1000,
+            wakeups[0], cpu)
+
+
+def main():
+    rng = random.Random(0)
+    values = countdowns(rng, REMINDERS)
+    print(f"{REMINDERS:,} reminders, countdowns of 1 s to {MAX_COUNTDOWN // 86400} days\n")
+    print(f"{'manager':>8} {'adds/s':>12} {'cancels/s':>12} {'bytes/reminder':>15}")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = []
+        for name, factory in MANAGERS:
+            adds, cancels = run_insert(name, factory, values)
+            memory = run_memory(name, factory, values)
+            results.append((name, adds, cancels, memory))
+    for name, adds, cancels, memory in results:
+        cancels = f'{cancels:>12,.0f}' if cancels is not None else f"{'-':>12}"
+        print(f"{name:>8} {adds:>12,.0f} {cancels} {memory:>15,.0f}")
+
+    print(f"\n{DUE:,} reminders due within {DUE_WINDOW:.0f} s while {REMINDERS:,} are pending")
+    print(f"{'manager':>8} {'fired':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'wake-ups':>9} {'cpu s':>7}")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = [(name,) + run_jitter(name, factory, values, rng) for name, factory in MANAGERS]
+    for name, fired, p50, p99, worst, wakeups, cpu in results:
+        print(f"{name:>8} {fired:>7,} {p50:>8.1f} {p99:>8.1f} {worst:>8.1f} {wakeups:>9,} {cpu:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark and collision check for the snowflake ID generator
+
+Measures IDs per second of one generator from one and from several threads,
+and checks that no ID is produced twice: within one generator under thread
+contention, and across generators of different nodes running at the same
+time. For comparison it counts how many of the same number of second
+resolution timestamps, the IDs the clients used before, would collide.
+
+Nodes derived from random userIds do collide. The last part derives the
+nodes of USERS random users, lets every user take one ID per millisecond on
+a virtual clock and counts the duplicate IDs, with the sequence starting at
+0 in every millisecond and with the random start the generators use.
+"""
+
+import os
+import random
+import string
+import sys
+import time
+from threading import Thread
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.snowflake import SnowflakeGenerator, SEQUENCE_START_SPREAD, node_id  # noqa: E402
+
+ID_COUNT = 1_000_000
+THREADS = 4
+NODES = [('Server_4', 'alice'), ('Server_4', 'bob'), ('Server_5', 'alice'), ('Server_4',)]
+USERS = 1000  # Random userIds whose derived nodes are checked for collisions
+MILLISECONDS = 100  # Virtual milliseconds every user takes one ID in
+
+
+def bench_single():
+    """Return (ids, seconds, ids) for one thread taking ID_COUNT IDs."""
+    generator = SnowflakeGenerator(node_id('Server_4'))
+    next_id = generator.next_id
+    start = time.perf_counter()
+    ids = [next_id() for _ in range(ID_COUNT)]
+    return len(ids), time.perf_counter() - start, ids
+
+
+def bench_threads(generators):
+    """Return (ids, seconds, ids) for THREADS threads per generator sharing ID_COUNT IDs."""
+    per_thread = ID_COUNT // (THREADS * len(generators))
+    results = []
+
+    def worker(next_id):
+        results.append([next_id() for _ in range(per_thread)])
+
+    threads = [Thread(target=worker, args=(generator.next_id,)) for generator in generators for _ in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    ids = [snowflake for chunk in results for snowflake in chunk]
+    return len(ids), seconds, ids
+
+
+def derived_nodes(rng):
+    """Return the nodes of USERS random 6-letter userIds on one server."""
+    users = {''.join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(USERS)}
+    return [node_id('Server_4', user_id) for user_id in users]
+
+
+def duplicates_on_nodes(nodes, start_spread):
+    """Return (ids, duplicates) when a generator per node takes one ID per virtual millisecond."""
+    now = [time.time_ns()]
+    generators = [SnowflakeGenerator(node, start_spread=start_spread, clock=lambda: now[0]) for node in nodes]
+    ids = []
+    for _ in range(MILLISECONDS):
+        ids.extend(generator.next_id() for generator in generators)
+        now[0] += 1_000_000
+    return len(ids), len(ids) - len(set(ids))
+
+
+def report(name, count, seconds, ids):
+    duplicates = count - len(set(ids))
+    print(f"{name:>34} {count:>10,} {count / seconds:>14,.0f} {duplicates:>11}")
+    return duplicates
+
+
+def main():
+    print(f"{'case':>34} {'ids':>10} {'ids/s':>14} {'duplicates':>11}")
+    duplicates = 0
+    count, seconds, ids = bench_single()
+    duplicates += report('1 generator, 1 thread', count, seconds, ids)
+    assert ids == sorted(ids), "IDs of one generator must increase"
+
+    count, seconds, ids = bench_threads([SnowflakeGenerator(node_id('Server_4'))])
+    duplicates += report(f'1 generator, {THREADS} threads', count, seconds, ids)
+
+    nodes = sorted({node_id(*parts) for parts in NODES})
+    generators = [SnowflakeGenerator(node) for node in nodes]
+    count, seconds, ids = bench_threads(generators)
+    duplicates += report(f'{len(generators)} nodes, {THREADS} threads each', count, seconds, ids)
+
+    # What the clients did before: one ID per second
+    start = time.perf_counter()
+    legacy = [int(time.time()) for _ in range(ID_COUNT)]
+    report('int(time.time()), 1 thread', len(legacy), time.perf_counter() - start, legacy)
+
+    if duplicates:
+        sys.exit(f"FAILED: {duplicates} duplicate snowflakes")
+    print("No duplicate snowflakes")
+
+    # Not a failure, derived nodes are a hash: how often do producers meet?
+    nodes = derived_nodes(random.Random(0))
+    print(f"\n{len(nodes):,} random users on {len(set(nodes)):,} nodes, "
+          f"{len(nodes) - len(set(nodes)):,} share a node with another user")
+    print(f"{'sequence start':>34} {'ids':>10} {'duplicates':>11} {'rate':>10}")
+    for name, spread in (('0', 1), (f'random below {SEQUENCE_START_SPREAD}', SEQUENCE_START_SPREAD)):
+        count, collided = duplicates_on_nodes(nodes, spread)
+        print(f"{name:>34} {count:>10,} {collided:>11,} {collided / count:>10.4%}")
+
+
+if __name__ == '__main__':
+    main()
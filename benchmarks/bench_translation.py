@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for translations off the receive loop
+
+One client connection sends translation messages, each followed by a PING.
+The translation backend is the offline DictionaryBackend, its artificial
+latency stands in for the HTTP round-trip of GoogleTranslator. Compared are:
+
+1. inline: the receive loop translates before it reads the next frame, the
+   way the MESSAGE and TRANSLATE handlers did before
+2. TranslationService: the receive loop only submits, the worker pool
+   translates and the result is forwarded from a done-callback
+
+Reported are the 99th percentile time until a PING is answered, the time
+until the last translation is forwarded and the requests rejected by a full
+queue.
+"""
+
+import os
+import sys
+import time
+from threading import Event, Lock
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.translation_backends import DictionaryBackend  # noqa: E402
+from server.translation_service import TranslationService  # noqa: E402
+
+MESSAGES = 200
+BACKEND_LATENCY = 0.02  # Seconds per simulated translation
+WORKERS = [1, 4, 16]
+MAX_QUEUE = 1000
+
+backend = DictionaryBackend(BACKEND_LATENCY)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def run_inline():
+    """Return (p99 PING ms, total s, rejected) of translating on the receive loop."""
+    pings = []
+    start = time.perf_counter()
+    for n in range(MESSAGES):
+        arrived = time.perf_counter()
+        backend(f'message {n}', 'en')
+        pings.append(time.perf_counter() - arrived)  # The PING behind it is read only now
+    return percentile(pings, 0.99) * 1000, time.perf_counter() - start, 0
+
+
+def run_pool(workers):
+    """Return (p99 PING ms, total s, rejected) of translating on the worker pool."""
+    service = TranslationService(backend, cache=None, workers=workers, max_queue=MAX_QUEUE)
+    service.start()
+    pings = []
+    forwarded = [0]
+    done = Event()
+    lock = Lock()
+
+    def forward(future):
+        with lock:
+            forwarded[0] += 1
+            if forwarded[0] == MESSAGES:
+                done.set()
+
+    start = time.perf_counter()
+    for n in range(MESSAGES):
+        arrived = time.perf_counter()
+        service.submit(f'message {n}', 'English').add_done_callback(forward)
+        pings.append(time.perf_counter() - arrived)
+    done.wait()
+    total = time.perf_counter() - start
+    service.stop()
+    return percentile(pings, 0.99) * 1000, total, service.rejected
+
+
+def main():
+    print(f"{'mode':>8} {'workers':>8} {'p99 PING ms':>12} {'total s':>8} {'rejected':>9}")
+    ping, total, rejected = run_inline()
+    print(f"{'inline':>8} {'-':>8} {ping:>12.3f} {total:>8.2f} {rejected:>9}")
+    for workers in WORKERS:
+        ping, total, rejected = run_pool(workers)
+        print(f"{'pool':>8} {workers:>8} {ping:>12.3f} {total:>8.2f} {rejected:>9}")
+
+
+if __name__ == '__main__':
+    main()
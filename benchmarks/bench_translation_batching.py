@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark for single-flight and micro-batching of translations
+
+Many users send translation messages at the same time, a share of them with
+the same text. The requests are submitted to the TranslationService at a
+steady rate, without the translation cache, so only requests that are in
+flight at the same time can be combined. The backend is the offline
+DictionaryBackend with a fixed latency per call. Compared are:
+
+1. per request: every request is one backend call, the way translator() was
+   called by every message
+2. single-flight: identical (text, language) requests in flight share one call
+3. single-flight plus micro-batching with a batch delay of a few milliseconds
+
+Reported are the backend calls, the requests that joined one in flight, the
+time until the last request is translated and the 99th percentile time of one
+request.
+"""
+
+import os
+import random
+import sys
+import time
+from threading import Lock, Event
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.translation_backends import DictionaryBackend  # noqa: E402
+from server.translation_service import TranslationService  # noqa: E402
+
+REQUESTS = 2_000
+PHRASES = 300
+LANGUAGES = ['Deutsch', 'English', 'Chinese', 'Türkçe']
+RATE = 2_000  # Requests submitted per second
+BACKEND_LATENCY = 0.02
+WORKERS = 8
+BATCH_DELAY = 0.005
+
+
+def workload(rng):
+    """Return [(text, language)], a few phrases are much more common than the rest."""
+    phrases = [f'see you at the meeting number {n}' for n in range(PHRASES)]
+    weights = [1 / rank for rank in range(1, PHRASES + 1)]
+    return [(text, rng.choice(LANGUAGES)) for text in rng.choices(phrases, weights, k=REQUESTS)]
+
+
+def run(requests, coalesce, batch_delay):
+    """Return (backend calls, coalesced, total s, p99 ms)."""
+    backend = DictionaryBackend(BACKEND_LATENCY)
+    service = TranslationService(backend, cache=None, workers=WORKERS, max_queue=REQUESTS, batch_delay=batch_delay)
+    service.start()
+    latencies = []
+    lock = Lock()
+    done = Event()
+
+    def finished(submitted):
+        def callback(future):
+            with lock:
+                latencies.append(time.perf_counter() - submitted)
+                if len(latencies) == len(requests):
+                    done.set()
+        return callback
+
+    start = time.perf_counter()
+    for n, (text, language) in enumerate(requests):
+        # Pace the submits, the way messages arrive over time
+        delay = start + n / RATE - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not coalesce:
+            # A unique suffix defeats the single-flight table, every request is its own backend call
+            text = f'{text} #{n}'
+        service.submit(text, language).add_done_callback(finished(time.perf_counter()))
+    done.wait()
+    total = time.perf_counter() - start
+    service.stop()
+    latencies.sort()
+    return backend.calls, service.coalesced, total, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    requests = workload(random.Random(0))
+    print(f"{'mode':>24} {'backend calls':>14} {'coalesced':>10} {'total s':>8} {'p99 ms':>8}")
+    for name, coalesce, batch_delay in (('per request', False, 0),
+                                        ('single-flight', True, 0),
+                                        ('single-flight + batching', True, BATCH_DELAY)):
+        calls, coalesced, total, p99 = run(requests, coalesce, batch_delay)
+        print(f"{name:>24} {calls:>14,} {coalesced:>10,} {total:>8.2f} {p99:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the translation cache
+
+Replays a chat workload in which a few phrases make up most of the traffic
+("ok", "thanks", ...) and the rest are one-off sentences, the phrase of every
+message is drawn from a Zipf distribution. The translation backend is
+the offline DictionaryBackend with an artificial latency in place of the HTTP
+round-trip. Compared are
+no cache and TranslationCache with several byte limits.
+
+Reported are translations per second, the hit rate, the evictions and the
+average lookup time.
+"""
+
+import os
+import random
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.translation_backends import DictionaryBackend  # noqa: E402
+from modules.translation_cache import TranslationCache  # noqa: E402
+
+MESSAGES = 5_000
+PHRASES = 20_000
+ZIPF_S = 1.1
+LANGUAGES = ['de', 'en', 'zh-CN', 'tr']
+BACKEND_LATENCY = 0.001  # Seconds per simulated translation
+LIMITS = [64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+
+backend = DictionaryBackend(BACKEND_LATENCY)
+
+
+def workload(rng):
+    """Return [(text, language)] with Zipf distributed phrases."""
+    weights = [1 / (rank ** ZIPF_S) for rank in range(1, PHRASES + 1)]
+    phrases = [f'phrase number {rank} ' + 'x' * rng.randrange(10, 200) for rank in range(PHRASES)]
+    texts = rng.choices(phrases, weights, k=MESSAGES)
+    return [(text, rng.choice(LANGUAGES)) for text in texts]
+
+
+def run(requests, cache):
+    """Return (translations/s, hit rate, evictions, lookup ms)."""
+    start = time.perf_counter()
+    for text, language in requests:
+        if cache is None:
+            backend(text, language)
+        else:
+            cache.translate(text, language, backend)
+    elapsed = time.perf_counter() - start
+    if cache is None:
+        return len(requests) / elapsed, 0.0, 0, 0.0
+    stats = cache.stats()
+    return len(requests) / elapsed, stats['hit_rate'], stats['evictions'], stats['lookup_ms']
+
+
+def main():
+    requests = workload(random.Random(0))
+    print(f"{'cache':>10} {'translations/s':>15} {'hit rate':>9} {'evictions':>10} {'lookup ms':>10}")
+    rate, hit_rate, evictions, lookup = run(requests, None)
+    print(f"{'none':>10} {rate:>15,.0f} {hit_rate:>9.1%} {evictions:>10,} {lookup:>10.4f}")
+    for limit in LIMITS:
+        rate, hit_rate, evictions, lookup = run(requests, TranslationCache(max_bytes=limit))
+        print(f"{limit // 1024:>8}KB {rate:>15,.0f} {hit_rate:>9.1%} {evictions:>10,} {lookup:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
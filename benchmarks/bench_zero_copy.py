@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the zero-copy framing path
+
+1. Decoding: a large payload arrives in 4 KiB reads and is decoded by the
+   copying FrameDecoder and by ZeroCopyFrameDecoder.
+2. Group fan-out: one payload is sent to many members over local socket pairs,
+   once by re-packing the frame per member and once by framing it with
+   frame_buffers() and sending it with vectored send_buffers().
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from modules.PackingandUnpacking import (FrameDecoder, Packing, ZeroCopyFrameDecoder,  # noqa: E402
+                                         frame_buffers, send_buffers)
+
+CHUNK_SIZE = 4096
+PAYLOAD_SIZES = [1024, 64 * 1024, 1024 * 1024]
+FANOUT_MEMBERS = 50
+FANOUT_ROUNDS = 200
+FANOUT_PAYLOAD = b'm' * (64 * 1024)
+
+
+def bench_decode(decoder_cls, payload_size, repeat=20):
+    """Return MiB/s for decoding one frame of payload_size bytes in CHUNK_SIZE reads."""
+    stream = Packing('MESSAGE', b'p' * payload_size)
+    chunks = [stream[i:i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE)]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decoder = decoder_cls()
+        frames = []
+        for chunk in chunks:
+            frames.extend(decoder.feed(chunk))
+        assert len(frames) == 1 and frames[0][1] == payload_size
+    seconds = time.perf_counter() - start
+    return payload_size * repeat / seconds / (1024 * 1024)
+
+
+def drain(sock):
+    """Read and discard everything until the peer closes."""
+    while sock.recv(1 << 16):
+        pass
+
+
+def bench_fanout(shared_buffers):
+    """Return frames per second for fanning one payload out to FANOUT_MEMBERS sockets."""
+    pairs = [socket.socketpair() for _ in range(FANOUT_MEMBERS)]
+    readers = [threading.Thread(target=drain, args=(b,), daemon=True) for _, b in pairs]
+    for reader in readers:
+        reader.start()
+    start = time.perf_counter()
+    for _ in range(FANOUT_ROUNDS):
+        if shared_buffers:
+            buffers = frame_buffers('MESSAGE', FANOUT_PAYLOAD)
+            for sender, _ in pairs:
+                send_buffers(sender, buffers)
+        else:
+            for sender, _ in pairs:
+                sender.sendall(Packing('MESSAGE', FANOUT_PAYLOAD))
+    seconds = time.perf_counter() - start
+    for sender, receiver in pairs:
+        sender.close()
+    for reader in readers:
+        reader.join()
+    for _, receiver in pairs:
+        receiver.close()
+    return FANOUT_MEMBERS * FANOUT_ROUNDS / seconds
+
+
+def main():
+    decode_results = [(size, bench_decode(FrameDecoder, size), bench_decode(ZeroCopyFrameDecoder, size))
+                      for size in PAYLOAD_SIZES]
+    repack = bench_fanout(shared_buffers=False)
+    shared = bench_fanout(shared_buffers=True)
+
+    print(f"Decoding in {CHUNK_SIZE} byte reads")
+    print(f"{'payload bytes':>14} {'FrameDecoder MiB/s':>20} {'ZeroCopy MiB/s':>16}")
+    for size, copying, zero_copy in decode_results:
+        print(f"{size:>14} {copying:>20,.1f} {zero_copy:>16,.1f}")
+    print()
+    print(f"Group fan-out, {FANOUT_MEMBERS} members, {len(FANOUT_PAYLOAD)} byte payload")
+    print(f"  re-pack per member : {repack:>12,.0f} frames/s")
+    print(f"  shared buffers     : {shared:>12,.0f} frames/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -36,6 +36,7 @@ sys.path.insert(0, project_root)
 
 from proto import Message_pb2  # noqa: E402
 from modules.PackingandUnpacking import *  # noqa: E402, F403
+from modules.snowflake import next_snowflake  # noqa: E402
 import time  # noqa: E402
 # Import reminder popup component
 from rrd_widgets import TipsWidget, TipsStatus  # noqa: E402
@@ -582,6 +583,8 @@ class Socketmanager:
         self.heartbeat_timeout = 30   # 超时时长
         self.search_users_unit64id = None
         self.chat_history_manager = None  # 聊天历史管理器，稍后由外部设置
+        self.codec = ASCII_CODEC  # 当前连接使用的帧格式，收到 CONNECTED 后才可能切换为二进制
+        self.offered_codec = ASCII_CODEC  # CONNECT_CLIENT 中向服务器申请的帧格式
 
         # 各类信号与 UI 控件绑定
         self.signals = MySignals()
@@ -883,7 +886,8 @@ class Socketmanager:
                             self.dialog1.ServerTable.setItem(rowCount, 0, QTableWidgetItem(announce.serverId))
                             self.dialog1.ServerTable.setItem(rowCount, 1, QTableWidgetItem(feat.featureName))
                             self.dialog1.ServerTable.setItem(rowCount, 2, QTableWidgetItem(str(feat.port)))
-                            self.Serverlist[announce.serverId] = [server_addr[0], feat.port]
+                            # 第三项记录服务器支持的功能，用于协商帧格式
+                            self.Serverlist[announce.serverId] = [server_addr[0], feat.port, {f.featureName for f in announce.feature}]
                         servers_found = True
                         # print(f"[Client] 从 {server_addr} 收到服务器响应")  # 注释掉，减少控制台输出
                         break  # 找到服务器就停止
@@ -910,6 +914,7 @@ class Socketmanager:
                 pass
             self.tcp_socket = None
         self.connected = False
+        self.codec = ASCII_CODEC
 
 
     # 建立 TCP 连接，负责发送连接请求，启动接收/心跳线程
@@ -935,6 +940,11 @@ class Socketmanager:
             ConnectClient = Message_pb2.ConnectClient()
             ConnectClient.user.userId = user.userId
             ConnectClient.user.serverId = user.serverId
+            # 服务器在 SERVER_ANNOUNCE 中声明支持时才申请二进制帧
+            server_features = self.Serverlist.get(serverid)[2] if len(self.Serverlist.get(serverid)) > 2 else ()
+            self.offered_codec = negotiate_codec(server_features)
+            if self.offered_codec is BINARY_CODEC:
+                ConnectClient.features.append(BINARY_FRAMING_FEATURE)
             data = ConnectClient.SerializeToString()
             fullmsg = Packing('CONNECT_CLIENT', data)
             self.tcp_socket.send(fullmsg)
@@ -964,7 +974,7 @@ class Socketmanager:
                 self.close_connection()
                 break
             try:
-                ping_msg = Packing('PING', b'')
+                ping_msg = self.codec.pack('PING', b'')
                 self.tcp_socket.send(ping_msg)
                 # print("[Client] Sent PING")  # 注释掉，减少控制台输出
             except Exception as e:
@@ -975,20 +985,18 @@ class Socketmanager:
     # TCP消息主接收线程，处理所有收到的协议包
     def recv_loop(self):
         """TCP message main receive thread that processes all received protocol packets."""
-        while self.connected and self.tcp_socket:
-            data = self.tcp_socket.recv(2048)
-            if not data:
-                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
-                self.close_connection()
+        # 一个连接一个解码器，合并到一起或被拆开的数据包都能完整解析
+        for purpose, length, payload in iter_frames(self.tcp_socket, FrameDecoder(), 2048):
+            if not self.connected or not self.tcp_socket:
                 break
             self.last_active_time = time.time()
-            purpose, length, payload = Unpacking(data)
             # print("[Client] Purpose:", purpose)  # 注释掉，减少控制台输出
             # 根据不同 purpose 处理不同协议包
             if purpose == 'CONNECTED':
                 CR = Message_pb2.ConnectResponse()
                 CR.ParseFromString(payload)
                 if CR.result == Message_pb2.ConnectResponse.CONNECTED:
+                    self.codec = self.offered_codec
                     self.signals.subWin_print.emit(self.dialog1.Hint, "Successfully connected to the server.")
                 elif CR.result == Message_pb2.ConnectResponse.UNKNOWN_ERROR:
                     self.signals.subWin_print.emit(self.dialog1.Hint, "Server responded with UNKNOWN_ERROR")
@@ -1000,7 +1008,7 @@ class Socketmanager:
                     break
 
             elif purpose == 'PING':
-                pong_msg = Packing('PONG', b'')
+                pong_msg = self.codec.pack('PONG', b'')
                 self.tcp_socket.send(pong_msg)
                 # print("[Client] Received PING, sent PONG")  # 注释掉，减少控制台输出
             elif purpose == 'PONG':
@@ -1044,10 +1052,10 @@ class Socketmanager:
                         msg_text = chat_msg.translation.original_text
                 else:
                     # 其他类型消息，暂时跳过
-                    return
+                    continue
 
                 if chat_msg.author.userId == user.userId:
-                    return  # 忽略自己发的回显
+                    continue  # 忽略自己发的回显
 
                 if recipient_type == 'user':
                     # 首先将发送者添加到用户树（如果不存在的话）
@@ -1064,7 +1072,7 @@ class Socketmanager:
                     ds.user.userId = user.userId
                     ds.user.serverId = user.serverId
                     ds.status = Message_pb2.ChatMessageResponse.DELIVERED
-                    ack_packet = Packing('MESSAGE_ACK', ack.SerializeToString())
+                    ack_packet = self.codec.pack('MESSAGE_ACK', ack.SerializeToString())
                     self.tcp_socket.send(ack_packet)
 
                 elif recipient_type == 'group':
@@ -1080,7 +1088,7 @@ class Socketmanager:
                     ds.user.userId = user.userId
                     ds.user.serverId = user.serverId
                     ds.status = Message_pb2.ChatMessageResponse.DELIVERED
-                    ack_packet = Packing('MESSAGE_ACK', ack.SerializeToString())
+                    ack_packet = self.codec.pack('MESSAGE_ACK', ack.SerializeToString())
                     self.tcp_socket.send(ack_packet)
                 elif recipient_type == 'userOfGroup':
                     pass
@@ -1181,6 +1189,10 @@ class Socketmanager:
                 # 处理其他未知消息
                 # print(f"[Client] 收到未处理消息: {purpose}")  # 注释掉，减少控制台输出
                 pass
+        else:
+            if self.connected:
+                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
+                self.close_connection()
 
     # 主动断开连接
     def disconnect(self):
@@ -1198,7 +1210,7 @@ class Socketmanager:
                 return
             QueryUsers = Message_pb2.QueryUsers()
             QueryUsers.query = text
-            QueryUsers.handle = int(time.time())
+            QueryUsers.handle = next_snowflake(user.serverId, user.userId)
             self.search_users_unit64id = QueryUsers.handle
             data = QueryUsers.SerializeToString()
             tosend = Packing('SEARCH_USERS', data)
@@ -1212,7 +1224,7 @@ class Socketmanager:
         item = self.ui.UserGroupTree.currentItem()
         node_type = item.data(0, Qt.UserRole)[0]
         msg = Message_pb2.ChatMessage()
-        msg.messageSnowflake = int(time.time())
+        msg.messageSnowflake = next_snowflake(user.serverId, user.userId)
         msg.author.userId = user.userId
         msg.author.serverId = user.serverId
         
@@ -1254,7 +1266,7 @@ class Socketmanager:
         
         # 发送消息到服务器
         data = msg.SerializeToString()
-        tosend = Packing('MESSAGE', data)
+        tosend = self.codec.pack('MESSAGE', data)
         self.tcp_socket.send(tosend)
         
         # 将消息添加到对应的聊天历史中
@@ -1281,7 +1293,7 @@ class Socketmanager:
             self.signals.hint1_print.emit(self.dialog2.Hint1, "请输入群名！")
             return
         modify_group_msg = Message_pb2.ModifyGroup()
-        modify_group_msg.handle = int(time.time())
+        modify_group_msg.handle = next_snowflake(user.serverId, user.userId)
         modify_group_msg.groupId = group_name
         modify_group_msg.displayName = group_name
         modify_group_msg.deleteGroup = False
@@ -1315,7 +1327,7 @@ class Socketmanager:
     def invite_group(self):
         """Invite other users to join the current group."""
         invite = Message_pb2.InviteToGroup()
-        invite.handle = int(time.time())
+        invite.handle = next_snowflake(user.serverId, user.userId)
         invite.user.userId = self.dialog3.lineEdit.text()
         invite.user.serverId = user.serverId
         invite.groupId = self.dialog3.GroupName.text()
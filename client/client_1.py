@@ -36,6 +36,7 @@ sys.path.insert(0, project_root)
 
 from proto import Message_pb2
 from modules.PackingandUnpacking import *
+from modules.snowflake import next_snowflake
 import time
 # Import reminder popup components
 from rrd_widgets import TipsWidget, TipsStatus
@@ -650,14 +651,11 @@ class Socketmanager:
 
     # TCP message main receive thread, processes all received protocol packets
     def recv_loop(self):
-        while self.connected and self.tcp_socket:
-            data = self.tcp_socket.recv(2048)
-            if not data:
-                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
-                self.close_connection()
+        # One decoder per connection, frames that arrive together or split are all parsed
+        for purpose, length, payload in iter_frames(self.tcp_socket, FrameDecoder(), 2048):
+            if not self.connected or not self.tcp_socket:
                 break
             self.last_active_time = time.time()
-            purpose, length, payload = Unpacking(data)
             # print("[Client] Purpose:", purpose)  # Commented out to reduce console output
             # Process different protocol packets based on purpose
             if purpose == 'CONNECTED':
@@ -719,10 +717,10 @@ class Socketmanager:
                         msg_text = chat_msg.translation.original_text
                 else:
                     # Other message types, skip for now
-                    return
+                    continue
 
                 if chat_msg.author.userId == user.userId:
-                    return  # Ignore own echo
+                    continue  # Ignore own echo
 
                 if recipient_type == 'user':
                     # First, add sender to user tree (if not already present)
@@ -879,6 +877,10 @@ class Socketmanager:
                 # Process other unknown messages
                 # print(f"[Client] Received unhandled message: {purpose}")  # Commented out to reduce console output
                 pass
+        else:
+            if self.connected:
+                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
+                self.close_connection()
 
     # Initiate disconnection
     def disconnect(self):
@@ -894,7 +896,7 @@ class Socketmanager:
                 return
             QueryUsers = Message_pb2.QueryUsers()
             QueryUsers.query = text
-            QueryUsers.handle = int(time.time())
+            QueryUsers.handle = next_snowflake(user.serverId, user.userId)
             self.search_users_unit64id = QueryUsers.handle
             data = QueryUsers.SerializeToString()
             tosend = Packing('SEARCH_USERS', data)
@@ -907,7 +909,7 @@ class Socketmanager:
         item = self.ui.UserGroupTree.currentItem()
         node_type = item.data(0, Qt.UserRole)[0]
         msg = Message_pb2.ChatMessage()
-        msg.messageSnowflake = int(time.time())
+        msg.messageSnowflake = next_snowflake(user.serverId, user.userId)
         msg.author.userId = user.userId
         msg.author.serverId = user.serverId
         
@@ -972,7 +974,7 @@ class Socketmanager:
         self.dialog2.createButton1.setEnabled(False)
         
         modify_group_msg = Message_pb2.ModifyGroup()
-        modify_group_msg.handle = int(time.time())
+        modify_group_msg.handle = next_snowflake(user.serverId, user.userId)
         modify_group_msg.groupId = group_name
         modify_group_msg.displayName = group_name
         modify_group_msg.deleteGroup = False
@@ -1033,7 +1035,7 @@ class Socketmanager:
     # Invite other users to join group
     def invite_group(self):
         invite = Message_pb2.InviteToGroup()
-        invite.handle = int(time.time())
+        invite.handle = next_snowflake(user.serverId, user.userId)
         invite.user.userId = self.dialog3.lineEdit.text()
         invite.user.serverId = user.serverId
         invite.groupId = self.dialog3.GroupName.text()
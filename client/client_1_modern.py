@@ -24,6 +24,7 @@ sys.path.insert(0, project_root)
 
 from proto import Message_pb2
 from modules.PackingandUnpacking import *
+from modules.snowflake import next_snowflake
 import time
 # Import modern UI components
 from client.gui.modern_client_1_ui import (ModernMainWindow, ModernConnectToServerDialog, 
@@ -752,14 +753,11 @@ class Socketmanager:
     # TCP消息主接收线程，处理所有收到的协议包
     def recv_loop(self):
         """TCP message main receive thread that processes all received protocol packets."""
-        while self.connected and self.tcp_socket:
-            data = self.tcp_socket.recv(2048)
-            if not data:
-                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
-                self.close_connection()
+        # 一个连接一个解码器，合并到一起或被拆开的数据包都能完整解析
+        for purpose, length, payload in iter_frames(self.tcp_socket, FrameDecoder(), 2048):
+            if not self.connected or not self.tcp_socket:
                 break
             self.last_active_time = time.time()
-            purpose, length, payload = Unpacking(data)
             # print("[Client] Purpose:", purpose)  # 注释掉，减少控制台输出
             # 根据不同 purpose 处理不同协议包
             if purpose == 'CONNECTED':
@@ -821,10 +819,10 @@ class Socketmanager:
                         msg_text = chat_msg.translation.original_text
                 else:
                     # 其他类型消息，暂时跳过
-                    return
+                    continue
 
                 if chat_msg.author.userId == user.userId:
-                    return  # 忽略自己发的回显
+                    continue  # 忽略自己发的回显
 
                 if recipient_type == 'user':
                     # 首先将发送者添加到用户树（如果不存在的话）
@@ -921,6 +919,10 @@ class Socketmanager:
                 translated_text = translated_msg.translated_text
                 # 可以在这里处理翻译结果，比如显示在聊天窗口中
                 # print(f"[Client] 翻译结果: {original_text} -> {translated_text}")
+        else:
+            if self.connected:
+                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
+                self.close_connection()
 
     def disconnect(self):
         """Initiate disconnection from the server."""
@@ -937,7 +939,7 @@ class Socketmanager:
                 return
             
             # 生成唯一的搜索句柄
-            self.search_users_unit64id = int(time.time() * 1000)
+            self.search_users_unit64id = next_snowflake(user.serverId, user.userId)
             
             # 创建搜索请求
             QueryUsers = Message_pb2.QueryUsers()
@@ -19,6 +19,7 @@ sys.path.insert(0, project_root)
 
 from proto import Message_pb2
 from modules.PackingandUnpacking import *
+from modules.snowflake import next_snowflake
 import time
 # Import reminder popup component
 from rrd_widgets import TipsWidget, TipsStatus
@@ -722,14 +723,11 @@ class Socketmanager:
     # TCP消息主接收线程，处理所有收到的协议包
     def recv_loop(self):
         """TCP message main receive thread that processes all received protocol packets."""
-        while self.connected and self.tcp_socket:
-            data = self.tcp_socket.recv(2048)
-            if not data:
-                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
-                self.close_connection()
+        # 一个连接一个解码器，合并到一起或被拆开的数据包都能完整解析
+        for purpose, length, payload in iter_frames(self.tcp_socket, FrameDecoder(), 2048):
+            if not self.connected or not self.tcp_socket:
                 break
             self.last_active_time = time.time()
-            purpose, length, payload = Unpacking(data)
             # print("[Client] Purpose:", purpose)  # 注释掉，减少控制台输出
             # 根据不同 purpose 处理不同协议包
             if purpose == 'CONNECTED':
@@ -791,10 +789,10 @@ class Socketmanager:
                         msg_text = chat_msg.translation.original_text
                 else:
                     # 其他类型消息，暂时跳过
-                    return
+                    continue
 
                 if chat_msg.author.userId == user.userId:
-                    return  # 忽略自己发的回显
+                    continue  # 忽略自己发的回显
 
                 if recipient_type == 'user':
                     # 首先将发送者添加到用户树（如果不存在的话）
@@ -949,6 +947,10 @@ class Socketmanager:
                 # 处理其他未知消息
                 # print(f"[Client] 收到未处理消息: {purpose}")  # 注释掉，减少控制台输出
                 pass
+        else:
+            if self.connected:
+                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
+                self.close_connection()
 
     # 主动断开连接
     def disconnect(self):
@@ -966,7 +968,7 @@ class Socketmanager:
                 return
             QueryUsers = Message_pb2.QueryUsers()
             QueryUsers.query = text
-            QueryUsers.handle = int(time.time())
+            QueryUsers.handle = next_snowflake(user.serverId, user.userId)
             self.search_users_unit64id = QueryUsers.handle
             data = QueryUsers.SerializeToString()
             tosend = Packing('SEARCH_USERS', data)
@@ -980,7 +982,7 @@ class Socketmanager:
         item = self.ui.UserGroupTree.currentItem()
         node_type = item.data(0, Qt.UserRole)[0]
         msg = Message_pb2.ChatMessage()
-        msg.messageSnowflake = int(time.time())
+        msg.messageSnowflake = next_snowflake(user.serverId, user.userId)
         msg.author.userId = user.userId
         msg.author.serverId = user.serverId
 
@@ -1046,7 +1048,7 @@ class Socketmanager:
         self.dialog2.createButton1.setEnabled(False)
 
         modify_group_msg = Message_pb2.ModifyGroup()
-        modify_group_msg.handle = int(time.time())
+        modify_group_msg.handle = next_snowflake(user.serverId, user.userId)
         modify_group_msg.groupId = group_name
         modify_group_msg.displayName = group_name
         modify_group_msg.deleteGroup = False
@@ -1109,7 +1111,7 @@ class Socketmanager:
     def invite_group(self):
         """Invite other users to join the current group."""
         invite = Message_pb2.InviteToGroup()
-        invite.handle = int(time.time())
+        invite.handle = next_snowflake(user.serverId, user.userId)
         invite.user.userId = self.dialog3.lineEdit.text()
         invite.user.serverId = user.serverId
         invite.groupId = self.dialog3.GroupName.text()
@@ -13,6 +13,7 @@ import datetime
 from select import select
 from proto import Message_pb2
 from modules.PackingandUnpacking import *
+from modules.snowflake import next_snowflake
 import time
 # Import reminder popup component
 from rrd_widgets import TipsWidget, TipsStatus
@@ -684,14 +685,11 @@ class Socketmanager:
 
     def recv_loop(self):
         """TCP message main receive thread that processes all received protocol packets."""
-        while self.connected and self.tcp_socket:
-            data = self.tcp_socket.recv(2048)
-            if not data:
-                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
-                self.close_connection()
+        # One decoder per connection, frames that arrive together or split are all parsed
+        for purpose, length, payload in iter_frames(self.tcp_socket, FrameDecoder(), 2048):
+            if not self.connected or not self.tcp_socket:
                 break
             self.last_active_time = time.time()
-            purpose, length, payload = Packing.unpack(data)
             # print("[Client] Purpose:", purpose)  # Commented out, reduce console output
             # Process different protocol packets based on purpose
             if purpose == 'CONNECTED':
@@ -753,10 +751,10 @@ class Socketmanager:
                         msg_text = chat_msg.translation.original_text
                 else:
                     # Other message types, skip for now
-                    return
+                    continue
 
                 if chat_msg.author.userId == user.userId:
-                    return  # Ignore self-sent echo
+                    continue  # Ignore self-sent echo
 
                 if recipient_type == 'user':
                     # First add sender to user tree (if not already)
@@ -911,6 +909,10 @@ class Socketmanager:
                 # Process other unknown messages
                 # print(f"[Client] Received unhandled message: {purpose}")  # Commented out, reduce console output
                 pass
+        else:
+            if self.connected:
+                self.signals.subWin_print.emit(self.dialog1.Hint, "Disconnected by server.")
+                self.close_connection()
 
     def disconnect(self):
         """Initiate disconnection from the server."""
@@ -926,7 +928,7 @@ class Socketmanager:
                 return
             QueryUsers = Message_pb2.QueryUsers()
             QueryUsers.query = text
-            QueryUsers.handle = int(time.time())
+            QueryUsers.handle = next_snowflake(user.serverId, user.userId)
             self.search_users_unit64id = QueryUsers.handle
             data = QueryUsers.SerializeToString()
             tosend = Packing('SEARCH_USERS', data)
@@ -939,7 +941,7 @@ class Socketmanager:
         item = self.ui.UserGroupTree.currentItem()
         node_type = item.data(0, Qt.UserRole)[0]
         msg = Message_pb2.ChatMessage()
-        msg.messageSnowflake = int(time.time())
+        msg.messageSnowflake = next_snowflake(user.serverId, user.userId)
         msg.author.userId = user.userId
         msg.author.serverId = user.serverId
         
@@ -1004,7 +1006,7 @@ class Socketmanager:
         self.dialog2.createButton1.setEnabled(False)
         
         modify_group_msg = Message_pb2.ModifyGroup()
-        modify_group_msg.handle = int(time.time())
+        modify_group_msg.handle = next_snowflake(user.serverId, user.userId)
         modify_group_msg.groupId = group_name
         modify_group_msg.displayName = group_name
         modify_group_msg.deleteGroup = False
@@ -1064,7 +1066,7 @@ class Socketmanager:
     def invite_group(self):
         """Invite other users to join the current group."""
         invite = Message_pb2.InviteToGroup()
-        invite.handle = int(time.time())
+        invite.handle = next_snowflake(user.serverId, user.userId)
         invite.user.userId = self.dialog3.lineEdit.text()
         invite.user.serverId = user.serverId
         invite.groupId = self.dialog3.GroupName.text()
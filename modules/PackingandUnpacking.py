@@ -1,4 +1,34 @@
-import inspect
+from modules.wire_log import WireLogger, level_from_environment
+
+FRAME_TERMINATOR = b'\n'
+
+# Connect feature that switches a connection to binary frames, see negotiate_codec()
+BINARY_FRAMING_FEATURE = 'BINARY_FRAMING'
+
+# Purpose codes of the binary frame format. Append only: both peers map codes by position.
+PURPOSES = (
+    'DISCOVER_SERVER', 'SERVER_ANNOUNCE', 'CONNECT_CLIENT', 'CONNECT_SERVER', 'CONNECTED', 'HANGUP',
+    'PING', 'PONG', 'MESSAGE', 'MESSAGE_ACK', 'SEARCH_USERS', 'SEARCH_USERS_RESP',
+    'MODIFY_GROUP', 'MODIFY_GROUP_RESP', 'INVITE_GROUP', 'NOTIFY_GROUP_INVITE', 'JOIN_GROUP',
+    'LEAVE_GROUP', 'QUERY_GROUP_MEMBERS', 'GROUP_MEMBERS', 'SET_REMINDER', 'REMINDER',
+    'TRANSLATE', 'TRANSLATED', 'LIVE_LOCATION', 'LIVE_LOCATIONS', 'UNSUPPORTED_MESSAGE_NOTIFICATION',
+)
+PURPOSE_CODES = {purpose: code for code, purpose in enumerate(PURPOSES, start=1)}
+BINARY_FLAG = 0x80  # ASCII headers start with a letter, binary frames with a byte >= 0x80
+
+
+def pack_header(purpose: str, length: int) -> bytes:
+    """
+    Build the 'PURPOSE <length> ' header of a frame.
+
+    Args:
+        purpose (str): The message purpose/type identifier.
+        length (int): The payload length in bytes.
+
+    Returns:
+        bytes: The ASCII encoded header.
+    """
+    return f'{purpose} {length} '.encode('ascii')
 
 def Packing(purpose: str, data: bytes) -> bytes:
     """
@@ -11,164 +41,463 @@ def Packing(purpose: str, data: bytes) -> bytes:
     Returns:
         bytes: The complete message with header and payload.
     """
-    purpose = purpose
-    length = len(data)
-    header = f'{purpose} {length} '.encode('ascii')
-    fullmessage = header + data + b'\n'
+    # join() copies the payload once, header + data + b'\n' copies it twice
+    fullmessage = b''.join((pack_header(purpose, len(data)), data, FRAME_TERMINATOR))
     
     # Add message sending log record
-    log_message_send_safe(purpose, data)
+    wire_logger.record('send', purpose, data)
     
     return fullmessage
 
+def frame_buffers(purpose: str, data) -> tuple:
+    """
+    Frame a message without joining header and payload.
+
+    The result can be sent with send_buffers() any number of times, for example
+    once per group member, without packing or copying the payload again.
+
+    Args:
+        purpose (str): The message purpose/type identifier.
+        data (bytes | memoryview): The message payload data.
+
+    Returns:
+        tuple: (header, payload, terminator) buffers.
+    """
+    wire_logger.record('send', purpose, data)
+    return pack_header(purpose, len(data)), data, FRAME_TERMINATOR
+
+def send_buffers(sock, buffers):
+    """
+    Send a list of buffers as one frame with vectored socket.sendmsg().
+
+    Partial sends are resumed without copying. Sockets without sendmsg()
+    (for example on Windows) fall back to a single joined sendall().
+
+    Args:
+        sock (socket): Connected TCP socket.
+        buffers (iterable): Bytes-like objects, usually from frame_buffers().
+    """
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers))
+        return
+    sent = sock.sendmsg(buffers)
+    if sent == sum(map(len, buffers)):
+        return
+    # Partial send, continue behind the bytes the kernel already accepted
+    views = [memoryview(b).cast('B') for b in buffers if len(b)]
+    while views:
+        while views and sent >= views[0].nbytes:
+            sent -= views[0].nbytes
+            views.pop(0)
+        if sent:
+            views[0] = views[0][sent:]
+        if views:
+            sent = sock.sendmsg(views)
+
+def send_frame(sock, purpose: str, data):
+    """
+    Pack and send one frame without joining header and payload.
+
+    Args:
+        sock (socket): Connected TCP socket.
+        purpose (str): The message purpose/type identifier.
+        data (bytes | memoryview): The message payload data.
+    """
+    wire_logger.record('send', purpose, data)
+    send_buffers(sock, (pack_header(purpose, len(data)), data, FRAME_TERMINATOR))
+
+def encode_varint(value: int) -> bytes:
+    """
+    Encode a non-negative integer as a little endian base 128 varint.
+
+    Args:
+        value (int): The value to encode.
+
+    Returns:
+        bytes: One to ten bytes, seven value bits per byte.
+    """
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def pack_binary_header(purpose: str, length: int) -> bytes:
+    """
+    Build the header of a binary frame: purpose code byte followed by the varint payload length.
+
+    Args:
+        purpose (str): A purpose listed in PURPOSES.
+        length (int): The payload length in bytes.
+
+    Returns:
+        bytes: The binary header.
+    """
+    code = BINARY_FLAG | PURPOSE_CODES[purpose]
+    if length < 0x80:
+        return bytes((code, length))
+    if length < 0x4000:
+        return bytes((code, (length & 0x7F) | 0x80, length >> 7))
+    return bytes((code,)) + encode_varint(length)
+
+
+class AsciiCodec:
+    """Encoder for the original 'PURPOSE <length> <payload>\\n' frames, understood by every peer."""
+
+    name = 'ASCII'
+
+    def pack(self, purpose, data):
+        return Packing(purpose, data)
+
+    def frame_buffers(self, purpose, data):
+        return frame_buffers(purpose, data)
+
+
+class BinaryCodec:
+    """
+    Encoder for compact binary frames: code byte | varint length | payload.
+
+    Purposes missing from PURPOSES are still sent as ASCII frames. FrameDecoder
+    accepts both formats at every frame boundary.
+    """
+
+    name = 'BINARY'
+
+    def pack(self, purpose, data):
+        if purpose not in PURPOSE_CODES:
+            return Packing(purpose, data)
+        wire_logger.record('send', purpose, data)
+        return pack_binary_header(purpose, len(data)) + data
+
+    def frame_buffers(self, purpose, data):
+        if purpose not in PURPOSE_CODES:
+            return frame_buffers(purpose, data)
+        wire_logger.record('send', purpose, data)
+        return pack_binary_header(purpose, len(data)), data
+
+
+ASCII_CODEC = AsciiCodec()
+BINARY_CODEC = BinaryCodec()
+
+
+def negotiate_codec(features, enabled=True):
+    """
+    Pick the codec for a connection from the features exchanged at connect time.
+
+    Args:
+        features (iterable): Feature names of CONNECT_CLIENT/CONNECT_SERVER or SERVER_ANNOUNCE.
+        enabled (bool): Whether this side offers binary framing at all.
+
+    Returns:
+        AsciiCodec | BinaryCodec: BINARY_CODEC only if both sides support it.
+    """
+    if enabled and BINARY_FRAMING_FEATURE in features:
+        return BINARY_CODEC
+    return ASCII_CODEC
+
 def Unpacking(data: bytes):
     """
     Unpack received data to extract message purpose, length, and payload.
+
+    Only suitable for single datagrams such as UDP discovery packets. Stream
+    sockets must use a FrameDecoder per connection.
     
     Args:
         data (bytes): The raw received data.
     
     Returns:
-        tuple: A tuple containing (purpose, length, payload).
+        tuple: A tuple containing (purpose, length, payload) of the last complete frame.
     """
-    buffer = b''
+    try:
+        frames = FrameDecoder().feed(data)
+    except FrameError:
+        frames = []
+    if not frames:
+        return '', 0, b''
+    return frames[-1]
+
+
+class FrameError(ValueError):
+    """Raised by FrameDecoder when the byte stream cannot be framed."""
+
+
+class FrameTooLargeError(FrameError):
+    """Raised when a frame announces a payload larger than max_frame_size."""
+
+
+class MalformedFrameError(FrameError):
+    """Raised when a frame header or terminator does not follow the protocol."""
+
+
+class FrameDecoder:
     """
-    Input newly received data to the unpacker, returns a list of parsed (purpose, length, payload) tuples.
+    Stateful stream decoder for 'PURPOSE <length> <payload>\\n' frames.
+
+    One decoder belongs to one TCP connection. Bytes from every recv() are fed
+    into the same buffer, so frames that were coalesced into one segment are all
+    returned and frames that span several reads are completed on a later feed.
+    Binary frames (see BinaryCodec) are recognised by their first byte and may be
+    mixed with ASCII frames, so no switch is needed when a peer changes format.
+
+    Attributes:
+        max_frame_size (int): Largest payload in bytes that is accepted.
+        buffer (bytearray): Bytes received but not yet decoded.
     """
-    buffer += data
-    purpose = ''
-    length = 0
-    payload = b''
 
-    while True:
-        try:
-            # 1. Find first space
-            first_space = buffer.index(b' ')
-            # 2. Find second space
-            second_space = buffer.index(b' ', first_space + 1)
-            # 3. Extract purpose and length
-            purpose = buffer[:first_space].decode('ascii')
-            length_str = buffer[first_space + 1:second_space].decode('ascii')
-            length = int(length_str)
-
-            # 4. Find payload end (payload must end with \n)
-            # payload start position: second_space + 1
+    DEFAULT_MAX_FRAME_SIZE = 2 * 1024 * 1024  # 2mb, see HangUp.PAYLOAD_LIMIT_EXCEEDED
+    MAX_HEADER_SIZE = 64  # 'PURPOSE <length> ' never gets longer than this
+
+    def __init__(self, max_frame_size=DEFAULT_MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+        self._needed = 0  # Bytes still missing for the incomplete frame at the read position
+
+    def feed(self, data: bytes):
+        """
+        Append received bytes and decode every complete frame.
+
+        Args:
+            data (bytes): Bytes returned by recv().
+
+        Returns:
+            list: Parsed (purpose, length, payload) tuples, possibly empty.
+
+        Raises:
+            FrameTooLargeError: A frame announces a payload over max_frame_size.
+            MalformedFrameError: The header or the trailing newline is invalid.
+        """
+        buffer = self.buffer
+        buffer += data
+        frames, consumed = self._parse(buffer, 0, len(buffer))
+        # Deleting a prefix of a bytearray only moves its start offset
+        del buffer[:consumed]
+        return frames
+
+    def receive(self, sock, bufsize=4096):
+        """
+        Read once from a stream socket and decode.
+
+        Args:
+            sock (socket): Connected TCP socket.
+            bufsize (int): Maximum number of bytes to read.
+
+        Returns:
+            list | None: Parsed frames, or None when the peer closed the connection.
+        """
+        data = sock.recv(bufsize)
+        if not data:
+            return None
+        return self.feed(data)
+
+    def reset(self):
+        """Drop any partially received frame."""
+        self.buffer.clear()
+        self._needed = 0
+
+    def _payload(self, start, end):
+        return bytes(self.buffer[start:end])
+
+    def _parse(self, buffer, pos, end):
+        """Parse frames in buffer[pos:end], return (frames, new read position)."""
+        frames = []
+        self._needed = 0
+
+        while pos < end:
+            if buffer[pos] & BINARY_FLAG:
+                frame = self._parse_binary(buffer, pos, end)
+                if frame is None:
+                    break
+                purpose, length, payload, pos = frame
+                wire_logger.record('receive', purpose, payload, depth=None)
+                frames.append((purpose, length, payload))
+                continue
+
+            # 1. Header is 'PURPOSE <length> ', wait until both spaces arrived
+            limit = min(end, pos + self.MAX_HEADER_SIZE)
+            first_space = buffer.find(b' ', pos, limit)
+            second_space = buffer.find(b' ', first_space + 1, limit) if first_space > pos else -1
+            if second_space < 0:
+                if limit - pos >= self.MAX_HEADER_SIZE or first_space == pos:
+                    raise MalformedFrameError("Package format error, invalid header")
+                break
+
+            # 2. Extract purpose and length
+            try:
+                purpose = buffer[pos:first_space].decode('ascii')
+                length = int(buffer[first_space + 1:second_space])
+            except ValueError:
+                raise MalformedFrameError("Package format error, invalid header")
+            if length < 0:
+                raise MalformedFrameError("Package format error, negative length")
+            if length > self.max_frame_size:
+                raise FrameTooLargeError(f"Payload of {length} bytes exceeds limit of {self.max_frame_size} bytes")
+
+            # 3. Wait for payload and trailing \n
             payload_end = second_space + 1 + length
-            # Must ensure buffer has enough data (including trailing \n)
-            if len(buffer) < payload_end + 1:
-                break  # Not enough data, wait for next time
+            if end < payload_end + 1:
+                self._needed = payload_end + 1 - end
+                break
+            if buffer[payload_end] != 0x0A:
+                raise MalformedFrameError("Package format error, payload does not end with newline")
 
-            payload = buffer[second_space + 1:payload_end]
-            if buffer[payload_end:payload_end + 1] != b'\n':
-                # Protocol mismatch
-                raise ValueError("Package format error, payload does not end with newline")
+            payload = self._payload(second_space + 1, payload_end)
+            pos = payload_end + 1
 
-            # Move buffer
-            buffer = buffer[payload_end + 1:]
-            
-            # Log immediately after successful unpacking
-            log_message_receive_safe(purpose, payload)
-            
-        except ValueError:
-            break  # Cannot find space, etc., indicating incomplete header
+            wire_logger.record('receive', purpose, payload, depth=None)
+            frames.append((purpose, length, payload))
+
+        return frames, pos
 
-    return purpose, length, payload
+    def _parse_binary(self, buffer, pos, end):
+        """Parse one binary frame at pos, return (purpose, length, payload, next pos) or None if incomplete."""
+        code = buffer[pos] & 0x7F
+        if not 0 < code <= len(PURPOSES):
+            raise MalformedFrameError(f"Package format error, unknown purpose code {code}")
 
-def log_message_send_safe(purpose, payload):
+        # Varint length, seven bits per byte, high bit marks continuation
+        length = 0
+        shift = 0
+        index = pos + 1
+        while True:
+            if index >= end:
+                return None
+            byte = buffer[index]
+            length |= (byte & 0x7F) << shift
+            index += 1
+            if not byte & 0x80:
+                break
+            shift += 7
+            if shift > 63:
+                raise MalformedFrameError("Package format error, varint length too long")
+        if length > self.max_frame_size:
+            raise FrameTooLargeError(f"Payload of {length} bytes exceeds limit of {self.max_frame_size} bytes")
+
+        payload_end = index + length
+        if end < payload_end:
+            self._needed = payload_end - end
+            return None
+        return PURPOSES[code - 1], length, self._payload(index, payload_end), payload_end
+
+
+class ZeroCopyFrameDecoder(FrameDecoder):
     """
-    Safely log sent message information without causing import errors.
-    
+    FrameDecoder that parses in place and returns payloads as memoryviews.
+
+    Bytes are received straight into a reusable bytearray with recv_into() and
+    frames are parsed between a read and a write offset, so neither the stream
+    nor the payloads are copied. The buffer is only compacted or grown when a
+    frame does not fit, and grows to the full frame size as soon as the header
+    of a large frame is known.
+
+    Returned payload views stay valid until the next receive() or feed() call.
+    Code that keeps a payload longer must copy it with bytes().
+
+    Attributes:
+        read_pos (int): Offset of the first byte not yet decoded.
+        write_pos (int): Offset of the first free byte.
+    """
+
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, max_frame_size=FrameDecoder.DEFAULT_MAX_FRAME_SIZE, buffer_size=DEFAULT_BUFFER_SIZE):
+        super().__init__(max_frame_size)
+        self.buffer_size = buffer_size
+        self.buffer = bytearray(buffer_size)
+        self._view = memoryview(self.buffer)
+        self.read_pos = 0
+        self.write_pos = 0
+
+    def feed(self, data):
+        size = len(data)
+        self._reserve(size)
+        self._view[self.write_pos:self.write_pos + size] = data
+        self.write_pos += size
+        return self.decode()
+
+    def receive(self, sock, bufsize=4096):
+        self._reserve(bufsize)
+        received = sock.recv_into(self._view[self.write_pos:])
+        if not received:
+            return None
+        self.write_pos += received
+        return self.decode()
+
+    def decode(self):
+        """Decode every complete frame between read_pos and write_pos."""
+        frames, self.read_pos = self._parse(self.buffer, self.read_pos, self.write_pos)
+        return frames
+
+    def reset(self):
+        self.read_pos = self.write_pos = 0
+        self._needed = 0
+
+    def _payload(self, start, end):
+        return self._view[start:end]
+
+    def _reserve(self, size):
+        """Make room for at least size bytes (or the rest of a known frame) after write_pos."""
+        if self.read_pos == self.write_pos:
+            # Everything was decoded, rewind to reuse the buffer
+            self.read_pos = self.write_pos = 0
+        size = max(size, self._needed)
+        if len(self.buffer) - self.write_pos >= size:
+            return
+        pending = self.write_pos - self.read_pos
+        if pending + size <= len(self.buffer):
+            # Move the incomplete frame to the front, same size so no reallocation
+            self.buffer[:pending] = self.buffer[self.read_pos:self.write_pos]
+        else:
+            buffer = bytearray(max(self.buffer_size, pending + size))
+            buffer[:pending] = self._view[self.read_pos:self.write_pos]
+            self.buffer = buffer
+            self._view = memoryview(buffer)
+        self.read_pos = 0
+        self.write_pos = pending
+
+
+def iter_frames(sock, decoder=None, bufsize=4096):
+    """
+    Receive from a stream socket and yield every decoded frame.
+
+    The generator finishes when the peer closes the connection. Socket errors
+    and FrameError are propagated to the caller.
+
     Args:
-        purpose (str): The message purpose/type.
-        payload (bytes): The message payload data.
+        sock (socket): Connected TCP socket.
+        decoder (FrameDecoder, optional): Decoder holding this connection's state.
+        bufsize (int): Maximum number of bytes per recv() call.
+
+    Yields:
+        tuple: (purpose, length, payload) for each complete frame.
     """
-    try:
-        # 完全过滤ping/pong消息，不在ChatHistory中显示
-        if purpose in ['PING', 'PONG']:
+    if decoder is None:
+        decoder = FrameDecoder()
+    while True:
+        frames = decoder.receive(sock, bufsize)
+        if frames is None:
             return
-            
-        # 获取调用栈信息，找到调用Packing的代码行号
-        frame = inspect.currentframe()
-        if frame and frame.f_back:
-            # 尝试不同的调用栈层次
-            caller_frame = frame.f_back  # 先尝试一层
-            if caller_frame.f_code.co_name == 'Packing' and caller_frame.f_back:
-                caller_frame = caller_frame.f_back  # 如果是从Packing调用的，再往上一层
-            
-            line_number = caller_frame.f_lineno
-            filename = caller_frame.f_code.co_filename.split('\\')[-1]  # 获取文件名
-            
-            # 构造详细的日志消息
-            payload_size = len(payload) if payload else 0
-            
-            # 获取payload的实际内容
-            payload_content = get_payload_content(payload, purpose)
-            
-            # 构造日志消息
-            log_text = f"[send] [{filename}:{line_number}] '{purpose} {payload_size} <{payload_content}>'"
-            
-            # 智能双重输出：检测运行环境
-            try:
-                try:
-                    from server.modern_server_ui import global_ms as modern_global_ms
-                    modern_global_ms.message_log_signal.emit(log_text)
-                except ImportError:
-                    from server.server_ui import global_ms
-                    global_ms.message_log_signal.emit(log_text)
-            except (ImportError, AttributeError, Exception):
-                # 导入失败或其他错误，直接输出到控制台
-                print(log_text)
-    except Exception as e:
-        # 如果出现任何错误，静默忽略，不影响正常的消息处理
-        pass
-
-def log_message_receive_safe(purpose, payload):
-    """
-    Safely log received message information without causing import errors.
-    
+        yield from frames
+
+def format_wire_record(direction, purpose, payload, filename, line):
+    """
+    Format one logged frame. Runs on the wire logging thread, never on the send/receive path.
+
     Args:
+        direction (str): 'send' or 'receive'.
         purpose (str): The message purpose/type.
         payload (bytes): The message payload data.
+        filename (str | None): Source file that sent the frame.
+        line (int): Line in filename.
+
+    Returns:
+        str: The log line shown in the server UI or on the console.
     """
-    try:
-        # 完全过滤ping/pong消息，不在ChatHistory中显示
-        if purpose in ['PING', 'PONG']:
-            return
-            
-        # 获取调用栈信息
-        frame = inspect.currentframe()
-        if frame and frame.f_back:
-            # 尝试不同的调用栈层次
-            caller_frame = frame.f_back  # 先尝试一层
-            if caller_frame.f_code.co_name == 'Unpacking' and caller_frame.f_back:
-                caller_frame = caller_frame.f_back  # 如果是从Unpacking调用的，再往上一层
-            
-            line_number = caller_frame.f_lineno
-            filename = caller_frame.f_code.co_filename.split('\\')[-1]  # 获取文件名
-            
-            # 构造详细的日志消息
-            payload_size = len(payload) if payload else 0
-            
-            # 获取payload的实际内容
-            payload_content = get_payload_content(payload, purpose)
-            
-            # 构造日志消息
-            log_text = f"[receive] [{filename}:{line_number}] '{purpose} {payload_size} <{payload_content}>'"
-            
-            # 智能双重输出：检测运行环境
-            try:
-                try:
-                    from server.modern_server_ui import global_ms as modern_global_ms
-                    modern_global_ms.message_log_signal.emit(log_text)
-                except ImportError:
-                    from server.server_ui import global_ms
-                    global_ms.message_log_signal.emit(log_text)
-            except (ImportError, AttributeError, Exception):
-                # 导入失败或其他错误，直接输出到控制台
-                print(log_text)
-    except Exception as e:
-        # 如果出现任何错误，静默忽略，不影响正常的消息处理
-        pass
+    location = ''
+    if filename:
+        location = f"[{filename.replace(chr(92), '/').rsplit('/', 1)[-1]}:{line}] "
+    payload_content = get_payload_content(payload, purpose)
+    return f"[{direction}] {location}'{purpose} {len(payload)} <{payload_content}>'"
 
 def get_payload_content(payload, purpose=None):
     """
@@ -230,7 +559,10 @@ def parse_protobuf_content(payload, purpose):
     """
     try:
         # 动态导入避免循环导入
-        import Message_pb2
+        try:
+            from proto import Message_pb2
+        except ImportError:
+            import Message_pb2
         
         if purpose == 'MESSAGE':
             msg = Message_pb2.ChatMessage()
@@ -557,3 +889,7 @@ def get_safe_payload_preview(purpose, payload):
             
     except Exception:
         return ""
+
+
+# Shared by every Packing/Unpacking call in this process, off unless IK_WIRE_LOG or configure() enables it
+wire_logger = WireLogger(format_wire_record, level=level_from_environment())
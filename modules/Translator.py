@@ -1,10 +1,70 @@
-from langdetect import detect
-from deep_translator import GoogleTranslator
+import atexit
+import os
+from modules.translation_cache import TranslationCache, ENV_VAR as CACHE_ENV_VAR
+from modules.translation_backends import TranslationBackend, backend_from_environment, create_backend
+
+# Translations shared by everything in this process, persisted when IK_TRANSLATION_CACHE names a file
+translation_cache = TranslationCache(path=os.environ.get(CACHE_ENV_VAR) or None)
+if translation_cache.path:
+    atexit.register(translation_cache.save)
+
+language_map = {
+    'Deutsch': 'de',
+    'English': 'en',
+    'Chinese': 'zh-CN',
+    'Türkçe': 'tr',
+    'Original': None  # Add Original option, means no translation
+}
+
+
+# Backend all translations of this process go to, preset with IK_TRANSLATION_BACKEND
+translation_backend = backend_from_environment()
+
+
+def set_backend(backend):
+    """
+    Select the backend translator() and the server's translation workers use.
+
+    Switching to a different backend clears translation_cache, its entries came from the former one.
+
+    Args:
+        backend (TranslationBackend | str): The backend, or a specification such as 'dictionary:0.2'.
+
+    Returns:
+        TranslationBackend: The selected backend.
+
+    Raises:
+        ValueError: If the specification is invalid.
+    """
+    global translation_backend
+    if not isinstance(backend, TranslationBackend):
+        backend = create_backend(backend)
+    if backend.name != translation_backend.name:
+        translation_cache.clear()
+    translation_backend = backend
+    return backend
+
+
+def backend_translate(text: str, target_lang: str):
+    """
+    Translate text with the selected backend, raising on errors so that failures are not cached.
+
+    Args:
+        text (str): The text to be translated.
+        target_lang (str): The target language code, e.g. 'de'.
+
+    Returns:
+        str: The translated text.
+    """
+    return translation_backend.translate(text, target_lang)
+
 
 def translator(text: str, language: str):
     """
-    Translate text to the specified language using Google Translate.
-    
+    Translate text to the specified language with the selected backend, Google Translate by default.
+
+    Translations are looked up in translation_cache first.
+
     Args:
         text (str): The text to be translated.
         language (str): The target language for translation. Supported values:
@@ -13,36 +73,20 @@ def translator(text: str, language: str):
             - 'Chinese': Chinese (Simplified)
             - 'Türkçe': Turkish
             - 'Original': No translation (returns original text)
-    
+
     Returns:
         str: The translated text, or the original text if translation fails or is not needed.
     """
-    language_map = {
-        'Deutsch': 'de',
-        'English': 'en',
-        'Chinese': 'zh-CN',
-        'Türkçe': 'tr',
-        'Original': None  # Add Original option, means no translation
-    }
-    
     try:
         target_lang = language_map.get(language)
-        
+
         # If Original is selected or mapping does not exist, return the original text
         if target_lang is None:
             return text
-            
-        detected_lang = detect(text)
-        
-        # If the detected language is the same as the target language, return the original text
-        if detected_lang == target_lang:
-            return text
-        else:
-            # Perform translation
-            translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
-            return translated if translated else text
-            
+
+        return translation_cache.translate(text, target_lang, backend_translate)
+
     except Exception as e:
         # Return the original text if translation fails
         print(f"Translation error: {e}")
-        return text
\ No newline at end of file
+        return text
@@ -7,6 +7,9 @@ Main Components:
 - PackingandUnpacking.py: Network message serialization and deserialization
 - reminder.py: Reminder management system with priority queue support
 - Translator.py: Multi-language translation service using Google Translate
+- translation_cache.py: LRU/TTL cache of translations with optional persistence
+- translation_backends.py: Google, offline dictionary and no-op translation backends
+- language_detection.py: Memoized language detection with a script fast path
 - tips_widget.py: Demo application for testing notification widgets
 - demo_reminder.py: Demonstration application for reminder functionality
 
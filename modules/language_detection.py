@@ -0,0 +1,194 @@
+"""
+Language detection
+
+The Google backend asks for the language of every text before translating,
+to return texts that already are in the target language unchanged. Calling
+langdetect for that is slow, its first call loads all language profiles, and
+its results for short texts change from call to call because it samples at
+random. LanguageDetector puts three layers in front of it:
+
+- Script fast path: texts without letters have no language, and texts
+  mostly written in a script that belongs to one language are decided by
+  their characters alone, e.g. Han characters without kana mean Chinese,
+  kana means Japanese, and Hangul means Korean. A Latin line with a few such
+  characters, a name or a single word, is left to langdetect
+- Memo: the result per normalized text (lower-cased, whitespace collapsed)
+  is kept in a bounded LRU, chat lines repeat a lot. langdetect gets the
+  normalized text as well, so a memo entry is exactly what langdetect said
+  about its key
+- Deterministic langdetect: DetectorFactory.seed is fixed, so the same text
+  always gets the same language. preload() loads the profiles up front, the
+  server calls it when it starts its translation workers
+
+Detected languages use the codes of the translation backends, langdetect's
+'zh-cn' and 'zh-tw' become 'zh-CN' and 'zh-TW'.
+
+Main classes:
+- LanguageDetector: Memoized language detection with a script fast path
+"""
+
+import time
+import unicodedata
+from collections import OrderedDict
+from threading import Lock
+
+SEED = 0  # DetectorFactory.seed, makes langdetect deterministic
+MAX_MEMO = 10_000  # Normalized texts whose language is remembered
+
+# langdetect code -> code of the translation backends
+CODE_MAP = {'zh-cn': 'zh-CN', 'zh-tw': 'zh-TW'}
+
+# Share of the letters a script needs to decide the language of a text with Latin letters
+DOMINANT_SHARE = 2 / 3
+
+
+def script_language(text):
+    """
+    Decide the language of a text by its script.
+
+    Only a script that is dominant decides: the text has no Latin letters, or
+    at least DOMINANT_SHARE of its letters are Han, kana or Hangul.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        tuple: (decided, language). decided is False when the script does not tell the language,
+            language is None for texts without letters.
+    """
+    han = kana = hangul = latin = letters = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        letters += 1
+        if char < 'ɐ':  # Latin letters, the common case
+            latin += 1
+            continue
+        code = ord(char)
+        if 0x3040 <= code <= 0x30FF:
+            kana += 1
+        elif 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF:
+            hangul += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF or 0xF900 <= code <= 0xFAFF:
+            han += 1
+    if not letters:
+        return True, None
+    asian = kana + hangul + han
+    if not asian or (latin and asian < letters * DOMINANT_SHARE):
+        return False, None
+    if kana:
+        return True, 'ja'
+    if hangul:
+        return True, 'ko'
+    return True, 'zh-CN'
+
+
+def normalize(text):
+    """Return the memo key of a text, which is also what langdetect sees: NFC, lower-cased, whitespace collapsed."""
+    # lower() rather than casefold(), which turns 'ß' into 'ss' and hides it from langdetect
+    return ' '.join(unicodedata.normalize('NFC', text).lower().split())
+
+
+class LanguageDetector:
+    """
+    Memoized language detection with a script fast path.
+
+    Attributes:
+        max_memo (int): Normalized texts remembered at most.
+        seed (int): Seed of langdetect's random sampling.
+        calls (int): Calls of detect().
+        fast_path (int): Calls decided by the script fast path.
+        memo_hits (int): Calls answered from the memo.
+        langdetect_calls (int): Calls that went to langdetect.
+        langdetect_seconds (float): Time spent in langdetect.
+    """
+
+    def __init__(self, max_memo=MAX_MEMO, seed=SEED):
+        self.max_memo = max_memo
+        self.seed = seed
+        self.calls = 0
+        self.fast_path = 0
+        self.memo_hits = 0
+        self.langdetect_calls = 0
+        self.langdetect_seconds = 0.0
+        self._memo = OrderedDict()  # normalized text -> language, oldest first
+        self._lock = Lock()
+        self._factory = None
+
+    def preload(self):
+        """Load langdetect's language profiles now instead of on the first detection"""
+        with self._lock:
+            if self._factory is not None:
+                return
+            from langdetect import DetectorFactory
+            from langdetect import detector_factory
+
+            DetectorFactory.seed = self.seed
+            detector_factory.init_factory()
+            self._factory = detector_factory._factory
+
+    def detect(self, text):
+        """
+        Detect the language of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            str | None: Language code such as 'de' or 'zh-CN', None if the text has no letters.
+
+        Raises:
+            langdetect.LangDetectException: If langdetect cannot tell the language.
+        """
+        self.calls += 1
+        decided, language = script_language(text)
+        if decided:
+            self.fast_path += 1
+            return language
+        key = normalize(text)
+        with self._lock:
+            language = self._memo.get(key)
+            if language is not None:
+                self._memo.move_to_end(key)
+                self.memo_hits += 1
+                return language
+        if self._factory is None:
+            self.preload()
+        start = time.perf_counter()
+        detector = self._factory.create()
+        detector.append(key)
+        detected = detector.detect()
+        language = CODE_MAP.get(detected, detected)
+        with self._lock:
+            self.langdetect_calls += 1
+            self.langdetect_seconds += time.perf_counter() - start
+            self._memo[key] = language
+            if len(self._memo) > self.max_memo:
+                self._memo.popitem(last=False)
+        return language
+
+    def stats(self):
+        """
+        Return the detection counters.
+
+        Returns:
+            dict: calls, fast_path, memo_hits, langdetect_calls, memo entries and
+                the average langdetect time in ms.
+        """
+        return {
+            'calls': self.calls,
+            'fast_path': self.fast_path,
+            'memo_hits': self.memo_hits,
+            'langdetect_calls': self.langdetect_calls,
+            'memo': len(self._memo),
+            'langdetect_ms': self.langdetect_seconds * 1000 / self.langdetect_calls if self.langdetect_calls else 0.0,
+        }
+
+
+# Detector shared by the translation backends of this process
+language_detector = LanguageDetector()
+
+
+def detect_language(text):
+    """Detect the language of a text with the shared detector, see LanguageDetector.detect()."""
+    return language_detector.detect(text)
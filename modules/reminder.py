@@ -1,10 +1,137 @@
 import time
 import heapq
 import threading
-from threading import Thread, Lock
+from collections import deque
+from itertools import count
+from threading import Thread, Lock, Condition
 from proto import Message_pb2
 from modules.PackingandUnpacking import *
 
+WHEEL_TICK = 0.1  # Seconds per tick of ReminderManagerWheel, reminders fire at most this late
+WHEEL_LEVELS = (256, 64, 64, 64, 64)  # Slots per wheel level, powers of two, 2**32 ticks in total
+
+class ReminderDispatcher:
+    """
+    Dispatch stage of the reminder managers
+    The scheduler of a manager only pops due reminders and submits them in batches, this
+    stage sends them on its own thread, so no scheduler lock is held while sending and a
+    slow connection never delays add_reminder() or the next due reminders.
+    The reminders of a batch are grouped by destination: every local user gets all of its
+    reminders in one go, every remote server the reminders of all of its users, looked up
+    once per destination. Each reminder is queued as a frame of its own and only the
+    queued ones are counted as delivered. Recipients are userId for local users or userId@serverId for users of
+    another server, which is forwarded to through its server link.
+    """
+    
+    def __init__(self, server_socket_ref, tag):
+        self.server_socket = server_socket_ref
+        self.tag = tag  # Log prefix of the manager, e.g. 'ReminderHeap'
+        self.delivered = 0  # Reminders queued to local users
+        self.forwarded = 0  # Reminders queued to other servers
+        self.undeliverable = 0  # Reminders of offline users or unreachable servers
+        self.batches = deque()  # Submitted lists of (user_id, event)
+        self.batches_cond = Condition()
+        self.running = False
+        self.worker_thread = None
+    
+    def start(self):
+        """Start the dispatch thread"""
+        if self.running:
+            return
+        self.running = True
+        self.worker_thread = Thread(target=self._worker_loop, name=f'{self.tag}Dispatch', daemon=True)
+        self.worker_thread.start()
+    
+    def stop(self):
+        """Stop the dispatch thread once it sent the batches submitted so far"""
+        with self.batches_cond:
+            self.running = False
+            self.batches_cond.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+    
+    def submit(self, due):
+        """Queue a batch of due reminders, a list of (user_id, event), for sending"""
+        with self.batches_cond:
+            self.batches.append(due)
+            self.batches_cond.notify()
+    
+    def dispatch(self, due):
+        """Group a batch of due reminders by destination and send them destination by destination"""
+        # userId -> [(serverId or '', event)]
+        by_user = {}
+        for user_id, event in due:
+            target_user_id, _, target_server_id = user_id.partition('@')
+            by_user.setdefault(target_user_id, []).append((target_server_id, event))
+        
+        # Users on this server get their reminders directly, the others are grouped by home server
+        connections = self.server_socket.local_connections(list(by_user))
+        by_server = {}  # serverId -> [(userId, event)]
+        for target_user_id, items in by_user.items():
+            connection = connections.get(target_user_id)
+            if connection is not None:
+                payloads = [self._payload(target_user_id, self.server_socket.server_id, event) for _, event in items]
+                sent = self._send(connection, payloads)
+                self.delivered += sent
+                self.undeliverable += len(payloads) - sent
+                if sent:
+                    print(f"[{self.tag}] Sent {sent} reminder(s) to local user {target_user_id}")
+                if sent < len(payloads):
+                    print(f"[{self.tag}] Failed to send {len(payloads) - sent} reminder(s) to local user {target_user_id}")
+                continue
+            for target_server_id, event in items:
+                if target_server_id:
+                    by_server.setdefault(target_server_id, []).append((target_user_id, event))
+                else:
+                    self.undeliverable += 1
+                    print(f"[{self.tag}] User {target_user_id} is offline, skipping reminder: {event}")
+        
+        for target_server_id, items in by_server.items():
+            link = self.server_socket.routes.link(target_server_id)
+            payloads = [self._payload(target_user_id, target_server_id, event) for target_user_id, event in items]
+            sent = self._send(link, payloads) if link is not None else 0
+            self.forwarded += sent
+            self.undeliverable += len(payloads) - sent
+            if sent:
+                print(f"[{self.tag}] Forwarded {sent} reminder(s) to server {target_server_id}")
+            if sent < len(payloads):
+                print(f"[{self.tag}] Target server {target_server_id} not found or not connected, cannot forward {len(payloads) - sent} reminder(s)")
+    
+    @staticmethod
+    def _payload(user_id, server_id, event):
+        reminder_msg = Message_pb2.Reminder()
+        reminder_msg.user.userId = user_id
+        reminder_msg.user.serverId = server_id
+        reminder_msg.reminderContent = event
+        return reminder_msg.SerializeToString()
+    
+    @staticmethod
+    def _send(connection, payloads):
+        """Queue every REMINDER as a frame of its own, returns how many were queued"""
+        sent = 0
+        try:
+            for payload in payloads:
+                if connection.send_frame('REMINDER', payload):
+                    sent += 1
+        except ConnectionError:
+            pass
+        return sent
+    
+    def _worker_loop(self):
+        """Dispatch thread main loop - sends the submitted batches in order"""
+        while True:
+            with self.batches_cond:
+                while self.running and not self.batches:
+                    self.batches_cond.wait()
+                if not self.batches:
+                    return
+                due = self.batches.popleft()
+            try:
+                self.dispatch(due)
+            except Exception as e:
+                print(f"[{self.tag}] Failed to dispatch {len(due)} reminder(s): {e}")
+
+
 class ReminderManagerSimple:
     """
     Option 1: Simple polling reminder manager using list
@@ -76,12 +203,10 @@ class ReminderManagerSimple:
         event = reminder['event']
         
         # Check if user is online
-        with self.server_socket.client_info_lock:
-            if user_id not in self.server_socket.client_info:
-                print(f"[ReminderSimple] User {user_id} is offline, skipping reminder: {event}")
-                return
-            
-            client_socket = self.server_socket.client_info[user_id]['socket']
+        client_socket = self.server_socket.clients.connection(user_id)
+        if client_socket is None:
+            print(f"[ReminderSimple] User {user_id} is offline, skipping reminder: {event}")
+            return
         
         try:
             # Construct REMINDER message
@@ -111,19 +236,32 @@ class ReminderManagerHeap:
     Suitable for large-scale applications with excellent performance
     """
     
-    def __init__(self, server_socket_ref):
+    def __init__(self, server_socket_ref, journal=None):
         self.server_socket = server_socket_ref
         self.reminders = []  # Min heap, stores (trigger_time, user_id, event)
         self.reminders_lock = Lock()  # Thread safety lock
+        self.journal = journal  # ReminderJournal that keeps the reminders across restarts, None for memory only
+        self.reminder_ids = count(1)  # Ids of the reminders in the journal
         self.running = False
         self.worker_thread = None
         self.wake_event = threading.Event()  # For waking up worker thread
+        self.dispatcher = ReminderDispatcher(server_socket_ref, 'ReminderHeap')  # Sends what the worker pops
         
     def start(self):
         """Start reminder service"""
         if self.running:
             return
+        if self.journal is not None:
+            # Re-arm the future reminders of the last run before new ones are added
+            reminders = self.journal.replay()
+            with self.reminders_lock:
+                for reminder_id, user_id, event, trigger_time in reminders:
+                    heapq.heappush(self.reminders, (trigger_time, user_id, event))
+            self.reminder_ids = count(self.journal.last_id + 1)
+            self.journal.start()
+            print(f"[ReminderHeap] Replayed {len(reminders)} reminder(s) from the journal")
         self.running = True
+        self.dispatcher.start()
         self.worker_thread = Thread(target=self._worker_loop, daemon=True)
         self.worker_thread.start()
         print("[ReminderHeap] Reminder service started (priority queue mode)")
@@ -134,6 +272,9 @@ class ReminderManagerHeap:
         self.wake_event.set()  # Wake up worker thread to exit
         if self.worker_thread:
             self.worker_thread.join()
+        self.dispatcher.stop()
+        if self.journal is not None:
+            self.journal.stop()
         print("[ReminderHeap] Reminder service stopped")
     
     def add_reminder(self, user_id, event, countdown_seconds):
@@ -144,6 +285,8 @@ class ReminderManagerHeap:
             # Use heapq.heappush to add reminder to priority queue
             # Heap elements are (trigger_time, user_id, event)
             heapq.heappush(self.reminders, (trigger_time, user_id, event))
+            if self.journal is not None:
+                self.journal.added(next(self.reminder_ids), user_id, event, trigger_time)
         
         # Wake up worker thread to recalculate sleep time
         self.wake_event.set()
@@ -151,131 +294,311 @@ class ReminderManagerHeap:
         print(f"[ReminderHeap] Added reminder: {user_id} - {event} (will remind in {countdown_seconds} seconds)")
     
     def _worker_loop(self):
-        """Worker thread main loop - precise scheduling"""
+        """Worker thread main loop - precise scheduling, pops all due reminders for the dispatch stage"""
         while self.running:
+            due = []
             sleep_duration = None
-            next_reminder = None
             
             with self.reminders_lock:
+                current_time = time.time()
+                # Pop every reminder whose time is up, sending happens outside of the lock
+                while self.reminders and self.reminders[0][0] <= current_time:
+                    trigger_time, user_id, event = heapq.heappop(self.reminders)
+                    due.append((user_id, event))
                 if self.reminders:
-                    # Get the earliest reminder (but don't remove it)
-                    next_reminder = self.reminders[0]
-                    trigger_time = next_reminder[0]
-                    current_time = time.time()
-                    
-                    if current_time >= trigger_time:
-                        # Time is up, process immediately
-                        sleep_duration = 0
-                    else:
-                        # Calculate sleep time needed
-                        sleep_duration = trigger_time - current_time
+                    # Calculate sleep time until the earliest remaining reminder
+                    sleep_duration = self.reminders[0][0] - current_time
             
-            if next_reminder is None:
+            if due:
+                self.dispatcher.submit(due)
+            
+            if sleep_duration is None:
                 # No pending reminders, sleep for a longer time
                 print("[ReminderHeap] No pending reminders, waiting for new tasks...")
                 self.wake_event.wait(timeout=60)  # Wait up to 60 seconds
                 self.wake_event.clear()
                 continue
             
-            if sleep_duration is not None and sleep_duration > 0:
-                # Sleep precisely until reminder time
-                print(f"[ReminderHeap] Waiting {sleep_duration:.1f} seconds before processing next reminder")
-                if self.wake_event.wait(timeout=sleep_duration):
-                    # Woken up early (possibly new reminder added), clear event and loop again
-                    self.wake_event.clear()
-                    continue
-            
-            # Time is up, process reminder
-            with self.reminders_lock:
-                if self.reminders and time.time() >= self.reminders[0][0]:
-                    # Pop the earliest reminder from heap
-                    trigger_time, user_id, event = heapq.heappop(self.reminders)
-                    self._send_reminder(user_id, event)
+            # Sleep precisely until reminder time
+            print(f"[ReminderHeap] Waiting {sleep_duration:.1f} seconds before processing next reminder")
+            if self.wake_event.wait(timeout=sleep_duration):
+                # Woken up early (possibly new reminder added), clear event and loop again
+                self.wake_event.clear()
     
-    def _send_reminder(self, user_id, event):
-        """Send reminder message to user (supports cross-server via homeserver forwarding)"""
-        # Parse user_id, check if it's cross-server format: userId@serverId
-        target_user_id = user_id
-        target_server_id = None
-        
-        if '@' in user_id:
-            target_user_id, target_server_id = user_id.split('@', 1)
+    def get_reminder_count(self):
+        """Get current pending reminder count"""
+        with self.reminders_lock:
+            return len(self.reminders)
+
+
+class _WheelReminder:
+    """One pending reminder of ReminderManagerWheel, also the handle returned by add_reminder()"""
+
+    __slots__ = ('reminder_id', 'user_id', 'event', 'trigger_time', 'tick', 'slot')
+
+    def __init__(self, reminder_id, user_id, event, trigger_time, tick):
+        self.reminder_id = reminder_id
+        self.user_id = user_id
+        self.event = event
+        self.trigger_time = trigger_time
+        self.tick = tick
+        self.slot = None  # Set the reminder is in, None once it fired or was cancelled
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel of entries due at an integer tick, not thread-safe
+
+    Level 0 has one slot per tick, every slot of a higher level covers a whole
+    revolution of the level below. An entry goes into the lowest level whose
+    range reaches its tick, so add() and remove() are O(1) set operations.
+    Whenever a level completes a revolution, the next slot of the level above
+    is cascaded: its entries move down to the slot matching their remaining
+    distance. Every entry moves at most once per level.
+
+    Attributes:
+        current (int): Next tick advance() processes.
+    """
+
+    def __init__(self, current=0, levels=WHEEL_LEVELS):
+        for slots in levels:
+            if slots < 2 or slots & (slots - 1):
+                raise ValueError(f"Slot count {slots} must be a power of two")
+        self.current = current
+        self._levels = [[set() for _ in range(slots)] for slots in levels]
+        self._masks = [slots - 1 for slots in levels]
+        self._shifts = []  # Ticks per slot of each level, as a shift
+        self._spans = []  # Ticks ahead each level reaches
+        shift = 0
+        for slots in levels:
+            self._shifts.append(shift)
+            shift += slots.bit_length() - 1
+            self._spans.append(1 << shift)
+        self._count = 0
+
+    def add(self, entry):
+        """Add an entry due at entry.tick, entries due before current fire with the next tick"""
+        self._place(entry)
+        self._count += 1
+
+    def remove(self, entry):
+        """Remove an entry, returns False if it already fired or was removed"""
+        slot = entry.slot
+        if slot is None:
+            return False
+        slot.discard(entry)
+        entry.slot = None
+        self._count -= 1
+        return True
+
+    def advance(self, target):
+        """
+        Process all ticks up to and including target
+
+        Args:
+            target: Last tick to process
+
+        Returns:
+            list: The entries due at those ticks, in no particular order
+        """
+        due = []
+        if not self._count:
+            # Nothing to fire or to cascade, skip the idle ticks at once
+            self.current = max(self.current, target + 1)
+            return due
+        level0 = self._levels[0]
+        mask0 = self._masks[0]
+        while self.current <= target:
+            index = self.current & mask0
+            if index == 0:
+                self._cascade()
+            slot = level0[index]
+            if slot:
+                for entry in slot:
+                    entry.slot = None
+                due.extend(slot)
+                self._count -= len(slot)
+                level0[index] = set()
+            self.current += 1
+            if not self._count:
+                self.current = max(self.current, target + 1)
+                break
+        return due
+
+    def __len__(self):
+        return self._count
+
+    def _place(self, entry):
+        delta = entry.tick - self.current
+        if delta < 0:
+            delta = 0
+        for level, span in enumerate(self._spans):
+            if delta < span:
+                tick = self.current + delta
+                break
+        else:
+            # Further away than the wheel reaches, park it in the farthest slot, cascading puts it back
+            tick = self.current + self._spans[-1] - 1
+        slot = self._levels[level][(tick >> self._shifts[level]) & self._masks[level]]
+        slot.add(entry)
+        entry.slot = slot
+
+    def _cascade(self):
+        """Move the entries of the next slot of each completed level down, current starts a level 0 revolution"""
+        for level in range(1, len(self._levels)):
+            index = (self.current >> self._shifts[level]) & self._masks[level]
+            slot = self._levels[level][index]
+            if slot:
+                self._levels[level][index] = set()
+                for entry in slot:
+                    self._place(entry)
+            if index:
+                # This level did not complete a revolution, the ones above did not move either
+                break
+
+
+class ReminderManagerWheel:
+    """
+    Option 3: Hierarchical timing wheel reminder manager
+    Suitable for very many pending reminders: O(1) add and cancel, and every tick
+    fires all reminders that became due in one batch, with one wake-up
+    """
+    
+    def __init__(self, server_socket_ref, tick=WHEEL_TICK, levels=WHEEL_LEVELS, clock=time.time, journal=None):
+        self.server_socket = server_socket_ref
+        self.tick = tick  # Seconds per tick
+        self.clock = clock  # Wall-clock time, trigger times are absolute
+        self.fired = 0  # Reminders fired so far
+        self.cancelled = 0  # Reminders cancelled so far
+        self.wheel = TimingWheel(self._tick_of(clock()), levels)
+        self.wheel_cond = Condition()  # Guards the wheel, the worker waits on it while it is empty
+        self.dispatcher = ReminderDispatcher(server_socket_ref, 'ReminderWheel')  # Sends the fired batches
+        self.journal = journal  # ReminderJournal that keeps the reminders across restarts, None for memory only
+        self.reminder_ids = count(1)  # Ids of the reminders, also in the journal
+        self.running = False
+        self.worker_thread = None
         
-        # First check if target user is on this server
-        with self.server_socket.client_info_lock:
-            if target_user_id in self.server_socket.client_info:
-                # Local server user, send directly
-                client_socket = self.server_socket.client_info[target_user_id]['socket']
-                try:
-                    reminder_msg = Message_pb2.Reminder()
-                    reminder_msg.user.userId = target_user_id
-                    reminder_msg.user.serverId = self.server_socket.server_id
-                    reminder_msg.reminderContent = event
-                    
-                    payload = reminder_msg.SerializeToString()
-                    tosend = Packing('REMINDER', payload)
-                    client_socket.send(tosend)
-                    
-                    print(f"[ReminderHeap] Sent reminder to local user {target_user_id}: {event}")
-                    return
-                    
-                except Exception as e:
-                    print(f"[ReminderHeap] Failed to send reminder to local user {target_user_id}: {e}")
-                    return
+    def start(self):
+        """Start reminder service"""
+        if self.running:
+            return
+        if self.journal is not None:
+            # Re-arm the future reminders of the last run before new ones are added
+            reminders = self.journal.replay()
+            with self.wheel_cond:
+                for reminder_id, user_id, event, trigger_time in reminders:
+                    self.wheel.add(_WheelReminder(reminder_id, user_id, event, trigger_time, self._tick_after(trigger_time)))
+            self.reminder_ids = count(self.journal.last_id + 1)
+            self.journal.start()
+            print(f"[ReminderWheel] Replayed {len(reminders)} reminder(s) from the journal")
+        self.running = True
+        self.dispatcher.start()
+        self.worker_thread = Thread(target=self._worker_loop, name='ReminderWheel', daemon=True)
+        self.worker_thread.start()
+        print("[ReminderWheel] Reminder service started (timing wheel mode)")
+    
+    def stop(self):
+        """Stop reminder service"""
+        with self.wheel_cond:
+            self.running = False
+            self.wheel_cond.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+        self.dispatcher.stop()
+        if self.journal is not None:
+            self.journal.stop()
+        print("[ReminderWheel] Reminder service stopped")
+    
+    def add_reminder(self, user_id, event, countdown_seconds):
+        """
+        Add a new reminder
         
-        # User not on this server, need to forward to target server
-        if target_server_id:
-            print(f"[ReminderHeap] User {target_user_id} is on server {target_server_id}, forwarding reminder")
-            
-            # Construct REMINDER message
-            reminder_msg = Message_pb2.Reminder()
-            reminder_msg.user.userId = target_user_id
-            reminder_msg.user.serverId = target_server_id
-            reminder_msg.reminderContent = event
-            
-            payload = reminder_msg.SerializeToString()
-            tosend = Packing('REMINDER', payload)
-            
-            # Find target server and forward
-            forwarded = False
-            with self.server_socket.server_list_lock:
-                for server_id, server_info in self.server_socket.server_list.items():
-                    if server_id == target_server_id:
-                        server_socket = server_info.get('socket')
-                        if server_socket:
-                            try:
-                                server_socket.send(tosend)
-                                print(f"[ReminderHeap] Forwarded reminder to server {target_server_id} for user {target_user_id}: {event}")
-                                forwarded = True
-                                break
-                            except Exception as e:
-                                print(f"[ReminderHeap] Failed to forward reminder to server {target_server_id}: {e}")
-            
-            if not forwarded:
-                print(f"[ReminderHeap] Target server {target_server_id} not found or not connected, cannot forward reminder for user {target_user_id}: {event}")
-        else:
-            # User offline and no server specified
-            print(f"[ReminderHeap] User {target_user_id} is offline, skipping reminder: {event}")
+        Returns:
+            Handle of the reminder for cancel()
+        """
+        trigger_time = self.clock() + countdown_seconds
+        reminder = _WheelReminder(next(self.reminder_ids), user_id, event, trigger_time, self._tick_after(trigger_time))
+        with self.wheel_cond:
+            self.wheel.add(reminder)
+            if len(self.wheel) == 1:
+                # The worker only sleeps without timeout while the wheel is empty
+                self.wheel_cond.notify()
+            # Under the lock, so a cancel() of this reminder cannot be journaled before it
+            if self.journal is not None:
+                self.journal.added(reminder.reminder_id, user_id, event, trigger_time)
+        return reminder
+    
+    def cancel(self, reminder):
+        """Cancel a reminder by the handle add_reminder() returned, False if it already fired"""
+        with self.wheel_cond:
+            if not self.wheel.remove(reminder):
+                return False
+            self.cancelled += 1
+            if self.journal is not None:
+                self.journal.cancelled(reminder.reminder_id)
+        return True
+    
+    def poll(self):
+        """Fire the reminders that are due, the worker does this every tick. Returns how many fired."""
+        with self.wheel_cond:
+            due = self.wheel.advance(self._tick_of(self.clock()))
+        self._fire(due)
+        return len(due)
     
     def get_reminder_count(self):
         """Get current pending reminder count"""
-        with self.reminders_lock:
-            return len(self.reminders)
+        with self.wheel_cond:
+            return len(self.wheel)
+    
+    def _tick_of(self, when):
+        return int(when // self.tick)
+    
+    def _tick_after(self, when):
+        """Round up, a reminder never fires before its time"""
+        return -int(-when // self.tick)
+    
+    def _fire(self, due):
+        """Hand a batch of due reminders to the dispatch stage, outside of the wheel lock"""
+        if not due:
+            return
+        self.fired += len(due)
+        print(f"[ReminderWheel] Firing {len(due)} due reminder(s)")
+        # Slots are unordered, reminders of the same tick go out in the order of their times
+        due.sort(key=lambda reminder: reminder.trigger_time)
+        self.dispatcher.submit([(reminder.user_id, reminder.event) for reminder in due])
+    
+    def _worker_loop(self):
+        """Worker thread main loop - one wake-up per tick while reminders are pending"""
+        while True:
+            with self.wheel_cond:
+                while self.running and not len(self.wheel):
+                    self.wheel_cond.wait()
+                if not self.running:
+                    return
+                now = self.clock()
+                due = self.wheel.advance(self._tick_of(now))
+                if not due:
+                    self.wheel_cond.wait(self.wheel.current * self.tick - now)
+            self._fire(due)
 
 
 # For convenience, provide a factory function
-def create_reminder_manager(server_socket_ref, use_heap=True):
+def create_reminder_manager(server_socket_ref, use_heap=True, use_wheel=False, journal=None):
     """
     Create reminder manager
     
     Args:
         server_socket_ref: Server socket reference
-        use_heap: True to use priority queue (recommended), False to use simple polling
+        use_heap: True to use priority queue, False to use simple polling
+        use_wheel: True to use the hierarchical timing wheel (recommended for many reminders), overrides use_heap
+        journal: ReminderJournal to keep the reminders across restarts, not supported by simple polling
     
     Returns:
         ReminderManager instance
     """
+    if use_wheel:
+        return ReminderManagerWheel(server_socket_ref, journal=journal)
     if use_heap:
-        return ReminderManagerHeap(server_socket_ref)
+        return ReminderManagerHeap(server_socket_ref, journal=journal)
     else:
         return ReminderManagerSimple(server_socket_ref) 
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+Reminder journal
+
+Pending reminders only lived in the memory of the reminder manager, every
+restart of the server lost them. ReminderJournal keeps them in two files:
+
+- <path>.log: append-only, one JSON line per added or cancelled reminder,
+  [id, user_id, event, trigger_time] and [id]
+- <path>.snapshot: the reminders that were pending at the last compaction, in
+  the same format
+
+Fired reminders are not recorded: their time has passed, and replay and
+compaction drop every reminder whose time has passed anyway.
+
+- fsync batching: added() and cancelled() only append the record to a buffer.
+  A flusher thread encodes the buffered records, writes them and fsyncs the log
+  at most sync_interval
+  seconds after the first buffered record, so the SET_REMINDERs of that time
+  share one fsync. A crash of the machine loses at most the reminders of the
+  last sync_interval seconds, a crash of the process only the unwritten buffer
+- Compaction: once compact_records records were appended, the log is sealed
+  (renamed to <path>.log.sealed) and a new one is started. A background thread
+  folds snapshot and sealed log into a new snapshot of the future reminders,
+  replaces the snapshot atomically and deletes the sealed log, appends go on
+  meanwhile
+- Replay: replay() reads snapshot, sealed log and log, in this order, and
+  returns the reminders still in the future, the ones that came due while the
+  server was down are dropped. It then writes them as the new snapshot and
+  starts an empty log. A torn last line left by a crash is skipped
+
+The server enables the journal with the IK_REMINDER_JOURNAL environment
+variable or its --reminder-journal option, both take the path without
+extension.
+
+Main classes:
+- ReminderJournal: Append-only journal and snapshot of the pending reminders
+"""
+
+import json
+import os
+import time
+from threading import Thread, Condition
+
+ENV_VAR = 'IK_REMINDER_JOURNAL'
+
+SYNC_INTERVAL = 0.05  # Seconds records are collected for one write and fsync
+COMPACT_RECORDS = 100_000  # Records appended to the log before it is compacted
+
+# One encoder for all records, json.dumps() with options would create one per call
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def _fsync_directory(path):
+    """Make a rename in the directory of path durable, where the platform allows it."""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ReminderJournal:
+    """
+    Append-only journal and snapshot of the pending reminders.
+
+    Attributes:
+        path (str): Path of the journal files without extension.
+        sync_interval (float): Seconds records are collected for one fsync.
+        compact_records (int): Records appended to the log before it is compacted.
+        clock (callable): Returns the wall-clock time in seconds, time.time by default.
+        last_id (int): Highest reminder id found by replay(), ids of new reminders must be higher.
+        records (int): Records appended since the journal was opened.
+        syncs (int): Writes of the buffer followed by an fsync.
+        sync_seconds (float): Time spent writing and fsyncing.
+        compactions (int): Compactions finished.
+        replayed (int): Future reminders re-armed by replay().
+        expired (int): Reminders replay() dropped because their time had passed.
+    """
+
+    def __init__(self, path, sync_interval=SYNC_INTERVAL, compact_records=COMPACT_RECORDS, clock=time.time):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.compact_records = compact_records
+        self.clock = clock
+        self.last_id = 0
+        self.records = 0
+        self.syncs = 0
+        self.sync_seconds = 0.0
+        self.compactions = 0
+        self.replayed = 0
+        self.expired = 0
+        self.log_path = f'{path}.log'
+        self.sealed_path = f'{path}.log.sealed'
+        self.snapshot_path = f'{path}.snapshot'
+        self._buffer = []  # Records not written yet
+        self._cond = Condition()
+        self._log = None
+        self._since_compaction = 0  # Records written to the current log
+        self._compaction = None  # Thread folding the sealed log, None when idle
+        self.running = False
+        self.worker_thread = None
+
+    def replay(self):
+        """
+        Read the journal, keep the future reminders as the new snapshot and open an empty log.
+
+        Returns:
+            list: (reminder_id, user_id, event, trigger_time) of the future reminders, by trigger time.
+        """
+        reminders = {}
+        for path in (self.snapshot_path, self.sealed_path, self.log_path):
+            self._read(path, reminders)
+        now = self.clock()
+        future = sorted(((reminder_id, user_id, event, trigger_time)
+                         for reminder_id, (user_id, event, trigger_time) in reminders.items() if trigger_time > now),
+                        key=lambda reminder: reminder[3])
+        self.replayed = len(future)
+        self.expired = len(reminders) - len(future)
+        self._write_snapshot(future)
+        for path in (self.sealed_path, self.log_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+        _fsync_directory(self.log_path)
+        return future
+
+    def start(self):
+        """Start the flusher thread, replay() opens the log first"""
+        if self.running:
+            return
+        if self._log is None:
+            raise RuntimeError("replay() must open the reminder journal before it is started")
+        self.running = True
+        self.worker_thread = Thread(target=self._worker_loop, name='ReminderJournal', daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """Write and fsync the buffered records, wait for a running compaction and close the log"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+            self.worker_thread = None
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def added(self, reminder_id, user_id, event, trigger_time):
+        """Record a new reminder, written with the next fsync"""
+        self._append((reminder_id, user_id, event, trigger_time))
+
+    def cancelled(self, reminder_id):
+        """Record that a reminder was cancelled"""
+        self._append((reminder_id,))
+
+    def stats(self):
+        """
+        Return the journal counters.
+
+        Returns:
+            dict: records, syncs, records per sync, average sync time in ms, compactions,
+                replayed and expired.
+        """
+        return {
+            'records': self.records,
+            'syncs': self.syncs,
+            'records_per_sync': self.records / self.syncs if self.syncs else 0.0,
+            'sync_ms': self.sync_seconds * 1000 / self.syncs if self.syncs else 0.0,
+            'compactions': self.compactions,
+            'replayed': self.replayed,
+            'expired': self.expired,
+        }
+
+    def _append(self, record):
+        with self._cond:
+            self._buffer.append(record)
+            self.records += 1
+            if len(self._buffer) == 1:
+                # The flusher sleeps while the buffer is empty
+                self._cond.notify()
+
+    def _read(self, path, reminders):
+        """Apply the records of one journal file to reminders, {id: (user_id, event, trigger_time)}."""
+        try:
+            f = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                    reminder_id = record[0]
+                    if len(record) == 1:
+                        reminders.pop(reminder_id, None)
+                        continue
+                    reminders[reminder_id] = (record[1], record[2], record[3])
+                except (ValueError, IndexError, TypeError):
+                    print(f"[ReminderJournal] Skipping unreadable record {number} of {path}")
+                    continue
+                self.last_id = max(self.last_id, reminder_id)
+
+    def _write_snapshot(self, reminders):
+        """Write (reminder_id, user_id, event, trigger_time) records as the snapshot, replacing it atomically."""
+        temp_path = f'{self.snapshot_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(_encode(record) + '\n' for record in reminders)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        _fsync_directory(self.snapshot_path)
+
+    def _write(self, records):
+        start = time.perf_counter()
+        try:
+            self._log.write(''.join([_encode(record) + '\n' for record in records]))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+        except OSError as e:
+            print(f"[ReminderJournal] Cannot write {len(records)} record(s) to {self.log_path}: {e}")
+            return
+        self.syncs += 1
+        self.sync_seconds += time.perf_counter() - start
+        self._since_compaction += len(records)
+
+    def _seal(self):
+        """Start a new log and fold the current one into the snapshot in the background, flusher thread only."""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        if not os.path.exists(self.sealed_path):
+            # A sealed log left by a failed compaction is folded first, the current one waits for the next round
+            self._log.close()
+            os.replace(self.log_path, self.sealed_path)
+            self._log = open(self.log_path, 'a', encoding='utf-8')
+            _fsync_directory(self.log_path)
+        self._since_compaction = 0
+        self._compaction = Thread(target=self._compact, name='ReminderJournalCompaction', daemon=True)
+        self._compaction.start()
+
+    def _compact(self):
+        """Fold snapshot and sealed log into a new snapshot of the future reminders."""
+        try:
+            reminders = {}
+            for path in (self.snapshot_path, self.sealed_path):
+                self._read(path, reminders)
+            now = self.clock()
+            self._write_snapshot((reminder_id, user_id, event, trigger_time)
+                                 for reminder_id, (user_id, event, trigger_time) in reminders.items()
+                                 if trigger_time > now)
+            os.remove(self.sealed_path)
+            self.compactions += 1
+        except OSError as e:
+            print(f"[ReminderJournal] Compaction failed, keeping {self.sealed_path}: {e}")
+
+    def _worker_loop(self):
+        """Flusher main loop - one write and fsync per sync_interval while records come in"""
+        while True:
+            with self._cond:
+                while self.running and not self._buffer:
+                    self._cond.wait()
+                if self.running and self.sync_interval > 0:
+                    # Let more records join this fsync, stop() wakes us up early
+                    self._cond.wait(self.sync_interval)
+                records, self._buffer = self._buffer, []
+                stopping = not self.running
+            if records:
+                self._write(records)
+            if self._since_compaction >= self.compact_records:
+                try:
+                    self._seal()
+                except OSError as e:
+                    print(f"[ReminderJournal] Cannot seal {self.log_path} for compaction: {e}")
+            if stopping:
+                return
+
+
+def journal_from_environment():
+    """Return a journal at the path in IK_REMINDER_JOURNAL, None when it is unset."""
+    path = os.environ.get(ENV_VAR)
+    return ReminderJournal(path) if path else None
@@ -0,0 +1,136 @@
+"""
+Snowflake ID generator
+
+Produces the 64-bit IDs used as messageSnowflake and as request handles
+(QueryUsers, ModifyGroup, InviteToGroup, forwarded searches). An ID is laid
+out as
+
+    | 41 bits milliseconds since EPOCH_MS | 10 bits node | 12 bits sequence |
+
+The node is derived from the serverId and, on clients, the userId, as a
+10-bit hash: without coordination between servers and clients it cannot be
+unique, already a few dozen users share nodes. Within one node the sequence
+numbers the IDs of one millisecond, starting at a random value below
+SEQUENCE_START_SPREAD; when the sequence is exhausted the generator moves on
+to the next millisecond instead of waiting, and it never goes back in time
+when the system clock does. IDs of one generator are therefore unique and
+strictly increasing.
+
+IDs of different producers collide only when their nodes collide, they take
+an ID in the same millisecond and their sequences meet, about 1 in 2048 for
+one ID each. Receivers must not rely on IDs being unique across producers:
+the server tracks acknowledgments by snowflake and author, see
+server/ack_tracker.py. benchmarks/bench_snowflake.py measures the rate.
+
+Usage:
+
+    from modules.snowflake import next_snowflake
+    msg.messageSnowflake = next_snowflake(user.serverId, user.userId)
+
+Main classes:
+- SnowflakeGenerator: Thread-safe ID generator of one node
+"""
+
+import random
+import time
+import zlib
+from threading import Lock
+
+EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+TIMESTAMP_BITS = 41
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+NODE_SHIFT = SEQUENCE_BITS
+TIMESTAMP_SHIFT = SEQUENCE_BITS + NODE_BITS
+
+# The first sequence of a millisecond is random below this, generators sharing a node rarely meet
+SEQUENCE_START_SPREAD = 1 << (SEQUENCE_BITS - 1)
+
+
+def node_id(*parts):
+    """
+    Derive the node number of a producer from its identity.
+
+    Args:
+        *parts (str): Identity of the producer, e.g. serverId and userId.
+
+    Returns:
+        int: Node number between 0 and MAX_NODE, stable across runs.
+    """
+    return zlib.crc32('\0'.join(parts).encode('utf-8')) & MAX_NODE
+
+
+class SnowflakeGenerator:
+    """
+    Thread-safe snowflake ID generator of one node.
+
+    Attributes:
+        node (int): Node number embedded in every ID.
+        epoch_ms (int): Unix time in milliseconds that timestamp 0 stands for.
+        start_spread (int): The first sequence of a millisecond is random below this, 1 to always start at 0.
+        clock (callable): Returns the wall-clock time in nanoseconds, time.time_ns by default.
+    """
+
+    def __init__(self, node=0, epoch_ms=EPOCH_MS, start_spread=SEQUENCE_START_SPREAD, clock=time.time_ns):
+        if not 0 <= node <= MAX_NODE:
+            raise ValueError(f"Node {node} out of range 0..{MAX_NODE}")
+        if not 1 <= start_spread <= MAX_SEQUENCE + 1:
+            raise ValueError(f"Sequence start spread {start_spread} out of range 1..{MAX_SEQUENCE + 1}")
+        self.node = node
+        self.epoch_ms = epoch_ms
+        self.start_spread = start_spread
+        self.clock = clock
+        self._node_bits = node << NODE_SHIFT
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = Lock()
+
+    def next_id(self):
+        """Return a new ID, unique and larger than every ID this generator returned before."""
+        now = self.clock() // 1_000_000 - self.epoch_ms
+        with self._lock:
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = random.randrange(self.start_spread)
+            elif self._sequence < MAX_SEQUENCE:
+                # Same millisecond, or the clock went back: keep counting on the last timestamp
+                self._sequence += 1
+            else:
+                # Sequence exhausted, borrow the next millisecond
+                self._last_ms += 1
+                self._sequence = 0
+            return (self._last_ms << TIMESTAMP_SHIFT) | self._node_bits | self._sequence
+
+    __call__ = next_id
+
+    def parse(self, snowflake):
+        """
+        Split an ID into its fields.
+
+        Returns:
+            tuple: (unix time in milliseconds, node, sequence)
+        """
+        return ((snowflake >> TIMESTAMP_SHIFT) + self.epoch_ms,
+                (snowflake >> NODE_SHIFT) & MAX_NODE,
+                snowflake & MAX_SEQUENCE)
+
+
+_generators = {}
+_generators_lock = Lock()
+
+
+def generator_for(*parts):
+    """Return the shared generator of the node derived from parts, see node_id()."""
+    generator = _generators.get(parts)
+    if generator is None:
+        with _generators_lock:
+            generator = _generators.setdefault(parts, SnowflakeGenerator(node_id(*parts)))
+    return generator
+
+
+def next_snowflake(*parts):
+    """Return a new ID of the node derived from parts, e.g. next_snowflake(serverId, userId)."""
+    return generator_for(*parts).next_id()
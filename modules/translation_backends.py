@@ -0,0 +1,304 @@
+"""
+Translation backends
+
+translator() and the server's translation worker pool do not talk to a
+translation service directly, they call the selected backend:
+
+- google: GoogleTranslator of deep_translator, texts already in the target
+  language are skipped with the detector of modules/language_detection.py
+  (default)
+- dictionary: offline, deterministic word-by-word translation with a small
+  built-in dictionary of chat phrases, unknown words are kept as they are.
+  An artificial latency per call stands in for the HTTP round-trip, so
+  translation throughput, the worker pool and the cache can be load-tested
+  without network access
+- noop: returns every text unchanged
+
+A backend is selected with a specification such as 'google', 'noop' or
+'dictionary:0.2' (0.2 seconds latency per call), see create_backend(). The
+shared backend of modules/Translator.py is preset with the
+IK_TRANSLATION_BACKEND environment variable and the server's
+--translation-backend option.
+
+Backends translate to a language code ('de', 'en', 'zh-CN', 'tr') and raise
+on errors, so failures are never cached. Backends with supports_batch
+translate a list of texts to one language in a single round-trip, the
+server's worker pool then hands them micro-batches, see
+server/translation_service.py. A text of a batch that cannot be translated
+gets its exception in place of the translation, the other texts of the batch
+are not affected.
+
+Main classes:
+- TranslationBackend: Interface of all backends
+- GoogleBackend: Google Translate through deep_translator
+- DictionaryBackend: Offline dictionary stand-in with artificial latency
+- NoopBackend: Leaves texts unchanged
+"""
+
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from modules.language_detection import detect_language
+
+ENV_VAR = 'IK_TRANSLATION_BACKEND'
+DEFAULT_BACKEND = 'google'
+GOOGLE_MAX_CHARS = 5000  # Longest text GoogleTranslator accepts in one request
+
+# Built-in dictionary of the DictionaryBackend, one row per word or phrase: (en, de, zh-CN, tr)
+DICTIONARY_LANGUAGES = ('en', 'de', 'zh-CN', 'tr')
+DICTIONARY = [
+    ('hello', 'hallo', '你好', 'merhaba'),
+    ('hi', 'hi', '嗨', 'selam'),
+    ('bye', 'tschüss', '再见', 'hoşçakal'),
+    ('thanks', 'danke', '谢谢', 'teşekkürler'),
+    ('please', 'bitte', '请', 'lütfen'),
+    ('yes', 'ja', '是', 'evet'),
+    ('no', 'nein', '不', 'hayır'),
+    ('ok', 'ok', '好的', 'tamam'),
+    ('good', 'gut', '好', 'iyi'),
+    ('morning', 'morgen', '早上', 'sabah'),
+    ('night', 'nacht', '晚上', 'gece'),
+    ('today', 'heute', '今天', 'bugün'),
+    ('tomorrow', 'morgen', '明天', 'yarın'),
+    ('meeting', 'besprechung', '会议', 'toplantı'),
+    ('lunch', 'mittagessen', '午饭', 'öğle yemeği'),
+    ('where', 'wo', '哪里', 'nerede'),
+    ('when', 'wann', '什么时候', 'ne zaman'),
+    ('are', 'bist', '是', 'misin'),
+    ('you', 'du', '你', 'sen'),
+    ('i', 'ich', '我', 'ben'),
+    ('we', 'wir', '我们', 'biz'),
+    ('and', 'und', '和', 've'),
+    ('see', 'sehen', '见', 'görüşürüz'),
+    ('later', 'später', '以后', 'sonra'),
+    ('message', 'nachricht', '消息', 'mesaj'),
+    ('group', 'gruppe', '群', 'grup'),
+    ('translation', 'übersetzung', '翻译', 'çeviri'),
+]
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _attempt(translate, text, *args):
+    """Return translate(text, *args), or the exception it raised."""
+    try:
+        return translate(text, *args)
+    except Exception as e:
+        return e
+
+
+class TranslationBackend(ABC):
+    """
+    Interface of all backends.
+
+    Attributes:
+        name (str): Name the backend is selected with.
+        supports_batch (bool): translate_batch() takes one round-trip for all texts, not one per text.
+    """
+
+    name = None
+    supports_batch = False
+
+    @abstractmethod
+    def translate(self, text, language):
+        """
+        Translate a text.
+
+        Args:
+            text (str): The text to translate.
+            language (str): The target language code, e.g. 'de'.
+
+        Returns:
+            str: The translated text.
+
+        Raises:
+            Exception: If the text cannot be translated.
+        """
+
+    def translate_batch(self, texts, language):
+        """
+        Translate several texts to the same language.
+
+        Args:
+            texts (list): The texts to translate.
+            language (str): The target language code.
+
+        Returns:
+            list: The translated texts, in the order of texts. A text that cannot be
+                translated gets the exception raised for it instead.
+
+        Raises:
+            Exception: If none of the texts can be translated, e.g. for an unknown language.
+        """
+        return [_attempt(self.translate, text, language) for text in texts]
+
+    def __call__(self, text, language):
+        return self.translate(text, language)
+
+
+class GoogleBackend(TranslationBackend):
+    """
+    Google Translate through deep_translator, texts detected in the target language and
+    texts without letters are returned as they are.
+
+    A batch is sent as one request with one text per line, and split again at the line breaks.
+    Texts containing line breaks, and batches that fail or whose answer does not have one line
+    per text, are translated one by one, so a failing text only fails itself. Texts longer than
+    GOOGLE_MAX_CHARS are rejected without a request.
+    """
+
+    name = 'google'
+    supports_batch = True
+
+    @staticmethod
+    def needs_translation(text, language):
+        """Return False for texts that are already in the target language or have no letters."""
+        try:
+            detected = detect_language(text)
+        except Exception:
+            # Undecided, let the translator find out
+            return True
+        return detected is not None and detected != language
+
+    def translate(self, text, language):
+        from deep_translator import GoogleTranslator
+
+        if len(text) > GOOGLE_MAX_CHARS:
+            raise ValueError(f"Text of {len(text)} characters exceeds the {GOOGLE_MAX_CHARS} Google Translate accepts")
+        # If the detected language is the same as the target language, return the original text
+        if not self.needs_translation(text, language):
+            return text
+        translated = GoogleTranslator(source='auto', target=language).translate(text)
+        return translated if translated else text
+
+    def translate_batch(self, texts, language):
+        from deep_translator import GoogleTranslator
+
+        results = list(texts)
+        pending = []  # Indexes of the texts that go into the joined request
+        for index, text in enumerate(texts):
+            if '\n' in text or len(text) > GOOGLE_MAX_CHARS:
+                results[index] = _attempt(self.translate, text, language)
+            elif self.needs_translation(text, language):
+                pending.append(index)
+        translator = GoogleTranslator(source='auto', target=language)
+        while pending:
+            # As many texts as fit into one request
+            chunk, size = [], 0
+            while pending and (not chunk or size + len(texts[pending[0]]) + 1 <= GOOGLE_MAX_CHARS):
+                size += len(texts[pending[0]]) + 1
+                chunk.append(pending.pop(0))
+            if len(chunk) == 1:
+                lines = [_attempt(translator.translate, texts[chunk[0]])]
+            else:
+                try:
+                    lines = (translator.translate('\n'.join(texts[index] for index in chunk)) or '').split('\n')
+                except Exception:
+                    # Find the text that failed the request, the others still get their translation
+                    lines = []
+                if len(lines) != len(chunk):
+                    lines = [_attempt(translator.translate, texts[index]) for index in chunk]
+            for index, line in zip(chunk, lines):
+                results[index] = line if line else texts[index]
+        return results
+
+
+class DictionaryBackend(TranslationBackend):
+    """
+    Offline, deterministic word-by-word translation.
+
+    Every word found in the dictionary, in any of its languages, is replaced by
+    its entry in the target language. The result only depends on the text and
+    the language, so it can be cached and compared like a real translation.
+    A batch costs the latency of one call, like one request for all texts.
+
+    Attributes:
+        latency (float): Seconds every call sleeps, in place of a network round-trip.
+        calls (int): Calls of translate() and translate_batch() so far.
+    """
+
+    name = 'dictionary'
+    supports_batch = True
+
+    def __init__(self, latency=0.0, rows=DICTIONARY, languages=DICTIONARY_LANGUAGES):
+        self.latency = latency
+        self.calls = 0
+        self._columns = {language: column for column, language in enumerate(languages)}
+        self._rows = {}  # word in any language -> row
+        for row in rows:
+            for word in row:
+                self._rows.setdefault(word.lower(), row)
+
+    def translate(self, text, language):
+        return self.translate_batch([text], language)[0]
+
+    def translate_batch(self, texts, language):
+        column = self._columns.get(language)
+        if column is None:
+            raise ValueError(f"Language '{language}' is not in the dictionary")
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+
+        def replace(match):
+            word = match.group(0)
+            row = self._rows.get(word.lower())
+            if row is None:
+                return word
+            translated = row[column]
+            return translated[:1].upper() + translated[1:] if word[:1].isupper() else translated
+
+        return [_WORD.sub(replace, text) for text in texts]
+
+
+class NoopBackend(TranslationBackend):
+    """Leaves every text unchanged."""
+
+    name = 'noop'
+    supports_batch = True
+
+    def translate(self, text, language):
+        return text
+
+    def translate_batch(self, texts, language):
+        return list(texts)
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, DictionaryBackend, NoopBackend)}
+
+
+def create_backend(spec):
+    """
+    Create a backend from a specification such as 'google', 'noop' or 'dictionary:0.2'.
+
+    Args:
+        spec (str): Backend name, the dictionary backend takes its latency in seconds after a colon.
+
+    Returns:
+        TranslationBackend: The new backend.
+
+    Raises:
+        ValueError: If the backend is unknown or its latency is not a non-negative number.
+    """
+    name, _, argument = (spec or DEFAULT_BACKEND).strip().lower().partition(':')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend '{name}', expected one of {', '.join(BACKENDS)}")
+    if name == DictionaryBackend.name:
+        latency = float(argument) if argument else 0.0
+        if latency < 0:
+            raise ValueError("Translation backend latency must not be negative")
+        return DictionaryBackend(latency)
+    if argument:
+        raise ValueError(f"Translation backend '{name}' takes no argument")
+    return BACKENDS[name]()
+
+
+def backend_from_environment():
+    """Return the backend preset in IK_TRANSLATION_BACKEND, the Google backend when it is unset or invalid."""
+    spec = os.environ.get(ENV_VAR, DEFAULT_BACKEND)
+    try:
+        return create_backend(spec)
+    except ValueError as e:
+        print(f"[Translator] Ignoring {ENV_VAR}: {e}")
+        return create_backend(DEFAULT_BACKEND)
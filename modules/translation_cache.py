@@ -0,0 +1,276 @@
+"""
+Translation cache
+
+Group chats repeat the same phrases over and over, and the client translates
+its own message once more for local display. Every one of those used to be a
+new round-trip to the translation backend. TranslationCache remembers
+translations keyed by (text, target language code):
+
+- LRU: the least recently used entries are evicted once the cached texts
+  exceed max_bytes (UTF-8 size of text and translation plus a fixed overhead
+  per entry)
+- TTL: an entry is only served for ttl seconds after it was stored
+- Persistence: with a path, the entries are loaded on creation and written
+  back by save(), so a restarted server or client starts warm
+- Counters: hits, misses, evictions, expirations and the time spent in
+  lookups and in the backend on misses, see stats()
+
+Failed translations raise out of translate() and are never cached.
+
+The cache shared by the server and the client lives in modules/Translator.py.
+Persistence for it is enabled with the IK_TRANSLATION_CACHE environment
+variable, set to the path of the cache file.
+
+Main classes:
+- TranslationCache: Thread-safe LRU/TTL cache of translated texts
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+ENV_VAR = 'IK_TRANSLATION_CACHE'
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024  # Texts and translations cached at most
+DEFAULT_TTL = 24 * 3600.0  # Seconds an entry is served after it was stored
+ENTRY_OVERHEAD = 100  # Bytes counted per entry for the key, the list node and the tuple
+
+
+class TranslationCache:
+    """
+    Thread-safe LRU/TTL cache of translated texts.
+
+    Attributes:
+        max_bytes (int): Size limit of all cached entries.
+        ttl (float): Seconds an entry is served after it was stored.
+        path (str | None): File the entries are persisted to, None for memory only.
+        clock (callable): Returns the wall-clock time in seconds, time.time by default,
+            expiry times are persisted so they must survive a restart.
+        size (int): Bytes currently cached.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that went to the backend.
+        evictions (int): Entries evicted to stay below max_bytes.
+        expirations (int): Entries dropped because their TTL passed.
+        lookup_seconds (float): Time spent looking up entries.
+        backend_calls (int): Backend calls finished on misses, a batch counts once.
+        backend_seconds (float): Time spent in those backend calls.
+        backend_max (float): Longest single backend call.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, path=None, clock=time.time):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lookup_seconds = 0.0
+        self.backend_calls = 0
+        self.backend_seconds = 0.0
+        self.backend_max = 0.0
+        self._entries = OrderedDict()  # (text, language) -> (translation, size, expires), oldest first
+        self._lock = Lock()
+        if path:
+            self.load()
+
+    @staticmethod
+    def entry_size(text, translation):
+        """Return the bytes an entry is counted with"""
+        return len(text.encode('utf-8')) + len(translation.encode('utf-8')) + ENTRY_OVERHEAD
+
+    def get(self, text, language):
+        """
+        Look up a translation.
+
+        Args:
+            text (str): The original text.
+            language (str): The target language code, e.g. 'de'.
+
+        Returns:
+            str | None: The cached translation, None on a miss.
+        """
+        start = time.perf_counter()
+        key = (text, language)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= self.clock():
+                self._discard(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return entry[0] if entry is not None else None
+
+    def put(self, text, language, translation, expires=None):
+        """
+        Store a translation, evicting the least recently used entries beyond max_bytes.
+
+        Args:
+            text (str): The original text.
+            language (str): The target language code.
+            translation (str): The translated text.
+            expires (float | None): Expiry time, now + ttl by default.
+        """
+        size = self.entry_size(text, translation)
+        if size > self.max_bytes:
+            return
+        key = (text, language)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (translation, size, self.clock() + self.ttl if expires is None else expires)
+            self.size += size
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def translate(self, text, language, backend):
+        """
+        Return the cached translation, or translate with the backend and cache the result.
+
+        Args:
+            text (str): The original text.
+            language (str): The target language code.
+            backend (callable): Called as backend(text, language) on a miss, may raise.
+
+        Returns:
+            str: The translated text.
+        """
+        translation = self.get(text, language)
+        if translation is not None:
+            return translation
+        return self.fill(text, language, backend)
+
+    def fill(self, text, language, backend):
+        """
+        Translate with the backend and cache the result, for a miss get() already counted.
+
+        Args:
+            text (str): The original text.
+            language (str): The target language code.
+            backend (callable): Called as backend(text, language), may raise.
+
+        Returns:
+            str: The translated text.
+        """
+        start = time.perf_counter()
+        translation = backend(text, language)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.backend_calls += 1
+            self.backend_seconds += elapsed
+            self.backend_max = max(self.backend_max, elapsed)
+        self.put(text, language, translation)
+        return translation
+
+    def fill_batch(self, texts, language, backend_batch):
+        """
+        Translate several misses with one backend call and cache the results.
+
+        Args:
+            texts (list): The original texts.
+            language (str): The target language code.
+            backend_batch (callable): Called as backend_batch(texts, language), returns the translations in order,
+                an exception in place of every text that could not be translated.
+
+        Returns:
+            list: The translated texts, exceptions are returned as they are and not cached.
+        """
+        start = time.perf_counter()
+        translations = backend_batch(texts, language)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.backend_calls += 1
+            self.backend_seconds += elapsed
+            self.backend_max = max(self.backend_max, elapsed)
+        for text, translation in zip(texts, translations):
+            if not isinstance(translation, Exception):
+                self.put(text, language, translation)
+        return translations
+
+    def clear(self):
+        """Drop all entries, the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: entries, bytes, hits, misses, hit_rate, evictions, expirations,
+                average lookup and backend latency in ms and the longest backend call in ms.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'lookup_ms': self.lookup_seconds * 1000 / lookups if lookups else 0.0,
+                'backend_ms': self.backend_seconds * 1000 / self.backend_calls if self.backend_calls else 0.0,
+                'backend_max_ms': self.backend_max * 1000,
+            }
+
+    def load(self):
+        """
+        Load the entries persisted at path, skipping expired ones.
+
+        Returns:
+            int: Number of entries loaded.
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"[TranslationCache] Ignoring unreadable cache file {self.path}: {e}")
+            return 0
+        now = self.clock()
+        loaded = 0
+        # Records are stored oldest first, so the LRU order survives the restart
+        for text, language, translation, expires in records:
+            if expires > now:
+                self.put(text, language, translation, expires)
+                loaded += 1
+        return loaded
+
+    def save(self):
+        """Write the entries that did not expire to path, replacing the file atomically"""
+        if not self.path:
+            return
+        now = self.clock()
+        with self._lock:
+            records = [(text, language, translation, expires)
+                       for (text, language), (translation, size, expires) in self._entries.items() if expires > now]
+        temp_path = f'{self.path}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"[TranslationCache] Cannot write cache file {self.path}: {e}")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        """Remove an entry, caller holds self._lock"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
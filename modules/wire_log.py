@@ -0,0 +1,191 @@
+"""
+Wire logging for sent and received frames
+
+Logging every frame used to cost more than framing it: each Packing/Unpacking
+call inspected the call stack, tried to import the Qt signal object and parsed
+the protobuf payload again just to print it. WireLogger keeps all of that off
+the hot path:
+
+- LEVEL_OFF: record() returns after one attribute check (default)
+- LEVEL_SAMPLED: one frame out of every sample_rate frames is logged
+- LEVEL_FULL: every frame is logged
+
+Recorded frames are pushed as a tuple onto a bounded queue. A daemon thread
+formats them and hands the text to the sink. When the queue is full, frames
+are dropped and counted instead of blocking the sender.
+
+The level can be preset with the IK_WIRE_LOG environment variable, for example
+IK_WIRE_LOG=full or IK_WIRE_LOG=sampled:100, see level_from_environment().
+"""
+
+import os
+import queue
+import sys
+import threading
+
+LEVEL_OFF = 'off'
+LEVEL_SAMPLED = 'sampled'
+LEVEL_FULL = 'full'
+LEVELS = (LEVEL_OFF, LEVEL_SAMPLED, LEVEL_FULL)
+
+ENV_VAR = 'IK_WIRE_LOG'
+
+# Heartbeats would flood the log, they are never recorded
+SILENT_PURPOSES = frozenset(['PING', 'PONG'])
+
+
+def parse_level(spec):
+    """
+    Parse a level specification such as 'off', 'full' or 'sampled:100'.
+
+    Args:
+        spec (str): The level, optionally followed by ':<sample rate>'.
+
+    Returns:
+        tuple: (level, sample_rate), sample_rate is None when not given.
+
+    Raises:
+        ValueError: If the level is unknown or the sample rate is not a positive integer.
+    """
+    level, _, rate = (spec or LEVEL_OFF).strip().lower().partition(':')
+    if level not in LEVELS:
+        raise ValueError(f"Unknown wire log level '{level}', expected one of {', '.join(LEVELS)}")
+    sample_rate = int(rate) if rate else None
+    if sample_rate is not None and sample_rate < 1:
+        raise ValueError("Wire log sample rate must be at least 1")
+    return level, sample_rate
+
+
+def level_from_environment():
+    """Return the level preset in IK_WIRE_LOG, LEVEL_OFF when it is unset or invalid."""
+    spec = os.environ.get(ENV_VAR, LEVEL_OFF)
+    try:
+        parse_level(spec)
+    except ValueError as e:
+        print(f"[WireLog] Ignoring {ENV_VAR}: {e}")
+        return LEVEL_OFF
+    return spec
+
+
+def default_sink(text):
+    """Show text in the server UI message log, or print it when no UI is loaded."""
+    global _ui_emit
+    if _ui_emit is None:
+        _ui_emit = _resolve_ui_emit()
+    _ui_emit(text)
+
+
+_ui_emit = None
+
+
+def _resolve_ui_emit():
+    # Only consult UI modules that the process already imported, a client must not create server signals
+    for module_name in ('server.modern_server_ui', 'server.server_ui'):
+        module = sys.modules.get(module_name)
+        global_ms = getattr(module, 'global_ms', None)
+        if global_ms is not None:
+            return global_ms.message_log_signal.emit
+    return print
+
+
+class WireLogger:
+    """
+    Asynchronous, level controlled logger for network frames.
+
+    Attributes:
+        level (str): One of LEVEL_OFF, LEVEL_SAMPLED, LEVEL_FULL.
+        sample_rate (int): In sampled mode, log one out of this many frames.
+        formatter (callable): formatter(direction, purpose, payload, filename, line) -> str.
+        sink (callable): Receives every formatted line, runs on the logging thread.
+        dropped (int): Frames discarded because the queue was full.
+    """
+
+    def __init__(self, formatter, sink=default_sink, level=LEVEL_OFF, sample_rate=100, queue_size=10000):
+        self.formatter = formatter
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._counter = 0
+        self._worker_thread = None
+        self._start_lock = threading.Lock()
+        self.level = LEVEL_OFF
+        self.configure(level=level)
+
+    def configure(self, level=None, sample_rate=None, sink=None):
+        """
+        Change level, sample rate or sink at runtime.
+
+        Args:
+            level (str, optional): New level, may carry a sample rate ('sampled:50').
+            sample_rate (int, optional): New sample rate.
+            sink (callable, optional): New output function.
+        """
+        if level is not None:
+            level, parsed_rate = parse_level(level)
+            if parsed_rate is not None and sample_rate is None:
+                sample_rate = parsed_rate
+        if sample_rate is not None:
+            if sample_rate < 1:
+                raise ValueError("Wire log sample rate must be at least 1")
+            self.sample_rate = sample_rate
+        if sink is not None:
+            self.sink = sink
+        if level is not None:
+            if level != LEVEL_OFF:
+                self._ensure_worker()
+            self.level = level
+
+    def record(self, direction, purpose, payload, depth=2):
+        """
+        Queue one frame for logging. Called on every send and receive.
+
+        Args:
+            direction (str): 'send' or 'receive'.
+            purpose (str): The message purpose/type.
+            payload (bytes | memoryview): The message payload data.
+            depth (int | None): Stack depth of the code that sent the frame, None to omit.
+        """
+        level = self.level
+        if level == LEVEL_OFF or purpose in SILENT_PURPOSES:
+            return
+        if level == LEVEL_SAMPLED:
+            self._counter += 1
+            if self._counter % self.sample_rate:
+                return
+        filename, line = None, 0
+        if depth is not None:
+            try:
+                caller = sys._getframe(depth)
+                filename, line = caller.f_code.co_filename, caller.f_lineno
+            except ValueError:
+                pass
+        # Zero-copy payload views are only valid until the next receive
+        if isinstance(payload, memoryview):
+            payload = bytes(payload)
+        try:
+            self._queue.put_nowait((direction, purpose, payload, filename, line))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until every queued frame was written to the sink."""
+        if self._worker_thread is not None:
+            self._queue.join()
+
+    def _ensure_worker(self):
+        with self._start_lock:
+            if self._worker_thread is None:
+                self._worker_thread = threading.Thread(target=self._worker_loop, name='WireLog', daemon=True)
+                self._worker_thread.start()
+
+    def _worker_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self.sink(self.formatter(*record))
+            except Exception:
+                # Logging must never take the process down
+                pass
+            finally:
+                self._queue.task_done()
@@ -24,15 +24,15 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rMessage.proto\"(\n\x04User\x12\x0e\n\x06userId\x18\x01 \x01(\t\x12\x10\n\x08serverId\x18\x02 \x01(\t\"*\n\x05Group\x12\x0f\n\x07groupId\x18\x01 \x01(\t\x12\x10\n\x08serverId\x18\x02 \x01(\t\"\x10\n\x0e\x44iscoverServer\"z\n\x0eServerAnnounce\x12\x10\n\x08serverId\x18\x01 \x01(\t\x12(\n\x07\x66\x65\x61ture\x18\x02 \x03(\x0b\x32\x17.ServerAnnounce.Feature\x1a,\n\x07\x46\x65\x61ture\x12\x13\n\x0b\x66\x65\x61tureName\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\r\"$\n\rConnectClient\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\"3\n\rConnectServer\x12\x10\n\x08serverId\x18\x01 \x01(\t\x12\x10\n\x08\x66\x65\x61tures\x18\x02 \x03(\t\"\x86\x01\n\x0f\x43onnectResponse\x12\'\n\x06result\x18\x01 \x01(\x0e\x32\x17.ConnectResponse.Result\"J\n\x06Result\x12\x11\n\rUNKNOWN_ERROR\x10\x00\x12\r\n\tCONNECTED\x10\x01\x12\x1e\n\x1aIS_ALREADY_CONNECTED_ERROR\x10\x02\"\x90\x01\n\x06HangUp\x12\x1e\n\x06reason\x18\x01 \x01(\x0e\x32\x0e.HangUp.Reason\"f\n\x06Reason\x12\x12\n\x0eUNKNOWN_REASON\x10\x00\x12\x08\n\x04\x45XIT\x10\x01\x12\x0b\n\x07TIMEOUT\x10\x02\x12\x1a\n\x16PAYLOAD_LIMIT_EXCEEDED\x10\x03\x12\x15\n\x11MESSAGE_MALFORMED\x10\x04\"\x06\n\x04Ping\"\x06\n\x04Pong\"6\n\x1eUnsupportedMessageNotification\x12\x14\n\x0cmessage_name\x18\x01 \x01(\t\"\xdc\x02\n\x0b\x43hatMessage\x12\x18\n\x10messageSnowflake\x18\x01 \x01(\x04\x12\x15\n\x06\x61uthor\x18\x02 \x01(\x0b\x32\x05.User\x12\x15\n\x04user\x18\x03 \x01(\x0b\x32\x05.UserH\x00\x12\x17\n\x05group\x18\x04 \x01(\x0b\x32\x06.GroupH\x00\x12/\n\x0buserOfGroup\x18\x05 \x01(\x0b\x32\x18.ChatMessage.UserOfGroupH\x00\x12\x15\n\x0btextContent\x18\x0b \x01(\tH\x01\x12&\n\rlive_location\x18\x16 \x01(\x0b\x32\r.LiveLocationH\x01\x12#\n\x0btranslation\x18, \x01(\x0b\x32\x0c.TranslationH\x01\x1a\x39\n\x0bUserOfGroup\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x15\n\x05group\x18\x02 \x01(\x0b\x32\x06.GroupB\x0b\n\trecipientB\t\n\x07\x63ontentJ\x04\x08\x06\x10\x0b\"\xe4\x02\n\x13\x43hatMessageResponse\x12\x18\n\x10messageSnowflake\x18\x01 \x01(\x04\x12\x35\n\x08statuses\x18\x02 \x03(\x0b\x32#.ChatMessageResponse.DeliveryStatus\x1aR\n\x0e\x44\x65liveryStatus\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12+\n\x06status\x18\x02 \x01(\x0e\x32\x1b.ChatMessageResponse.Status\"\xa7\x01\n\x06Status\x12\x12\n\x0eUNKNOWN_STATUS\x10\x00\x12\r\n\tDELIVERED\x10\x02\x12\x0f\n\x0bOTHER_ERROR\x10\x03\x12\r\n\tUSER_AWAY\x10\x04\x12\x12\n\x0eUSER_NOT_FOUND\x10\x05\x12\x18\n\x14OTHER_SERVER_TIMEOUT\x10\x06\x12\x1a\n\x16OTHER_SERVER_NOT_FOUND\x10\x07\x12\x10\n\x0cUSER_BLOCKED\x10\x08\"+\n\nQueryUsers\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\r\n\x05query\x18\x02 \x01(\t\":\n\x12QueryUsersResponse\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x14\n\x05users\x18\x02 \x03(\x0b\x32\x05.User\"o\n\x0bModifyGroup\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x0f\n\x07groupId\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65leteGroup\x18\x03 \x01(\x08\x12\x13\n\x0b\x64isplayName\x18\x04 \x01(\t\x12\x15\n\x06\x61\x64mins\x18\x05 \x03(\x0b\x32\x05.User\"\x8f\x01\n\x13ModifyGroupResponse\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12+\n\x06result\x18\x02 \x01(\x0e\x32\x1b.ModifyGroupResponse.Result\";\n\x06Result\x12\x11\n\rUNKNOWN_ERROR\x10\x00\x12\x0b\n\x07SUCCESS\x10\x01\x12\x11\n\rNOT_PERMITTED\x10\x02\"E\n\rInviteToGroup\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x0f\n\x07groupId\x18\x02 \x01(\t\x12\x13\n\x04user\x18\x03 \x01(\x0b\x32\x05.User\":\n\x11NotifyGroupInvite\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x15\n\x05group\x18\x02 \x01(\x0b\x32\x06.Group\"G\n\tJoinGroup\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x15\n\x05group\x18\x02 \x01(\x0b\x32\x06.Group\x12\x13\n\x04user\x18\x03 \x01(\x0b\x32\x05.User\"8\n\nLeaveGroup\x12\x15\n\x05group\x18\x01 \x01(\x0b\x32\x06.Group\x12\x13\n\x04user\x18\x02 \x01(\x0b\x32\x05.User\")\n\x10ListGroupMembers\x12\x15\n\x05group\x18\x01 \x01(\x0b\x32\x06.Group\"\x99\x01\n\x0cGroupMembers\x12\x15\n\x05group\x18\x01 \x01(\x0b\x32\x06.Group\x12$\n\x06result\x18\x02 \x01(\x0e\x32\x14.GroupMembers.Result\x12\x13\n\x04user\x18\x03 \x03(\x0b\x32\x05.User\"7\n\x06Result\x12\x11\n\rUNKNOWN_ERROR\x10\x00\x12\x0b\n\x07SUCCESS\x10\x01\x12\r\n\tNOT_FOUND\x10\x02\"z\n\x0bTranslation\x12\"\n\x0ftarget_language\x18\x01 \x01(\x0e\x32\t.Language\x12\x15\n\roriginal_text\x18\x02 \x01(\t\x12\x1c\n\x0ftranslated_text\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_translated_text\"x\n\tTranslate\x12\"\n\x0ftarget_language\x18\x01 \x01(\x0e\x32\t.Language\x12\x15\n\roriginal_text\x18\x02 \x01(\t\x12\x1c\n\x0ftranslated_text\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_translated_text\"y\n\nTranslated\x12\"\n\x0ftarget_language\x18\x01 \x01(\x0e\x32\t.Language\x12\x15\n\roriginal_text\x18\x02 \x01(\t\x12\x1c\n\x0ftranslated_text\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_translated_text\"K\n\x0bSetReminder\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\r\n\x05\x65vent\x18\x02 \x01(\t\x12\x18\n\x10\x63ountdownSeconds\x18\x03 \x01(\r\"8\n\x08Reminder\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x17\n\x0freminderContent\x18\x02 \x01(\t\"\xa4\x01\n\x0cLiveLocation\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x11\n\texpiry_at\x18\x03 \x01(\x01\x12(\n\x08location\x18\x04 \x01(\x0b\x32\x16.LiveLocation.Location\x1a/\n\x08Location\x12\x10\n\x08latitude\x18\x01 \x01(\x01\x12\x11\n\tlongitude\x18\x02 \x01(\x01\"\xad\x01\n\rLiveLocations\x12\x44\n\x17\x65xtended_live_locations\x18\x01 \x03(\x0b\x32#.LiveLocations.ExtendedLiveLocation\x1aV\n\x14\x45xtendedLiveLocation\x12$\n\rlive_location\x18\x01 \x01(\x0b\x32\r.LiveLocation\x12\x18\n\x10messageSnowflake\x18\x02 \x01(\x04**\n\x08Language\x12\x06\n\x02\x44\x45\x10\x00\x12\x06\n\x02\x45N\x10\x01\x12\x06\n\x02ZH\x10\x02\x12\x06\n\x02TR\x10\x03\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rMessage.proto\"(\n\x04User\x12\x0e\n\x06userId\x18\x01 \x01(\t\x12\x10\n\x08serverId\x18\x02 \x01(\t\"*\n\x05Group\x12\x0f\n\x07groupId\x18\x01 \x01(\t\x12\x10\n\x08serverId\x18\x02 \x01(\t\"\x10\n\x0e\x44iscoverServer\"z\n\x0eServerAnnounce\x12\x10\n\x08serverId\x18\x01 \x01(\t\x12(\n\x07\x66\x65\x61ture\x18\x02 \x03(\x0b\x32\x17.ServerAnnounce.Feature\x1a,\n\x07\x46\x65\x61ture\x12\x13\n\x0b\x66\x65\x61tureName\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\r\"6\n\rConnectClient\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x10\n\x08\x66\x65\x61tures\x18\x02 \x03(\t\"3\n\rConnectServer\x12\x10\n\x08serverId\x18\x01 \x01(\t\x12\x10\n\x08\x66\x65\x61tures\x18\x02 \x03(\t\"\x86\x01\n\x0f\x43onnectResponse\x12\'\n\x06result\x18\x01 \x01(\x0e\x32\x17.ConnectResponse.Result\"J\n\x06Result\x12\x11\n\rUNKNOWN_ERROR\x10\x00\x12\r\n\tCONNECTED\x10\x01\x12\x1e\n\x1aIS_ALREADY_CONNECTED_ERROR\x10\x02\"\x90\x01\n\x06HangUp\x12\x1e\n\x06reason\x18\x01 \x01(\x0e\x32\x0e.HangUp.Reason\"f\n\x06Reason\x12\x12\n\x0eUNKNOWN_REASON\x10\x00\x12\x08\n\x04\x45XIT\x10\x01\x12\x0b\n\x07TIMEOUT\x10\x02\x12\x1a\n\x16PAYLOAD_LIMIT_EXCEEDED\x10\x03\x12\x15\n\x11MESSAGE_MALFORMED\x10\x04\"\x06\n\x04Ping\"\x06\n\x04Pong\"6\n\x1eUnsupportedMessageNotification\x12\x14\n\x0cmessage_name\x18\x01 \x01(\t\"\xdc\x02\n\x0b\x43hatMessage\x12\x18\n\x10messageSnowflake\x18\x01 \x01(\x04\x12\x15\n\x06\x61uthor\x18\x02 \x01(\x0b\x32\x05.User\x12\x15\n\x04user\x18\x03 \x01(\x0b\x32\x05.UserH\x00\x12\x17\n\x05group\x18\x04 \x01(\x0b\x32\x06.GroupH\x00\x12/\n\x0buserOfGroup\x18\x05 \x01(\x0b\x32\x18.ChatMessage.UserOfGroupH\x00\x12\x15\n\x0btextContent\x18\x0b \x01(\tH\x01\x12&\n\rlive_location\x18\x16 \x01(\x0b\x32\r.LiveLocationH\x01\x12#\n\x0btranslation\x18, \x01(\x0b\x32\x0c.TranslationH\x01\x1a\x39\n\x0bUserOfGroup\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x15\n\x05group\x18\x02 \x01(\x0b\x32\x06.GroupB\x0b\n\trecipientB\t\n\x07\x63ontentJ\x04\x08\x06\x10\x0b\"\xe4\x02\n\x13\x43hatMessageResponse\x12\x18\n\x10messageSnowflake\x18\x01 \x01(\x04\x12\x35\n\x08statuses\x18\x02 \x03(\x0b\x32#.ChatMessageResponse.DeliveryStatus\x1aR\n\x0e\x44\x65liveryStatus\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12+\n\x06status\x18\x02 \x01(\x0e\x32\x1b.ChatMessageResponse.Status\"\xa7\x01\n\x06Status\x12\x12\n\x0eUNKNOWN_STATUS\x10\x00\x12\r\n\tDELIVERED\x10\x02\x12\x0f\n\x0bOTHER_ERROR\x10\x03\x12\r\n\tUSER_AWAY\x10\x04\x12\x12\n\x0eUSER_NOT_FOUND\x10\x05\x12\x18\n\x14OTHER_SERVER_TIMEOUT\x10\x06\x12\x1a\n\x16OTHER_SERVER_NOT_FOUND\x10\x07\x12\x10\n\x0cUSER_BLOCKED\x10\x08\"J\n\nQueryUsers\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\r\n\x05query\x18\x02 \x01(\t\x12\r\n\x05limit\x18\x03 \x01(\r\x12\x0e\n\x06offset\x18\x04 \x01(\r\"K\n\x12QueryUsersResponse\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x14\n\x05users\x18\x02 \x03(\x0b\x32\x05.User\x12\x0f\n\x07hasMore\x18\x03 \x01(\x08\"o\n\x0bModifyGroup\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x0f\n\x07groupId\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65leteGroup\x18\x03 \x01(\x08\x12\x13\n\x0b\x64isplayName\x18\x04 \x01(\t\x12\x15\n\x06\x61\x64mins\x18\x05 \x03(\x0b\x32\x05.User\"\x8f\x01\n\x13ModifyGroupResponse\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12+\n\x06result\x18\x02 \x01(\x0e\x32\x1b.ModifyGroupResponse.Result\";\n\x06Result\x12\x11\n\rUNKNOWN_ERROR\x10\x00\x12\x0b\n\x07SUCCESS\x10\x01\x12\x11\n\rNOT_PERMITTED\x10\x02\"E\n\rInviteToGroup\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x0f\n\x07groupId\x18\x02 \x01(\t\x12\x13\n\x04user\x18\x03 \x01(\x0b\x32\x05.User\":\n\x11NotifyGroupInvite\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x15\n\x05group\x18\x02 \x01(\x0b\x32\x06.Group\"G\n\tJoinGroup\x12\x0e\n\x06handle\x18\x01 \x01(\x04\x12\x15\n\x05group\x18\x02 \x01(\x0b\x32\x06.Group\x12\x13\n\x04user\x18\x03 \x01(\x0b\x32\x05.User\"8\n\nLeaveGroup\x12\x15\n\x05group\x18\x01 \x01(\x0b\x32\x06.Group\x12\x13\n\x04user\x18\x02 \x01(\x0b\x32\x05.User\")\n\x10ListGroupMembers\x12\x15\n\x05group\x18\x01 \x01(\x0b\x32\x06.Group\"\x99\x01\n\x0cGroupMembers\x12\x15\n\x05group\x18\x01 \x01(\x0b\x32\x06.Group\x12$\n\x06result\x18\x02 \x01(\x0e\x32\x14.GroupMembers.Result\x12\x13\n\x04user\x18\x03 \x03(\x0b\x32\x05.User\"7\n\x06Result\x12\x11\n\rUNKNOWN_ERROR\x10\x00\x12\x0b\n\x07SUCCESS\x10\x01\x12\r\n\tNOT_FOUND\x10\x02\"z\n\x0bTranslation\x12\"\n\x0ftarget_language\x18\x01 \x01(\x0e\x32\t.Language\x12\x15\n\roriginal_text\x18\x02 \x01(\t\x12\x1c\n\x0ftranslated_text\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_translated_text\"x\n\tTranslate\x12\"\n\x0ftarget_language\x18\x01 \x01(\x0e\x32\t.Language\x12\x15\n\roriginal_text\x18\x02 \x01(\t\x12\x1c\n\x0ftranslated_text\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_translated_text\"y\n\nTranslated\x12\"\n\x0ftarget_language\x18\x01 \x01(\x0e\x32\t.Language\x12\x15\n\roriginal_text\x18\x02 \x01(\t\x12\x1c\n\x0ftranslated_text\x18\x03 \x01(\tH\x00\x88\x01\x01\x42\x12\n\x10_translated_text\"K\n\x0bSetReminder\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\r\n\x05\x65vent\x18\x02 \x01(\t\x12\x18\n\x10\x63ountdownSeconds\x18\x03 \x01(\r\"8\n\x08Reminder\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x17\n\x0freminderContent\x18\x02 \x01(\t\"\xa4\x01\n\x0cLiveLocation\x12\x13\n\x04user\x18\x01 \x01(\x0b\x32\x05.User\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x11\n\texpiry_at\x18\x03 \x01(\x01\x12(\n\x08location\x18\x04 \x01(\x0b\x32\x16.LiveLocation.Location\x1a/\n\x08Location\x12\x10\n\x08latitude\x18\x01 \x01(\x01\x12\x11\n\tlongitude\x18\x02 \x01(\x01\"\xad\x01\n\rLiveLocations\x12\x44\n\x17\x65xtended_live_locations\x18\x01 \x03(\x0b\x32#.LiveLocations.ExtendedLiveLocation\x1aV\n\x14\x45xtendedLiveLocation\x12$\n\rlive_location\x18\x01 \x01(\x0b\x32\r.LiveLocation\x12\x18\n\x10messageSnowflake\x18\x02 \x01(\x04**\n\x08Language\x12\x06\n\x02\x44\x45\x10\x00\x12\x06\n\x02\x45N\x10\x01\x12\x06\n\x02ZH\x10\x02\x12\x06\n\x02TR\x10\x03\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'Message_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_LANGUAGE']._serialized_start=3074
-  _globals['_LANGUAGE']._serialized_end=3116
+  _globals['_LANGUAGE']._serialized_start=3140
+  _globals['_LANGUAGE']._serialized_end=3182
   _globals['_USER']._serialized_start=17
   _globals['_USER']._serialized_end=57
   _globals['_GROUP']._serialized_start=59
@@ -44,73 +44,73 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_SERVERANNOUNCE_FEATURE']._serialized_start=199
   _globals['_SERVERANNOUNCE_FEATURE']._serialized_end=243
   _globals['_CONNECTCLIENT']._serialized_start=245
-  _globals['_CONNECTCLIENT']._serialized_end=281
-  _globals['_CONNECTSERVER']._serialized_start=283
-  _globals['_CONNECTSERVER']._serialized_end=334
-  _globals['_CONNECTRESPONSE']._serialized_start=337
-  _globals['_CONNECTRESPONSE']._serialized_end=471
-  _globals['_CONNECTRESPONSE_RESULT']._serialized_start=397
-  _globals['_CONNECTRESPONSE_RESULT']._serialized_end=471
-  _globals['_HANGUP']._serialized_start=474
-  _globals['_HANGUP']._serialized_end=618
-  _globals['_HANGUP_REASON']._serialized_start=516
-  _globals['_HANGUP_REASON']._serialized_end=618
-  _globals['_PING']._serialized_start=620
-  _globals['_PING']._serialized_end=626
-  _globals['_PONG']._serialized_start=628
-  _globals['_PONG']._serialized_end=634
-  _globals['_UNSUPPORTEDMESSAGENOTIFICATION']._serialized_start=636
-  _globals['_UNSUPPORTEDMESSAGENOTIFICATION']._serialized_end=690
-  _globals['_CHATMESSAGE']._serialized_start=693
-  _globals['_CHATMESSAGE']._serialized_end=1041
-  _globals['_CHATMESSAGE_USEROFGROUP']._serialized_start=954
-  _globals['_CHATMESSAGE_USEROFGROUP']._serialized_end=1011
-  _globals['_CHATMESSAGERESPONSE']._serialized_start=1044
-  _globals['_CHATMESSAGERESPONSE']._serialized_end=1400
-  _globals['_CHATMESSAGERESPONSE_DELIVERYSTATUS']._serialized_start=1148
-  _globals['_CHATMESSAGERESPONSE_DELIVERYSTATUS']._serialized_end=1230
-  _globals['_CHATMESSAGERESPONSE_STATUS']._serialized_start=1233
-  _globals['_CHATMESSAGERESPONSE_STATUS']._serialized_end=1400
-  _globals['_QUERYUSERS']._serialized_start=1402
-  _globals['_QUERYUSERS']._serialized_end=1445
-  _globals['_QUERYUSERSRESPONSE']._serialized_start=1447
-  _globals['_QUERYUSERSRESPONSE']._serialized_end=1505
-  _globals['_MODIFYGROUP']._serialized_start=1507
-  _globals['_MODIFYGROUP']._serialized_end=1618
-  _globals['_MODIFYGROUPRESPONSE']._serialized_start=1621
-  _globals['_MODIFYGROUPRESPONSE']._serialized_end=1764
-  _globals['_MODIFYGROUPRESPONSE_RESULT']._serialized_start=1705
-  _globals['_MODIFYGROUPRESPONSE_RESULT']._serialized_end=1764
-  _globals['_INVITETOGROUP']._serialized_start=1766
-  _globals['_INVITETOGROUP']._serialized_end=1835
-  _globals['_NOTIFYGROUPINVITE']._serialized_start=1837
-  _globals['_NOTIFYGROUPINVITE']._serialized_end=1895
-  _globals['_JOINGROUP']._serialized_start=1897
-  _globals['_JOINGROUP']._serialized_end=1968
-  _globals['_LEAVEGROUP']._serialized_start=1970
-  _globals['_LEAVEGROUP']._serialized_end=2026
-  _globals['_LISTGROUPMEMBERS']._serialized_start=2028
-  _globals['_LISTGROUPMEMBERS']._serialized_end=2069
-  _globals['_GROUPMEMBERS']._serialized_start=2072
-  _globals['_GROUPMEMBERS']._serialized_end=2225
-  _globals['_GROUPMEMBERS_RESULT']._serialized_start=2170
-  _globals['_GROUPMEMBERS_RESULT']._serialized_end=2225
-  _globals['_TRANSLATION']._serialized_start=2227
-  _globals['_TRANSLATION']._serialized_end=2349
-  _globals['_TRANSLATE']._serialized_start=2351
-  _globals['_TRANSLATE']._serialized_end=2471
-  _globals['_TRANSLATED']._serialized_start=2473
-  _globals['_TRANSLATED']._serialized_end=2594
-  _globals['_SETREMINDER']._serialized_start=2596
-  _globals['_SETREMINDER']._serialized_end=2671
-  _globals['_REMINDER']._serialized_start=2673
-  _globals['_REMINDER']._serialized_end=2729
-  _globals['_LIVELOCATION']._serialized_start=2732
-  _globals['_LIVELOCATION']._serialized_end=2896
-  _globals['_LIVELOCATION_LOCATION']._serialized_start=2849
-  _globals['_LIVELOCATION_LOCATION']._serialized_end=2896
-  _globals['_LIVELOCATIONS']._serialized_start=2899
-  _globals['_LIVELOCATIONS']._serialized_end=3072
-  _globals['_LIVELOCATIONS_EXTENDEDLIVELOCATION']._serialized_start=2986
-  _globals['_LIVELOCATIONS_EXTENDEDLIVELOCATION']._serialized_end=3072
+  _globals['_CONNECTCLIENT']._serialized_end=299
+  _globals['_CONNECTSERVER']._serialized_start=301
+  _globals['_CONNECTSERVER']._serialized_end=352
+  _globals['_CONNECTRESPONSE']._serialized_start=355
+  _globals['_CONNECTRESPONSE']._serialized_end=489
+  _globals['_CONNECTRESPONSE_RESULT']._serialized_start=415
+  _globals['_CONNECTRESPONSE_RESULT']._serialized_end=489
+  _globals['_HANGUP']._serialized_start=492
+  _globals['_HANGUP']._serialized_end=636
+  _globals['_HANGUP_REASON']._serialized_start=534
+  _globals['_HANGUP_REASON']._serialized_end=636
+  _globals['_PING']._serialized_start=638
+  _globals['_PING']._serialized_end=644
+  _globals['_PONG']._serialized_start=646
+  _globals['_PONG']._serialized_end=652
+  _globals['_UNSUPPORTEDMESSAGENOTIFICATION']._serialized_start=654
+  _globals['_UNSUPPORTEDMESSAGENOTIFICATION']._serialized_end=708
+  _globals['_CHATMESSAGE']._serialized_start=711
+  _globals['_CHATMESSAGE']._serialized_end=1059
+  _globals['_CHATMESSAGE_USEROFGROUP']._serialized_start=972
+  _globals['_CHATMESSAGE_USEROFGROUP']._serialized_end=1029
+  _globals['_CHATMESSAGERESPONSE']._serialized_start=1062
+  _globals['_CHATMESSAGERESPONSE']._serialized_end=1418
+  _globals['_CHATMESSAGERESPONSE_DELIVERYSTATUS']._serialized_start=1166
+  _globals['_CHATMESSAGERESPONSE_DELIVERYSTATUS']._serialized_end=1248
+  _globals['_CHATMESSAGERESPONSE_STATUS']._serialized_start=1251
+  _globals['_CHATMESSAGERESPONSE_STATUS']._serialized_end=1418
+  _globals['_QUERYUSERS']._serialized_start=1420
+  _globals['_QUERYUSERS']._serialized_end=1494
+  _globals['_QUERYUSERSRESPONSE']._serialized_start=1496
+  _globals['_QUERYUSERSRESPONSE']._serialized_end=1571
+  _globals['_MODIFYGROUP']._serialized_start=1573
+  _globals['_MODIFYGROUP']._serialized_end=1684
+  _globals['_MODIFYGROUPRESPONSE']._serialized_start=1687
+  _globals['_MODIFYGROUPRESPONSE']._serialized_end=1830
+  _globals['_MODIFYGROUPRESPONSE_RESULT']._serialized_start=1771
+  _globals['_MODIFYGROUPRESPONSE_RESULT']._serialized_end=1830
+  _globals['_INVITETOGROUP']._serialized_start=1832
+  _globals['_INVITETOGROUP']._serialized_end=1901
+  _globals['_NOTIFYGROUPINVITE']._serialized_start=1903
+  _globals['_NOTIFYGROUPINVITE']._serialized_end=1961
+  _globals['_JOINGROUP']._serialized_start=1963
+  _globals['_JOINGROUP']._serialized_end=2034
+  _globals['_LEAVEGROUP']._serialized_start=2036
+  _globals['_LEAVEGROUP']._serialized_end=2092
+  _globals['_LISTGROUPMEMBERS']._serialized_start=2094
+  _globals['_LISTGROUPMEMBERS']._serialized_end=2135
+  _globals['_GROUPMEMBERS']._serialized_start=2138
+  _globals['_GROUPMEMBERS']._serialized_end=2291
+  _globals['_GROUPMEMBERS_RESULT']._serialized_start=2236
+  _globals['_GROUPMEMBERS_RESULT']._serialized_end=2291
+  _globals['_TRANSLATION']._serialized_start=2293
+  _globals['_TRANSLATION']._serialized_end=2415
+  _globals['_TRANSLATE']._serialized_start=2417
+  _globals['_TRANSLATE']._serialized_end=2537
+  _globals['_TRANSLATED']._serialized_start=2539
+  _globals['_TRANSLATED']._serialized_end=2660
+  _globals['_SETREMINDER']._serialized_start=2662
+  _globals['_SETREMINDER']._serialized_end=2737
+  _globals['_REMINDER']._serialized_start=2739
+  _globals['_REMINDER']._serialized_end=2795
+  _globals['_LIVELOCATION']._serialized_start=2798
+  _globals['_LIVELOCATION']._serialized_end=2962
+  _globals['_LIVELOCATION_LOCATION']._serialized_start=2915
+  _globals['_LIVELOCATION_LOCATION']._serialized_end=2962
+  _globals['_LIVELOCATIONS']._serialized_start=2965
+  _globals['_LIVELOCATIONS']._serialized_end=3138
+  _globals['_LIVELOCATIONS_EXTENDEDLIVELOCATION']._serialized_start=3052
+  _globals['_LIVELOCATIONS_EXTENDEDLIVELOCATION']._serialized_end=3138
 # @@protoc_insertion_point(module_scope)
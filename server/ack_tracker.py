@@ -0,0 +1,237 @@
+"""
+Delivery acknowledgment tracker
+
+Every chat message a server routes is tracked until its recipients have
+acknowledged it. The recipients' DeliveryStatus entries are merged into one
+ChatMessageResponse per messageSnowflake, which is sent back towards the
+author when every recipient reported or the deadline passed. Recipients that
+did not report by then are listed as USER_AWAY, or as OTHER_SERVER_TIMEOUT
+when the message was forwarded to their server.
+
+Entries expire through a deadline heap, and the number of tracked messages is
+capped: beyond the cap the oldest entry is answered early, so the table can
+never grow without bound. Snowflakes are not unique across producers: when a
+message of another author or origin reuses a tracked snowflake, the tracked
+message is answered early as well instead of being dropped.
+
+Main classes:
+- TrackedMessage: One message waiting for acknowledgments
+- AckTracker: Tracked messages keyed by messageSnowflake, with deadlines
+"""
+
+import heapq
+import time
+from threading import Thread, Condition
+from proto import Message_pb2
+
+ACK_TIMEOUT = 10.0  # Seconds to wait for all recipients before answering the author
+MAX_TRACKED = 100_000  # Messages tracked at most, beyond that the oldest is answered early
+
+USER_AWAY = Message_pb2.ChatMessageResponse.USER_AWAY
+OTHER_SERVER_TIMEOUT = Message_pb2.ChatMessageResponse.OTHER_SERVER_TIMEOUT
+
+
+class TrackedMessage:
+    """
+    One message waiting for acknowledgments.
+
+    Attributes:
+        snowflake (int): The messageSnowflake.
+        author (str): userId of the author.
+        reply_server (str | None): serverId of the link the message came from, None for a local author.
+        statuses (dict): userId -> (serverId, status) of the recipients that reported.
+        waiting (set): userIds of the recipients that did not report yet.
+        remote (set): userIds of the recipients the message was forwarded to another server for.
+        deadline (float): time.monotonic() after which the author is answered anyway.
+    """
+
+    __slots__ = ('snowflake', 'author', 'reply_server', 'statuses', 'waiting', 'remote', 'deadline')
+
+    def __init__(self, snowflake, author, reply_server, waiting, deadline):
+        self.snowflake = snowflake
+        self.author = author
+        self.reply_server = reply_server
+        self.statuses = {}
+        self.waiting = waiting
+        self.remote = set()
+        self.deadline = deadline
+
+    def merge(self, statuses):
+        """Record DeliveryStatus entries of recipients still waited for, the first status of a recipient wins."""
+        for delivery in statuses:
+            user_id = delivery.user.userId
+            # Others belong to an earlier message with the same snowflake, or reported already
+            if user_id in self.waiting:
+                self.statuses[user_id] = (delivery.user.serverId, delivery.status)
+                self.waiting.discard(user_id)
+
+    def response(self):
+        """Build the merged ChatMessageResponse, recipients still missing are reported as not reached."""
+        response = Message_pb2.ChatMessageResponse()
+        response.messageSnowflake = self.snowflake
+        for user_id, (server_id, status) in self.statuses.items():
+            delivery = response.statuses.add()
+            delivery.user.userId = user_id
+            delivery.user.serverId = server_id
+            delivery.status = status
+        for user_id in self.waiting:
+            delivery = response.statuses.add()
+            delivery.user.userId = user_id
+            delivery.status = OTHER_SERVER_TIMEOUT if user_id in self.remote else USER_AWAY
+        return response
+
+
+class AckTracker:
+    """
+    Messages waiting for acknowledgments, keyed by messageSnowflake.
+
+    A worker thread answers messages whose deadline passed. Finished messages
+    are handed to the deliver callback outside of the tracker's lock.
+
+    Attributes:
+        deliver (callable): Called as deliver(tracked) once a message is finished.
+        timeout (float): Seconds a message waits for its recipients.
+        max_tracked (int): Maximum number of tracked messages.
+        expired (int): Messages answered at their deadline.
+        evicted (int): Messages answered early because the tracker was full.
+        displaced (int): Messages answered early because another message reused their snowflake.
+    """
+
+    def __init__(self, deliver, timeout=ACK_TIMEOUT, max_tracked=MAX_TRACKED):
+        self.deliver = deliver
+        self.timeout = timeout
+        self.max_tracked = max_tracked
+        self.expired = 0
+        self.evicted = 0
+        self.displaced = 0
+        self.messages = {}
+        self._deadlines = []  # Heap of (deadline, snowflake), stale entries are skipped
+        self._cond = Condition()
+        self.running = False
+        self.worker_thread = None
+
+    def start(self):
+        """Start answering messages at their deadline"""
+        if self.running:
+            return
+        self.running = True
+        self.worker_thread = Thread(target=self._worker_loop, name='AckTracker', daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """Stop the deadline worker"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+
+    def track(self, snowflake, author, recipients, reply_server=None):
+        """
+        Start tracking a routed message.
+
+        Tracking a snowflake again for the same author and origin adds the
+        recipients to it, e.g. for several members of a group on this server.
+        A message of another author or origin with the same snowflake takes
+        its place, and the author of the tracked one is answered with the
+        statuses reported so far.
+
+        Args:
+            snowflake (int): The messageSnowflake.
+            author (str): userId of the author.
+            recipients (iterable): userIds expected to acknowledge the message.
+            reply_server (str | None): serverId of the link the message came from, None for a local author.
+        """
+        deadline = time.monotonic() + self.timeout
+        evicted = []
+        displaced = None
+        with self._cond:
+            tracked = self.messages.get(snowflake)
+            if tracked is not None:
+                if tracked.author == author and tracked.reply_server == reply_server:
+                    tracked.waiting.update(user_id for user_id in recipients if user_id not in tracked.statuses)
+                    return
+                # Its heap entry is skipped later, the deadline no longer matches the new message
+                displaced = tracked
+            self.messages[snowflake] = TrackedMessage(snowflake, author, reply_server, set(recipients), deadline)
+            heapq.heappush(self._deadlines, (deadline, snowflake))
+            while len(self.messages) > self.max_tracked:
+                evicted.extend(self._pop_oldest())
+            if self._deadlines[0][1] == snowflake:
+                self._cond.notify()
+        self.evicted += len(evicted)
+        if displaced is not None:
+            self.displaced += 1
+            self.deliver(displaced)
+        for tracked in evicted:
+            self.deliver(tracked)
+
+    def forwarded(self, snowflake, recipients):
+        """Mark recipients the message was forwarded to another server for, if missing they count as server timeouts."""
+        with self._cond:
+            tracked = self.messages.get(snowflake)
+            if tracked is not None:
+                tracked.remote.update(recipients)
+
+    def report(self, snowflake, statuses):
+        """
+        Merge the DeliveryStatus entries of an acknowledgment.
+
+        Args:
+            snowflake (int): The messageSnowflake.
+            statuses (iterable): DeliveryStatus entries of the reporting recipients.
+
+        Returns:
+            bool: False if the message is not tracked (late or unknown acknowledgment).
+        """
+        with self._cond:
+            tracked = self.messages.get(snowflake)
+            if tracked is None:
+                return False
+            tracked.merge(statuses)
+            if tracked.waiting:
+                return True
+            del self.messages[snowflake]
+        self.deliver(tracked)
+        return True
+
+    def report_status(self, snowflake, user, status):
+        """Report a single recipient, e.g. one the server could not reach."""
+        delivery = Message_pb2.ChatMessageResponse.DeliveryStatus()
+        delivery.user.CopyFrom(user)
+        delivery.status = status
+        return self.report(snowflake, [delivery])
+
+    def __len__(self):
+        return len(self.messages)
+
+    def _pop_oldest(self):
+        """Remove the tracked message with the earliest deadline, caller holds self._cond"""
+        while self._deadlines:
+            deadline, snowflake = heapq.heappop(self._deadlines)
+            tracked = self.messages.get(snowflake)
+            if tracked is not None and tracked.deadline == deadline:
+                del self.messages[snowflake]
+                return [tracked]
+        return []
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    now = time.monotonic()
+                    if self._deadlines and self._deadlines[0][0] <= now:
+                        break
+                    self._cond.wait(self._deadlines[0][0] - now if self._deadlines else None)
+                if not self.running:
+                    return
+                expired = []
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    deadline, snowflake = heapq.heappop(self._deadlines)
+                    tracked = self.messages.get(snowflake)
+                    if tracked is not None and tracked.deadline == deadline:
+                        del self.messages[snowflake]
+                        expired.append(tracked)
+            self.expired += len(expired)
+            for tracked in expired:
+                self.deliver(tracked)
@@ -0,0 +1,281 @@
+"""
+Asyncio server network engine
+
+This module runs the TCP side of the chat server on a single asyncio event
+loop instead of one thread per connection. Every client and server link is a
+StreamReader/StreamWriter pair served by a coroutine; the frames themselves are
+handled by the same ServerSocket methods as in the threaded engine
+(register_client, handle_client_frame, handle_server_frame, ...), so purposes,
+routing and the clients/groups/server_list semantics are identical.
+
+UDP discovery, the heartbeat wheel and the reminder manager keep their own
+threads. They send through AsyncConnection, whose outbound queue is drained
+by a writer task on the event loop.
+
+Main classes:
+- AsyncConnection: StreamWriter plus negotiated codec, drained by a writer task
+- AsyncServerSocket: ServerSocket serving all TCP connections on one event loop
+"""
+
+import asyncio
+import random
+import traceback
+from proto import Message_pb2
+from modules.PackingandUnpacking import *
+from server.modern_server_ui import global_ms
+from server.connection import (QueuedConnection, DEFAULT_MAX_QUEUE, DEFAULT_BLOCK_TIMEOUT,
+                               SLOW_CONSUMER_DISCONNECT)
+from server.server_network import ServerSocket
+
+
+class AsyncConnection(QueuedConnection):
+    """
+    StreamWriter of a client or server link with its negotiated frame codec.
+
+    Offers the same interface as server.connection.Connection. A writer task on
+    the event loop drains the outbound queue and awaits StreamWriter.drain(),
+    so a slow receiver fills its own queue instead of the transport buffer.
+    Senders running on the event loop cannot wait for room, for them the
+    SLOW_CONSUMER_BLOCK policy disconnects right away.
+
+    Attributes:
+        writer (asyncio.StreamWriter): Write side of the connection.
+        loop (asyncio.AbstractEventLoop): The event loop owning the writer.
+    """
+
+    def __init__(self, writer, loop, addr=None, codec=ASCII_CODEC, max_queue=DEFAULT_MAX_QUEUE,
+                 policy=SLOW_CONSUMER_DISCONNECT, block_timeout=DEFAULT_BLOCK_TIMEOUT):
+        super().__init__(addr, codec, max_queue, policy, block_timeout)
+        self.writer = writer
+        self.loop = loop
+        self._wakeup = asyncio.Event()
+        self._writer_task = loop.create_task(self._write_loop())
+
+    def abort(self):
+        self._discard_pending()
+        # The writer task wakes up, also out of a drain() the aborted transport releases, and closes the writer
+        self._wake_writer()
+        self._call(self.writer.transport.abort)
+
+    async def _write_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                with self._cond:
+                    buffers, close = self._take_batch()
+                if not buffers and not close:
+                    break
+                try:
+                    if buffers:
+                        self.writer.writelines(buffers)
+                        await self.writer.drain()
+                except ConnectionError:
+                    close = True
+                    self._writer_failed()
+                if close:
+                    self.writer.close()
+                    return
+
+    def _abort_later(self, delay):
+        self._call(self.loop.call_later, delay, self.abort)
+
+    def _wake_writer(self):
+        self._call(self._wakeup.set)
+
+    def _can_block(self):
+        # Waiting on the event loop would also stop the writer task that makes room
+        return not self._in_loop()
+
+    def _in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def _call(self, func, *args):
+        if self._in_loop():
+            func(*args)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(func, *args)
+
+
+class AsyncServerSocket(ServerSocket):
+    """
+    Server network socket management class running on an asyncio event loop.
+
+    Drop-in replacement for ServerSocket: start_all() starts the event loop in
+    one background thread, and connect_to_server() may still be called from the
+    UDP discovery thread.
+
+    Attributes:
+        loop (asyncio.AbstractEventLoop): Event loop serving all TCP connections, None before start.
+        read_size (int): Maximum number of bytes read from a stream at once.
+    """
+
+    def __init__(self, ui_ref=None, server_id='Server_4', udp_port=65432, tcp_port=65433, udp_ports=None):
+        super().__init__(ui_ref=ui_ref, server_id=server_id, udp_port=udp_port, tcp_port=tcp_port, udp_ports=udp_ports)
+        self.loop = None
+        self.read_size = 65536
+
+    def new_connection(self, writer, addr, codec=ASCII_CODEC):
+        """Wrap a StreamWriter with its outbound queue and writer task, must run on the event loop"""
+        return AsyncConnection(writer, self.loop, addr, codec, max_queue=self.send_queue_size,
+                               policy=self.slow_consumer_policy, block_timeout=self.send_block_timeout)
+
+    def new_frame_decoder(self):
+        """StreamReader hands out a fresh bytes object per read, so the in-place decoder gains nothing here"""
+        return FrameDecoder(self.max_frame_size)
+
+    def start_tcp_server(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.heartbeats.start()
+        self.translations.start()
+        try:
+            self.loop.run_until_complete(self.serve_tcp())
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Asyncio TCP server stopped: {e}\n{traceback.format_exc()}")
+
+    async def serve_tcp(self):
+        server = await asyncio.start_server(self.handle_stream_client, '0.0.0.0', self.tcp_port, reuse_address=True)
+        self.tcp_socket = server.sockets[0]
+        global_ms.log_signal.emit(f"[Server] TCP Server started at port {self.tcp_port} (asyncio)")
+        async with server:
+            await server.serve_forever()
+
+    async def read_frames(self, reader, decoder):
+        """Yield (purpose, length, payload) for every frame until the peer closes the stream"""
+        while True:
+            data = await reader.read(self.read_size)
+            if not data:
+                return
+            for frame in decoder.feed(data):
+                yield frame
+
+    @staticmethod
+    async def first_frame(frames):
+        """Return the next frame of read_frames(), None if the peer closed first (anext() needs Python 3.10)"""
+        try:
+            return await frames.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    async def handle_stream_client(self, reader, writer):
+        client_addr = writer.get_extra_info('peername')
+        client_socket = self.new_connection(writer, client_addr)
+        global_ms.log_signal.emit(f"[Server] New TCP connection from {client_addr[0]}:{client_addr[1]}")
+        user_id = None
+        frames = self.read_frames(reader, self.new_frame_decoder())
+        try:
+            first_frame = await self.first_frame(frames)
+            if first_frame is None:
+                global_ms.log_signal.emit(f"[Server] Client {client_addr} disconnected (no data on connect)")
+                return
+
+            purpose, length, payload = first_frame
+            if purpose == 'CONNECT_CLIENT':
+                user_id = self.register_client(client_socket, payload)
+                if user_id is None:
+                    return
+            elif purpose == 'CONNECT_SERVER':
+                server_id = self.register_server(client_socket, payload)
+                if server_id is None:
+                    return
+                await self.handle_stream_server(client_socket, server_id, frames)
+                return
+            elif purpose == 'SEARCH_USERS':
+                self.handle_client_frame(client_socket, user_id, purpose, payload)
+            else:
+                global_ms.log_signal.emit("[Server] First packet is neither CONNECT_CLIENT nor CONNECT_SERVER, closing.")
+                return
+
+            async for purpose, length, payload in frames:
+                self.touch_client(client_socket)
+                self.handle_client_frame(client_socket, user_id, purpose, payload)
+
+            global_ms.log_signal.emit(f"[Server] Client {user_id} disconnected")
+
+        except FrameError as e:
+            global_ms.log_signal.emit(f"[Server] Closing connection of {user_id or client_addr}: {e}")
+            self.send_hangup(client_socket, e)
+        except ConnectionError as e:
+            global_ms.log_signal.emit(f"[Server] Client {user_id or client_addr} connection lost: {e}")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] handle_stream_client error: {e}\n{traceback.format_exc()}")
+        finally:
+            self.unregister_client(user_id, client_socket)
+            client_socket.close()
+
+    async def handle_stream_server(self, server_socket, server_id, frames):
+        """Handle message interaction between servers on the event loop"""
+        try:
+            async for purpose, length, payload in frames:
+                self.touch_server(server_socket)
+                self.handle_server_frame(server_socket, server_id, purpose, payload)
+
+            global_ms.log_signal.emit(f"[Server] Server {server_id} disconnected")
+
+        except FrameError as e:
+            global_ms.log_signal.emit(f"[Server] Closing link to server {server_id}: {e}")
+            self.send_hangup(server_socket, e)
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Error handling messages from server {server_id}: {e}")
+        finally:
+            self.unregister_server(server_id, server_socket)
+            server_socket.close()
+
+    def connect_to_server(self, server_id, ip, features):
+        if self.loop is None or not self.loop.is_running():
+            global_ms.log_signal.emit(f"[Server] Cannot connect to server {server_id}, TCP server is not running")
+            return
+        asyncio.run_coroutine_threadsafe(self.open_server_link(server_id, ip, features), self.loop)
+
+    async def open_server_link(self, server_id, ip, features):
+        # Check if connection already exists
+        with self.server_list_lock:
+            if server_id in self.server_list and self.server_list[server_id].get('socket'):
+                return
+
+        port = features[0][1] if features else self.tcp_port
+        try:
+            # Add brief delay to avoid simultaneous connection conflicts
+            await asyncio.sleep(random.uniform(0.5, 2.0))
+
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout=10)
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Failed to connect to server {server_id}@{ip}:{port}: {e}")
+            return
+
+        # Only switch to binary frames when the peer announced support for them
+        server_socket = self.new_connection(writer, (ip, port),
+                                            negotiate_codec([f[0] for f in features], self.binary_framing))
+        server_socket.send(self.connect_server_request(features))
+
+        # Wait for CONNECTED reply, frames coalesced with it stay in the decoder
+        frames = self.read_frames(reader, self.new_frame_decoder())
+        try:
+            first_frame = await asyncio.wait_for(self.first_frame(frames), timeout=10)
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Error waiting for CONNECTED reply: {e}")
+            server_socket.close()
+            return
+
+        if first_frame is None:
+            global_ms.log_signal.emit(f"[Server] No response from server {server_id}")
+            server_socket.close()
+            return
+        purpose, length, payload = first_frame
+        if purpose != 'CONNECTED':
+            global_ms.log_signal.emit(f"[Server] Received unexpected reply: {purpose}")
+            server_socket.close()
+            return
+        connect_response = Message_pb2.ConnectResponse()
+        connect_response.ParseFromString(payload)
+        if connect_response.result != Message_pb2.ConnectResponse.CONNECTED:
+            global_ms.log_signal.emit(f"[Server] Connection to server {server_id} rejected: {connect_response.result}")
+            server_socket.close()
+            return
+
+        self.add_server_link(server_id, ip, port, features, server_socket)
+        await self.handle_stream_server(server_socket, server_id, frames)
@@ -0,0 +1,157 @@
+"""
+Lock-striped client registry
+
+Replaces the client_info dictionary and its single client_info_lock. The
+connected clients are spread over a fixed number of shards by the hash of
+their userId, every shard has its own dictionary and lock, so registrations,
+disconnects and iterations of different shards do not wait for each other.
+Client activity is tracked per connection by the heartbeat wheel, see
+server/heartbeat.py.
+
+- Lookups (get, connection, connections) read the shard dictionaries without
+  taking a lock
+- Check-then-act updates (add, remove) take only the lock of the user's shard
+- Iteration walks the registry shard by shard, copying one shard at a time
+  under its lock, so walking all clients never blocks the whole registry
+
+Main classes:
+- ClientEntry: One connected client
+- ClientRegistry: userId -> ClientEntry in lock-striped shards
+"""
+
+from threading import Lock
+
+DEFAULT_STRIPES = 16  # Shards of the registry, a power of two
+
+
+class ClientEntry:
+    """
+    One connected client.
+
+    Attributes:
+        user_id (str): The userId the client connected with.
+        socket (Connection): The client's connection.
+        server_id (str): serverId the client connected with.
+        ip (str): Peer IP address.
+        port (int): Peer port.
+        thread (Thread | None): Thread that registered the client.
+    """
+
+    __slots__ = ('user_id', 'socket', 'server_id', 'ip', 'port', 'thread')
+
+    def __init__(self, user_id, socket, server_id, ip, port, thread=None):
+        self.user_id = user_id
+        self.socket = socket
+        self.server_id = server_id
+        self.ip = ip
+        self.port = port
+        self.thread = thread
+
+
+class ClientRegistry:
+    """
+    userId -> ClientEntry in lock-striped shards.
+
+    Attributes:
+        stripes (int): Number of shards.
+        on_add (callable | None): Called as on_add(entry) under the shard lock when a client is added.
+        on_remove (callable | None): Called as on_remove(entry) under the shard lock when a client is removed.
+    """
+
+    def __init__(self, stripes=DEFAULT_STRIPES, on_add=None, on_remove=None):
+        if stripes < 1 or stripes & (stripes - 1):
+            raise ValueError(f"Stripe count {stripes} must be a power of two")
+        self.stripes = stripes
+        self.on_add = on_add
+        self.on_remove = on_remove
+        self._mask = stripes - 1
+        self._shards = [{} for _ in range(stripes)]
+        self._locks = [Lock() for _ in range(stripes)]
+
+    def _index(self, user_id):
+        return hash(user_id) & self._mask
+
+    def add(self, entry, accept=None):
+        """
+        Register a client unless its userId is already connected.
+
+        Args:
+            entry (ClientEntry): The new client.
+            accept (callable | None): Called as accept(entry) under the shard lock once the
+                userId is known to be free, before other threads can see the entry.
+
+        Returns:
+            bool: False if a client with this userId is already registered.
+        """
+        index = self._index(entry.user_id)
+        shard = self._shards[index]
+        with self._locks[index]:
+            if entry.user_id in shard:
+                return False
+            if accept:
+                accept(entry)
+            shard[entry.user_id] = entry
+            if self.on_add:
+                self.on_add(entry)
+        return True
+
+    def remove(self, user_id, connection=None):
+        """
+        Remove a client.
+
+        Args:
+            user_id (str): The userId of the client.
+            connection (Connection | None): Only remove the client if it is still on this connection.
+
+        Returns:
+            ClientEntry | None: The removed entry, None if nothing was removed.
+        """
+        index = self._index(user_id)
+        shard = self._shards[index]
+        with self._locks[index]:
+            entry = shard.get(user_id)
+            if entry is None or (connection is not None and entry.socket is not connection):
+                return None
+            del shard[user_id]
+            if self.on_remove:
+                self.on_remove(entry)
+        return entry
+
+    def get(self, user_id):
+        """Return the entry of a connected client, None if it is not connected."""
+        return self._shards[hash(user_id) & self._mask].get(user_id)
+
+    def connection(self, user_id):
+        """Return the connection of a connected client, None if it is not connected."""
+        entry = self._shards[hash(user_id) & self._mask].get(user_id)
+        return entry.socket if entry is not None else None
+
+    def connections(self, user_ids):
+        """Return {userId: connection} for the given users that are connected."""
+        shards = self._shards
+        mask = self._mask
+        result = {}
+        for user_id in user_ids:
+            entry = shards[hash(user_id) & mask].get(user_id)
+            if entry is not None:
+                result[user_id] = entry.socket
+        return result
+
+    def shards(self):
+        """Yield the entries of one shard at a time, each list copied under that shard's lock."""
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                entries = list(shard.values())
+            if entries:
+                yield entries
+
+    def __iter__(self):
+        """Iterate all entries, shard by shard."""
+        for entries in self.shards():
+            yield from entries
+
+    def __contains__(self, user_id):
+        return user_id in self._shards[hash(user_id) & self._mask]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
@@ -0,0 +1,301 @@
+"""
+Server connection wrapper
+
+A Connection wraps the TCP socket of one client or server link together with
+the frame codec negotiated at connect time. It is stored as the socket of a
+client in ServerSocket.clients and as info['socket'] in ServerSocket.server_list,
+so code that only calls send()/close() keeps working, while hot paths use
+send_frame() to get the compact binary format on links that support it.
+
+Sending never touches the socket directly: frames are appended to a bounded
+per-connection outbound queue and written by the connection's own writer, so
+routing code holding a lock can never be stalled by a slow receiver. When the
+queue of a connection is full, its slow consumer policy decides what happens:
+
+- SLOW_CONSUMER_DROP: the new frame is discarded and counted
+- SLOW_CONSUMER_DISCONNECT: pending frames are discarded, the peer gets a HANGUP and is disconnected
+- SLOW_CONSUMER_BLOCK: the sender waits up to block_timeout seconds for room, then disconnects
+
+Main classes:
+- QueuedConnection: Outbound queue and slow consumer policy shared by all engines
+- Connection: Socket plus negotiated codec, drained by a writer thread
+- FramedPayload: One payload framed once per codec for fan-out
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from socket import SHUT_RD, SHUT_RDWR
+from proto import Message_pb2
+from modules.PackingandUnpacking import ASCII_CODEC, Packing, send_buffers
+from server.modern_server_ui import global_ms
+
+SLOW_CONSUMER_DROP = 'drop'
+SLOW_CONSUMER_DISCONNECT = 'disconnect'
+SLOW_CONSUMER_BLOCK = 'block'
+SLOW_CONSUMER_POLICIES = (SLOW_CONSUMER_DROP, SLOW_CONSUMER_DISCONNECT, SLOW_CONSUMER_BLOCK)
+
+DEFAULT_MAX_QUEUE = 1024  # Frames waiting to be written per connection
+DEFAULT_BLOCK_TIMEOUT = 2.0  # Seconds a sender waits for room with SLOW_CONSUMER_BLOCK
+
+HANGUP_GRACE = 1.0  # Seconds a hung up slow consumer gets to read its HANGUP before the connection is aborted
+
+# Frames written with one sendmsg() call, stays well below IOV_MAX
+WRITE_BATCH = 128
+
+# Queue marker that tells the writer to close the connection after the frames before it
+_CLOSE = object()
+
+
+def _owned(payload):
+    """Payload views of the zero-copy decoder are only valid until the next receive"""
+    return bytes(payload) if isinstance(payload, memoryview) else payload
+
+
+class FramedPayload:
+    """
+    A payload that is sent to many connections.
+
+    The frame is built lazily, at most once per codec, no matter how many
+    connections it is sent to.
+
+    Attributes:
+        purpose (str): The message purpose/type.
+        payload (bytes): The message payload data.
+    """
+
+    def __init__(self, purpose, payload):
+        self.purpose = purpose
+        self.payload = _owned(payload)
+        self._buffers = {}
+
+    def buffers_for(self, codec):
+        """Return the frame buffers of this payload for the given codec."""
+        buffers = self._buffers.get(codec.name)
+        if buffers is None:
+            buffers = codec.frame_buffers(self.purpose, self.payload)
+            self._buffers[codec.name] = buffers
+        return buffers
+
+
+class QueuedConnection(ABC):
+    """
+    Bounded outbound frame queue of one connection with its slow consumer policy.
+
+    Subclasses start the writer that drains the queue and implement
+    _wake_writer() and abort().
+
+    Attributes:
+        addr (tuple): Peer address (ip, port).
+        codec (AsciiCodec | BinaryCodec): Encoder used by send_frame().
+        max_queue (int): Maximum number of frames waiting to be written.
+        policy (str): One of SLOW_CONSUMER_POLICIES.
+        block_timeout (float): Seconds to wait for room with SLOW_CONSUMER_BLOCK.
+        closed (bool): No more frames are accepted.
+        dropped (int): Frames discarded by the slow consumer policy.
+    """
+
+    def __init__(self, addr=None, codec=ASCII_CODEC, max_queue=DEFAULT_MAX_QUEUE,
+                 policy=SLOW_CONSUMER_DISCONNECT, block_timeout=DEFAULT_BLOCK_TIMEOUT):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy '{policy}', expected one of {', '.join(SLOW_CONSUMER_POLICIES)}")
+        self.addr = addr
+        self.codec = codec
+        self.max_queue = max_queue
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.closed = False
+        self.dropped = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def send(self, data):
+        """
+        Queue an already packed frame.
+
+        Returns:
+            bool: True if the frame was queued, False if the slow consumer policy discarded it.
+
+        Raises:
+            ConnectionResetError: If the connection is already closed.
+        """
+        return self._enqueue((data,))
+
+    def send_frame(self, purpose, payload):
+        """Frame payload with the negotiated codec and queue it."""
+        return self._enqueue(self.codec.frame_buffers(purpose, _owned(payload)))
+
+    def send_framed(self, framed):
+        """Queue a FramedPayload shared with other connections."""
+        return self._enqueue(framed.buffers_for(self.codec))
+
+    def send_frames(self, purpose, payloads):
+        """Frame several payloads of one purpose and queue them as one entry, written together."""
+        frame_buffers = self.codec.frame_buffers
+        buffers = []
+        for payload in payloads:
+            buffers.extend(frame_buffers(purpose, payload))
+        # One joined buffer, a large batch must not exceed the buffer count of a single sendmsg()
+        return self._enqueue((b''.join(buffers),))
+
+    def close(self):
+        """Write the frames queued so far, then close the connection."""
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._queue.append(_CLOSE)
+            self._cond.notify_all()
+        self._wake_writer()
+
+    def hang_up(self, reason=Message_pb2.HangUp.TIMEOUT):
+        """Discard pending frames, send HANGUP and close the connection."""
+        hangup = Message_pb2.HangUp()
+        hangup.reason = reason
+        with self._cond:
+            if self.closed:
+                return
+            self.dropped += len(self._queue)
+            self._queue.clear()
+            self._queue.append((Packing('HANGUP', hangup.SerializeToString()),))
+            self._queue.append(_CLOSE)
+            self.closed = True
+            self._cond.notify_all()
+        self._wake_writer()
+        # A slow consumer may never read far enough to see the HANGUP
+        self._abort_later(HANGUP_GRACE)
+
+    @abstractmethod
+    def abort(self):
+        """Close the connection immediately, discarding pending frames."""
+
+    def _abort_later(self, delay):
+        """Call abort() after delay seconds on a timer thread."""
+        timer = threading.Timer(delay, self.abort)
+        timer.daemon = True
+        timer.start()
+
+    def pending(self):
+        """Return the number of frames waiting to be written."""
+        return len(self._queue)
+
+    def _enqueue(self, buffers):
+        with self._cond:
+            if self.closed:
+                raise ConnectionResetError(f"Connection to {self.addr} is closed")
+            if len(self._queue) >= self.max_queue:
+                if self.policy == SLOW_CONSUMER_DROP:
+                    self.dropped += 1
+                    return False
+                if self.policy == SLOW_CONSUMER_BLOCK and self._can_block():
+                    self._cond.wait_for(lambda: self.closed or len(self._queue) < self.max_queue, self.block_timeout)
+                    if self.closed:
+                        raise ConnectionResetError(f"Connection to {self.addr} is closed")
+            slow = len(self._queue) >= self.max_queue
+            if not slow:
+                self._queue.append(buffers)
+                self._cond.notify_all()
+        if slow:
+            global_ms.log_signal.emit(
+                f"[Server] Outbound queue of {self.addr} full ({self.max_queue} frames), disconnecting slow consumer")
+            self.hang_up()
+            return False
+        self._wake_writer()
+        return True
+
+    def _take_batch(self):
+        """
+        Pop up to WRITE_BATCH queued frames for one write, caller holds self._cond.
+
+        Returns:
+            tuple: (buffers, close), close is True when the connection must be closed after writing buffers.
+        """
+        buffers = []
+        close = False
+        for _ in range(min(len(self._queue), WRITE_BATCH)):
+            entry = self._queue.popleft()
+            if entry is _CLOSE:
+                close = True
+                break
+            buffers.extend(entry)
+        # Senders waiting with SLOW_CONSUMER_BLOCK may continue
+        self._cond.notify_all()
+        return buffers, close
+
+    def _discard_pending(self):
+        """Stop accepting frames and replace the pending ones by the close marker for the writer"""
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._queue.append(_CLOSE)
+            self._cond.notify_all()
+
+    def _writer_failed(self):
+        """Stop accepting frames after the peer went away"""
+        with self._cond:
+            self.closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def _can_block(self):
+        return True
+
+    def _wake_writer(self):
+        pass
+
+
+class Connection(QueuedConnection):
+    """
+    TCP socket of a client or server link with its negotiated frame codec.
+
+    A daemon writer thread drains the outbound queue, coalescing queued frames
+    into one sendmsg() call. Unknown attributes are delegated to the wrapped socket.
+
+    Attributes:
+        sock (socket): The connected TCP socket.
+    """
+
+    def __init__(self, sock, addr=None, codec=ASCII_CODEC, max_queue=DEFAULT_MAX_QUEUE,
+                 policy=SLOW_CONSUMER_DISCONNECT, block_timeout=DEFAULT_BLOCK_TIMEOUT):
+        super().__init__(addr, codec, max_queue, policy, block_timeout)
+        self.sock = sock
+        self._writer_thread = threading.Thread(target=self._write_loop, name=f'Writer-{addr}', daemon=True)
+        self._writer_thread.start()
+
+    def close(self):
+        super().close()
+        # Wake up the receive loop now, the writer closes the socket once the queue is flushed
+        try:
+            self.sock.shutdown(SHUT_RD)
+        except OSError:
+            pass
+
+    def abort(self):
+        self._discard_pending()
+        try:
+            self.sock.shutdown(SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                buffers, close = self._take_batch()
+            try:
+                if buffers:
+                    send_buffers(self.sock, buffers)
+            except OSError:
+                close = True
+                self._writer_failed()
+            if close:
+                try:
+                    self.sock.shutdown(SHUT_RDWR)
+                except OSError:
+                    pass
+                self.sock.close()
+                return
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
@@ -0,0 +1,207 @@
+"""
+Group message fan-out
+
+Delivers one group MESSAGE to all members of a group in two steps:
+
+1. partition(): split the members into local connections, remote home servers
+   (through the routing table) and members that cannot be reached
+2. send(): frame the payload once per codec for all local members, and give
+   every remote server a single queue entry that carries the message for all
+   of its members
+
+Members on another server are addressed with the protocol's userOfGroup
+recipient, one frame per member. The message body is not serialized again
+per member: protobuf keeps the last field of a oneof it reads, so appending
+an encoded userOfGroup field to the original payload readdresses it. The
+receiving server appends a group field the same way before handing the
+message to its user.
+
+No lock is held while sending, the connections queue the frames.
+
+Main classes:
+- FanoutPlan: Members of one group message split by location
+- GroupFanout: Partitions members and sends a group message
+"""
+
+from proto import Message_pb2
+from modules.PackingandUnpacking import encode_varint
+from server.connection import FramedPayload
+
+# Wire tags of the length-delimited fields ChatMessage.userOfGroup (5) and UserOfGroup.user (1)
+USER_OF_GROUP_TAG = bytes(((5 << 3) | 2,))
+USER_TAG = bytes(((1 << 3) | 2,))
+
+
+def readdress(payload, **recipient):
+    """
+    Return payload with its recipient replaced, without parsing it.
+
+    Args:
+        payload (bytes): A serialized ChatMessage.
+        **recipient: Exactly one of user=, group= or userOfGroup= with the new recipient.
+
+    Returns:
+        bytes: The readdressed ChatMessage.
+    """
+    return bytes(payload) + Message_pb2.ChatMessage(**recipient).SerializeToString()
+
+
+def user_of_group_suffix(group):
+    """
+    Return a function that encodes the userOfGroup recipient of one member.
+
+    The group is serialized once; per member only the User is. The result is
+    the same as readdress(b'', userOfGroup=UserOfGroup(user=user, group=group)).
+
+    Args:
+        group (Group): The group the message was sent to.
+
+    Returns:
+        callable: Maps (userId, serverId) to the encoded userOfGroup field.
+    """
+    group_part = Message_pb2.ChatMessage.UserOfGroup(group=group).SerializeToString()
+
+    def encode(user_id, server_id):
+        user = Message_pb2.User(userId=user_id, serverId=server_id).SerializeToString()
+        value = USER_TAG + encode_varint(len(user)) + user + group_part
+        return USER_OF_GROUP_TAG + encode_varint(len(value)) + value
+
+    return encode
+
+
+class FanoutPlan:
+    """
+    Members of one group message split by location.
+
+    Attributes:
+        local (list): (userId, connection) of members connected to this server.
+        remote (dict): serverId -> (link, [userId]) of members on other servers.
+        unreachable (list): userIds of members with neither a connection nor a route.
+    """
+
+    __slots__ = ('local', 'remote', 'unreachable')
+
+    def __init__(self):
+        self.local = []
+        self.remote = {}
+        self.unreachable = []
+
+    def recipients(self):
+        """Return the userIds of all members the message is meant for."""
+        users = [user_id for user_id, connection in self.local]
+        for link, user_ids in self.remote.values():
+            users.extend(user_ids)
+        users.extend(self.unreachable)
+        return users
+
+    def remote_users(self):
+        """Return the userIds of the members on other servers."""
+        return [user_id for link, user_ids in self.remote.values() for user_id in user_ids]
+
+    def split(self, key):
+        """
+        Split the reachable members into one plan per key.
+
+        Args:
+            key (callable): Maps a userId to the key of its plan, e.g. the member's language.
+
+        Returns:
+            dict: key -> FanoutPlan, unreachable members are left out.
+        """
+        plans = {}
+        for user_id, connection in self.local:
+            value = key(user_id)
+            plan = plans.get(value)
+            if plan is None:
+                plan = plans[value] = FanoutPlan()
+            plan.local.append((user_id, connection))
+        for server_id, (link, user_ids) in self.remote.items():
+            for user_id in user_ids:
+                value = key(user_id)
+                plan = plans.get(value)
+                if plan is None:
+                    plan = plans[value] = FanoutPlan()
+                entry = plan.remote.get(server_id)
+                if entry is None:
+                    entry = plan.remote[server_id] = (link, [])
+                entry[1].append(user_id)
+        return plans
+
+
+class GroupFanout:
+    """
+    Partitions group members by location and sends group messages to them.
+
+    Attributes:
+        local_connections (callable): Maps a list of userIds to {userId: connection} of the connected ones.
+        route (callable): Maps a userId to (serverId, link) of its home server, None if unknown.
+    """
+
+    def __init__(self, local_connections, route):
+        self.local_connections = local_connections
+        self.route = route
+
+    def partition(self, members, exclude=None):
+        """
+        Split the members of a group by location.
+
+        Args:
+            members (iterable): userIds of the group members.
+            exclude (str | None): userId that must not receive the message, usually the author.
+
+        Returns:
+            FanoutPlan: The partitioned members.
+        """
+        plan = FanoutPlan()
+        members = [member for member in members if member != exclude]
+        connections = self.local_connections(members)
+        for member in members:
+            connection = connections.get(member)
+            if connection is not None:
+                plan.local.append((member, connection))
+                continue
+            route = self.route(member)
+            if route is None:
+                plan.unreachable.append(member)
+                continue
+            server_id, link = route
+            entry = plan.remote.get(server_id)
+            if entry is None:
+                entry = plan.remote[server_id] = (link, [])
+            entry[1].append(member)
+        return plan
+
+    def send(self, plan, payload, group):
+        """
+        Send a group message to the members of a plan.
+
+        Args:
+            plan (FanoutPlan): The partitioned members.
+            payload (bytes | memoryview): The serialized ChatMessage addressed to the group.
+            group (Group): The group the message was sent to.
+
+        Returns:
+            list: userIds the message could not be queued for.
+        """
+        failed = []
+        if plan.local:
+            # Framed once per codec, shared by all local members
+            framed = FramedPayload('MESSAGE', payload)
+            for member, connection in plan.local:
+                try:
+                    if not connection.send_framed(framed):
+                        failed.append(member)
+                except ConnectionError:
+                    failed.append(member)
+
+        if plan.remote:
+            payload = bytes(payload)
+            suffix = user_of_group_suffix(group)
+            for server_id, (link, members) in plan.remote.items():
+                payloads = [payload + suffix(member, server_id) for member in members]
+                try:
+                    if not link.send_frames('MESSAGE', payloads):
+                        failed.extend(members)
+                except ConnectionError:
+                    failed.extend(members)
+        return failed
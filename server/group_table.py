@@ -0,0 +1,184 @@
+"""
+Copy-on-write group table
+
+Groups are stored as immutable snapshots. A change never modifies a
+snapshot, it builds a new one with the next version number and swaps it into
+the table with a single assignment. Readers (group fan-out,
+QUERY_GROUP_MEMBERS, INVITE_GROUP checks) therefore take no lock: they get
+the snapshot that is current at that moment and can iterate its members for
+as long as they like, while joins and leaves go on.
+
+Writers are serialized by one lock, so two concurrent changes of the same
+group cannot lose each other's update. Membership changes are rare compared
+to reads, copying the member set on write is the cheaper side.
+
+A snapshot also carries the language every member reads the group in, the
+server translates group messages once per language, see
+ServerSocket.route_group_translation().
+
+Main classes:
+- GroupSnapshot: Immutable state of one group
+- GroupTable: groupId -> current GroupSnapshot
+"""
+
+from threading import Lock
+from types import MappingProxyType
+
+
+class GroupSnapshot:
+    """
+    Immutable state of one group.
+
+    Attributes:
+        group_id (str): The groupId.
+        display_name (str): Name shown to the members.
+        admins (frozenset): userIds of the admins.
+        members (frozenset): userIds of the members.
+        languages (Mapping): userId -> protobuf Language the member reads the group in, read-only.
+        version (int): Increased by every change of the group, starting at 1.
+    """
+
+    __slots__ = ('group_id', 'display_name', 'admins', 'members', 'languages', 'version')
+
+    def __init__(self, group_id, display_name, admins, members, version=1, languages=None):
+        object.__setattr__(self, 'group_id', group_id)
+        object.__setattr__(self, 'display_name', display_name)
+        object.__setattr__(self, 'admins', frozenset(admins))
+        object.__setattr__(self, 'members', frozenset(members))
+        object.__setattr__(self, 'languages', MappingProxyType(dict(languages or {})))
+        object.__setattr__(self, 'version', version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"GroupSnapshot is immutable, cannot set '{name}'")
+
+    def replace(self, **changes):
+        """Return a copy with the given attributes changed and the next version."""
+        return GroupSnapshot(changes.get('group_id', self.group_id),
+                             changes.get('display_name', self.display_name),
+                             changes.get('admins', self.admins),
+                             changes.get('members', self.members),
+                             self.version + 1,
+                             changes.get('languages', self.languages))
+
+    def __repr__(self):
+        return (f"GroupSnapshot({self.group_id!r}, v{self.version}, "
+                f"{len(self.members)} members, {len(self.admins)} admins)")
+
+
+class GroupTable:
+    """
+    groupId -> current GroupSnapshot.
+
+    Lookups read the dictionary without taking the lock, changes are done
+    under it and replace the whole snapshot of a group.
+    """
+
+    def __init__(self):
+        self._groups = {}  # groupId -> GroupSnapshot
+        self._lock = Lock()
+
+    def get(self, group_id):
+        """Return the current snapshot of a group, None if it does not exist."""
+        return self._groups.get(group_id)
+
+    def members(self, group_id):
+        """Return the current members of a group as a frozenset, None if it does not exist."""
+        group = self._groups.get(group_id)
+        return group.members if group is not None else None
+
+    def snapshot(self):
+        """Return the snapshots of all groups."""
+        with self._lock:
+            return list(self._groups.values())
+
+    def modify(self, group_id, display_name, admins):
+        """
+        Create a group, or rename it and replace its admins.
+
+        A new group starts with its admins as members, the members of an
+        existing group stay as they are.
+
+        Returns:
+            GroupSnapshot: The new snapshot.
+        """
+        with self._lock:
+            group = self._groups.get(group_id)
+            if group is None:
+                group = GroupSnapshot(group_id, display_name, admins, admins)
+            else:
+                group = group.replace(display_name=display_name, admins=admins)
+            self._groups[group_id] = group
+            return group
+
+    def delete(self, group_id):
+        """Remove a group, returns False if it did not exist."""
+        with self._lock:
+            return self._groups.pop(group_id, None) is not None
+
+    def add_member(self, group_id, user_id):
+        """
+        Add a user to the members of a group.
+
+        Returns:
+            GroupSnapshot | None: The current snapshot, None if the group does not exist.
+        """
+        with self._lock:
+            group = self._groups.get(group_id)
+            if group is None or user_id in group.members:
+                return group
+            group = group.replace(members=group.members | {user_id})
+            self._groups[group_id] = group
+            return group
+
+    def remove_member(self, group_id, user_id):
+        """
+        Remove a user from the members and admins of a group.
+
+        A group without members is deleted, the returned snapshot then has no
+        members.
+
+        Returns:
+            GroupSnapshot | None: The new snapshot, None if the group does not exist.
+        """
+        with self._lock:
+            group = self._groups.get(group_id)
+            if group is None:
+                return None
+            languages = {member: language for member, language in group.languages.items() if member != user_id}
+            group = group.replace(members=group.members - {user_id}, admins=group.admins - {user_id},
+                                  languages=languages)
+            if group.members:
+                self._groups[group_id] = group
+            else:
+                del self._groups[group_id]
+            return group
+
+    def set_language(self, group_id, user_id, language):
+        """
+        Record the language a member reads a group in.
+
+        Args:
+            group_id (str): The groupId.
+            user_id (str): userId of the member.
+            language (int): protobuf Language value.
+
+        Returns:
+            GroupSnapshot | None: The current snapshot, None if the group does not exist.
+        """
+        group = self._groups.get(group_id)
+        if group is None or user_id not in group.members or group.languages.get(user_id) == language:
+            # Nothing to change, checked without the lock first as languages rarely change
+            return group
+        with self._lock:
+            group = self._groups.get(group_id)
+            if group is None or user_id not in group.members:
+                return group
+            group = group.replace(languages={**group.languages, user_id: language})
+            self._groups[group_id] = group
+            return group
+
+    def __contains__(self, group_id):
+        return group_id in self._groups
+
+    def __len__(self):
+        return len(self._groups)
@@ -0,0 +1,208 @@
+"""
+Heartbeat timing wheel
+
+Replaces the heartbeat monitors that woke up every heartbeat_interval,
+walked every client and server link and sent each of them a PING. Every
+connection has its own deadline in a hashed timing wheel instead:
+
+- touch() records activity with a single attribute store, it does not move
+  the connection in the wheel. When the deadline comes and the connection was
+  active in the meantime, it is simply rescheduled interval seconds after its
+  last activity (lazy refresh).
+- A connection that was idle for interval seconds gets a PING, and one that
+  was idle for timeout seconds is expired. Busy connections are never pinged.
+- Deadlines follow each connection's own activity, and the first one gets a
+  random offset, so PINGs are spread over the interval instead of going out
+  to every connection at once.
+
+The wheel has SLOTS slots of TICK seconds. A tick only looks at the
+connections of its slot, firing a deadline is O(1). Deadlines further away
+than one revolution stay in their slot until their tick comes round.
+
+PING and expiry callbacks run on the wheel's thread, outside of its lock.
+
+Main classes:
+- HeartbeatWheel: Hashed timing wheel of connection deadlines
+"""
+
+import random
+import time
+from threading import Thread, Condition
+
+TICK = 0.25  # Seconds per slot, the precision of PINGs and timeouts
+SLOTS = 256  # Slots of the wheel, a power of two, one revolution is TICK * SLOTS seconds
+JITTER = 0.5  # First deadline of a connection is up to this share of the interval later
+
+
+class _Watch:
+    """One connection in the wheel."""
+
+    __slots__ = ('connection', 'ping', 'expire', 'last_active', 'tick')
+
+    def __init__(self, connection, ping, expire, last_active):
+        self.connection = connection
+        self.ping = ping
+        self.expire = expire
+        self.last_active = last_active
+        self.tick = 0
+
+
+class HeartbeatWheel:
+    """
+    Hashed timing wheel of connection deadlines.
+
+    Attributes:
+        interval (float): Seconds of inactivity after which a connection gets a PING.
+        timeout (float): Seconds of inactivity after which a connection is expired.
+        tick (float): Seconds per slot.
+        clock (callable): Returns the current time in seconds, time.monotonic by default.
+        pings (int): PINGs sent so far.
+        expired (int): Connections expired so far.
+    """
+
+    def __init__(self, interval, timeout, tick=TICK, slots=SLOTS, jitter=JITTER, clock=time.monotonic):
+        if slots < 1 or slots & (slots - 1):
+            raise ValueError(f"Slot count {slots} must be a power of two")
+        self.interval = interval
+        self.timeout = timeout
+        self.tick = tick
+        self.jitter = jitter
+        self.clock = clock
+        self.pings = 0
+        self.expired = 0
+        self._mask = slots - 1
+        self._slots = [{} for _ in range(slots)]
+        self._watches = {}  # connection -> _Watch
+        self._current = self._tick_of(clock())  # Last tick that was processed
+        self._cond = Condition()
+        self.running = False
+        self.worker_thread = None
+
+    def start(self):
+        """Start firing deadlines"""
+        if self.running:
+            return
+        self.running = True
+        self.worker_thread = Thread(target=self._worker_loop, name='HeartbeatWheel', daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """Stop the wheel's worker"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+
+    def add(self, connection, ping, expire):
+        """
+        Start watching a connection.
+
+        Args:
+            connection (Connection): The connection, also the key of the watch.
+            ping (callable): Called as ping(connection) when the connection is idle.
+            expire (callable): Called as expire(connection) when the connection timed out, the watch is removed then.
+        """
+        now = self.clock()
+        watch = _Watch(connection, ping, expire, now)
+        with self._cond:
+            self._remove(connection)
+            self._watches[connection] = watch
+            self._schedule(watch, now + self.interval * (1 + self.jitter * random.random()))
+            self._cond.notify()
+
+    def remove(self, connection):
+        """Stop watching a connection, returns False if it was not watched."""
+        with self._cond:
+            return self._remove(connection)
+
+    def touch(self, connection):
+        """Record activity of a connection, without taking a lock."""
+        watch = self._watches.get(connection)
+        if watch is not None:
+            watch.last_active = self.clock()
+
+    def poll(self):
+        """
+        Fire the deadlines that are due, the worker does this every tick.
+
+        Returns:
+            int: Number of PINGs and expiries that were triggered.
+        """
+        with self._cond:
+            actions = self._advance(self.clock())
+        for callback, connection in actions:
+            callback(connection)
+        return len(actions)
+
+    def __contains__(self, connection):
+        return connection in self._watches
+
+    def __len__(self):
+        return len(self._watches)
+
+    def _tick_of(self, when):
+        return int(when / self.tick)
+
+    def _schedule(self, watch, when):
+        """Put a watch into the slot of its deadline, caller holds self._cond."""
+        watch.tick = max(self._tick_of(when), self._current + 1)
+        self._slots[watch.tick & self._mask][watch.connection] = watch
+
+    def _remove(self, connection):
+        watch = self._watches.pop(connection, None)
+        if watch is None:
+            return False
+        self._slots[watch.tick & self._mask].pop(connection, None)
+        return True
+
+    def _advance(self, now):
+        """Process the ticks up to now, caller holds self._cond. Returns [(callback, connection)]."""
+        target = self._tick_of(now)
+        slots = self._slots
+        mask = self._mask
+        tick = self.tick
+        interval = self.interval
+        timeout = self.timeout
+        if target - self._current > mask + 1:
+            # Fell behind by more than a revolution, every slot is visited once anyway
+            self._current = target - mask - 1
+        actions = []
+        while self._current < target:
+            current = self._current = self._current + 1
+            slot = slots[current & mask]
+            due = [watch for watch in slot.values() if watch.tick <= current]
+            for watch in due:
+                connection = watch.connection
+                del slot[connection]
+                idle = now - watch.last_active
+                if idle >= timeout:
+                    del self._watches[connection]
+                    actions.append((watch.expire, connection))
+                    self.expired += 1
+                    continue
+                if idle >= interval:
+                    actions.append((watch.ping, connection))
+                    self.pings += 1
+                    when = min(now + interval, watch.last_active + timeout)
+                else:
+                    # Active since the deadline was set, only now move it
+                    when = watch.last_active + interval
+                # Same as _schedule()
+                watch.tick = max(int(when / tick), current + 1)
+                slots[watch.tick & mask][connection] = watch
+        return actions
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self.running and not self._watches:
+                    self._cond.wait()
+                if not self.running:
+                    return
+                now = self.clock()
+                actions = self._advance(now)
+                if not actions:
+                    self._cond.wait((self._current + 1) * self.tick - now)
+            for callback, connection in actions:
+                callback(connection)
@@ -410,15 +410,15 @@ class Stats:
         # Add all connected clients
         if hasattr(self, 'server_socket'):
             # Client list
-            with self.server_socket.client_info_lock:
-                for user_id, info in self.server_socket.client_info.items():
-                    self.ui.ClientServerList.addItem(f"[Client] {user_id} @ {info['ip']}:{info['port']}")
+            # Shard by shard, registrations in other shards go on meanwhile
+            for entry in self.server_socket.clients:
+                self.ui.ClientServerList.addItem(f"[Client] {entry.user_id} @ {entry.ip}:{entry.port}")
             # Server list
             with self.server_socket.server_list_lock:
                 for server_id, info in self.server_socket.server_list.items():
                     self.ui.ClientServerList.addItem(f"[Server] {server_id} @ {info['ip']}:{info['port']}")
             
             # Update status bar
-            client_count = len(self.server_socket.client_info)
+            client_count = len(self.server_socket.clients)
             server_count = len(self.server_socket.server_list)
             self.set_status(f"Running - {client_count} clients, {server_count} servers", color="#2c3e50")
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+Pending user searches
+
+A SEARCH_USERS request of a client is answered by this server and by every
+linked server. The searches waiting for remote answers are kept in a table
+keyed by the handle the search was forwarded with, so a SEARCH_USERS_RESP
+from another server finds its search with one lookup.
+
+Each search is answered with a single QueryUsersResponse: remote users are
+merged into the local result, without duplicates, and the response is sent
+as soon as every server answered or the deadline passed, whichever comes
+first. Searches of clients that disconnect are dropped, and the number of
+pending searches is capped.
+
+Paging applies to the merged result: every server answers with its first
+offset + limit matches, the local users come first, then the users of the
+other servers by serverId, and the client's page is cut from that list. A
+server answers with at most its max_limit first matches, so pages reaching
+beyond them can miss users.
+
+Main classes:
+- PendingSearch: One search waiting for remote answers
+- PendingSearchTable: Searches keyed by forwarded handle, with deadlines
+"""
+
+import heapq
+import time
+from itertools import chain
+from threading import Thread, Condition
+from proto import Message_pb2
+from modules.snowflake import SnowflakeGenerator
+
+SEARCH_TIMEOUT = 2.0  # Seconds to wait for remote servers before answering with what arrived
+MAX_PENDING = 10_000  # Searches waiting at most, further searches are answered locally only
+
+
+class PendingSearch:
+    """
+    One search waiting for remote answers.
+
+    Attributes:
+        handle (int): Handle the search was forwarded with.
+        client_handle (int): Handle chosen by the client.
+        connection (Connection): Connection of the searching client.
+        offset (int): Number of merged users the client skips.
+        limit (int): Number of merged users in the client's page.
+        results (list): (userId, serverId) lists of the servers that answered, the local users first.
+        has_more (bool): At least one server has more matches than it answered with.
+        waiting (int): Number of servers that did not answer yet.
+        deadline (float): time.monotonic() after which the search is answered anyway.
+    """
+
+    __slots__ = ('handle', 'client_handle', 'connection', 'offset', 'limit', 'results', 'has_more', 'waiting',
+                 'deadline')
+
+    def __init__(self, handle, client_handle, connection, waiting, deadline, offset, limit):
+        self.handle = handle
+        self.client_handle = client_handle
+        self.connection = connection
+        self.offset = offset
+        self.limit = limit
+        self.results = []
+        self.has_more = False
+        self.waiting = waiting
+        self.deadline = deadline
+
+    def merge(self, response):
+        """Add the users of a QueryUsersResponse, the first one merged is the local result."""
+        self.results.append([(user.userId, user.serverId) for user in response.users])
+        self.has_more = self.has_more or response.hasMore
+
+    def users(self):
+        """
+        Return the merged users, without duplicates.
+
+        Returns:
+            list: (userId, serverId) of the local users, then of the other servers by serverId.
+        """
+        local, remote = self.results[:1], sorted(self.results[1:], key=lambda users: users[0][1] if users else '')
+        seen = set()
+        merged = []
+        for key in chain(*local, *remote):
+            if key not in seen:
+                seen.add(key)
+                merged.append(key)
+        return merged
+
+    def response(self):
+        """Build the QueryUsersResponse with the client's page of the merged users."""
+        users = self.users()
+        end = self.offset + self.limit
+        response = Message_pb2.QueryUsersResponse()
+        response.handle = self.client_handle
+        response.hasMore = self.has_more or len(users) > end
+        for user_id, server_id in users[self.offset:end]:
+            user = response.users.add()
+            user.userId = user_id
+            user.serverId = server_id
+        return response
+
+
+class PendingSearchTable:
+    """
+    Searches waiting for remote answers, keyed by forwarded handle.
+
+    A worker thread answers searches whose deadline passed. Finished searches
+    are handed to the deliver callback outside of the table's lock.
+
+    Attributes:
+        deliver (callable): Called as deliver(search) once a search is finished.
+        next_handle (callable): Returns a new handle to forward a search with.
+        timeout (float): Seconds a search waits for remote servers.
+        max_pending (int): Maximum number of waiting searches.
+    """
+
+    def __init__(self, deliver, timeout=SEARCH_TIMEOUT, max_pending=MAX_PENDING, next_handle=None):
+        self.deliver = deliver
+        self.next_handle = next_handle or SnowflakeGenerator().next_id
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.searches = {}
+        self._deadlines = []  # Heap of (deadline, handle), entries of finished searches are skipped
+        self._cond = Condition()
+        self.running = False
+        self.worker_thread = None
+
+    def start(self):
+        """Start answering searches at their deadline"""
+        if self.running:
+            return
+        self.running = True
+        self.worker_thread = Thread(target=self._worker_loop, name='PendingSearch', daemon=True)
+        self.worker_thread.start()
+
+    def stop(self):
+        """Stop the deadline worker"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        if self.worker_thread:
+            self.worker_thread.join()
+
+    def open(self, client_handle, connection, local_response, servers, offset, limit):
+        """
+        Register a search that is forwarded to other servers.
+
+        Args:
+            client_handle (int): Handle chosen by the client.
+            connection (Connection): Connection of the searching client.
+            local_response (QueryUsersResponse): The first offset + limit users found on this server.
+            servers (int): Number of servers the search is forwarded to.
+            offset (int): Number of merged users the client skips.
+            limit (int): Number of merged users in the client's page.
+
+        Returns:
+            int | None: The handle to forward the search with, None if the table
+            is full and the search must be answered with local_response only.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            if len(self.searches) >= self.max_pending:
+                return None
+            handle = self.next_handle()
+            search = PendingSearch(handle, client_handle, connection, servers, deadline, offset, limit)
+            search.merge(local_response)
+            self.searches[handle] = search
+            heapq.heappush(self._deadlines, (deadline, handle))
+            if self._deadlines[0][1] == handle:
+                self._cond.notify()
+        return handle
+
+    def add_response(self, response):
+        """
+        Merge the answer of a remote server into its search.
+
+        Args:
+            response (QueryUsersResponse): The answer, its handle is the forwarded handle.
+
+        Returns:
+            bool: False if no search is waiting for this handle (late or unknown answer).
+        """
+        with self._cond:
+            search = self.searches.get(response.handle)
+            if search is None:
+                return False
+            search.merge(response)
+            search.waiting -= 1
+            if search.waiting > 0:
+                return True
+            del self.searches[response.handle]
+        self.deliver(search)
+        return True
+
+    def drop_connection(self, connection):
+        """Forget the searches of a client that disconnected."""
+        with self._cond:
+            for handle in [h for h, s in self.searches.items() if s.connection is connection]:
+                del self.searches[handle]
+
+    def __len__(self):
+        return len(self.searches)
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    now = time.monotonic()
+                    if self._deadlines and self._deadlines[0][0] <= now:
+                        break
+                    self._cond.wait(self._deadlines[0][0] - now if self._deadlines else None)
+                if not self.running:
+                    return
+                expired = []
+                while self._deadlines and self._deadlines[0][0] <= now:
+                    deadline, handle = heapq.heappop(self._deadlines)
+                    search = self.searches.pop(handle, None)
+                    if search is not None:
+                        expired.append(search)
+            for search in expired:
+                self.deliver(search)
@@ -0,0 +1,161 @@
+"""
+Cross-server routing table
+
+Keeps the indexes the server needs to forward a direct message to a user on
+another server with dictionary lookups only:
+
+- serverId -> link connection, maintained when server links come up and go down
+- userId -> home serverId, learned from SEARCH_USERS responses and from
+  messages other servers forwarded to us
+
+Targets that could not be resolved are remembered in a negative cache for a
+short time, so repeated messages to an unknown server are answered with
+OTHER_SERVER_NOT_FOUND right away. A new link or a newly learned home clears
+the matching negative entries.
+
+Main classes:
+- RoutingTable: serverId and user indexes with a negative cache
+"""
+
+import time
+from threading import Lock
+
+NEGATIVE_TTL = 10.0  # Seconds an unresolvable target is answered from the negative cache
+MAX_HOMES = 100_000  # Learned user homes kept at most, the oldest are forgotten first
+MAX_NEGATIVE = 10_000  # Negative entries kept at most, expired ones are purged beyond that
+
+
+class RoutingTable:
+    """
+    serverId -> link and userId -> home server indexes.
+
+    Lookups read the dictionaries without taking the lock, updates are done
+    under it.
+
+    Attributes:
+        negative_ttl (float): Seconds a failed resolution is cached.
+        max_homes (int): Maximum number of learned user homes.
+        hits (int): Resolutions that found a link.
+        misses (int): Resolutions that found no link.
+        negative_hits (int): Misses answered from the negative cache.
+    """
+
+    def __init__(self, negative_ttl=NEGATIVE_TTL, max_homes=MAX_HOMES):
+        self.negative_ttl = negative_ttl
+        self.max_homes = max_homes
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self._links = {}  # serverId -> connection
+        self._homes = {}  # userId -> serverId, insertion ordered for eviction
+        self._unknown = {}  # target key -> expiry time
+        self._lock = Lock()
+
+    def add_link(self, server_id, connection):
+        """Index the link to a server that just connected."""
+        with self._lock:
+            self._links[server_id] = connection
+            self._unknown.pop(server_id, None)
+            # Users whose home is this server may have been cached as unreachable
+            for key in [key for key in self._unknown if self._homes.get(key) == server_id]:
+                del self._unknown[key]
+
+    def remove_link(self, server_id, connection=None):
+        """
+        Drop the link to a server.
+
+        Args:
+            server_id (str): The serverId of the link.
+            connection (Connection | None): Only drop the link if it is still this connection.
+        """
+        with self._lock:
+            if connection is None or self._links.get(server_id) is connection:
+                self._links.pop(server_id, None)
+
+    def link(self, server_id):
+        """Return the link to a server, None if there is none."""
+        return self._links.get(server_id)
+
+    def learn_user(self, user_id, server_id):
+        """Record that a user is reachable through the link to server_id."""
+        if self._homes.get(user_id) == server_id:
+            return
+        with self._lock:
+            self._homes.pop(user_id, None)
+            self._homes[user_id] = server_id
+            if len(self._homes) > self.max_homes:
+                del self._homes[next(iter(self._homes))]
+            self._unknown.pop(user_id, None)
+
+    def forget_user(self, user_id):
+        """Forget the remote home of a user, e.g. after the user connected to this server."""
+        if user_id in self._homes:
+            with self._lock:
+                self._homes.pop(user_id, None)
+
+    def home(self, user_id):
+        """Return the learned home serverId of a user, None if unknown."""
+        return self._homes.get(user_id)
+
+    def resolve(self, user_id, server_id=''):
+        """
+        Find the link a message for a remote user has to be forwarded to.
+
+        A serverId given by the sender is routed to the link of that server,
+        without one the learned home of the user is used.
+
+        Args:
+            user_id (str): The target userId.
+            server_id (str): The target serverId given by the sender, may be empty.
+
+        Returns:
+            tuple | None: (serverId, connection), None if no link is known.
+        """
+        key = server_id or user_id
+        expiry = self._unknown.get(key)
+        if expiry is not None:
+            if expiry > time.monotonic():
+                self.negative_hits += 1
+                self.misses += 1
+                return None
+            with self._lock:
+                self._unknown.pop(key, None)
+
+        target = server_id or self._homes.get(user_id)
+        connection = self._links.get(target) if target else None
+        if connection is not None:
+            self.hits += 1
+            return target, connection
+
+        self.misses += 1
+        now = time.monotonic()
+        with self._lock:
+            self._unknown[key] = now + self.negative_ttl
+            if len(self._unknown) > MAX_NEGATIVE:
+                self._purge_negative(now)
+        return None
+
+    def _purge_negative(self, now):
+        """Drop expired negative entries, caller holds self._lock"""
+        # All entries share one TTL, so insertion order is expiry order
+        while self._unknown:
+            key = next(iter(self._unknown))
+            if self._unknown[key] > now and len(self._unknown) <= MAX_NEGATIVE:
+                break
+            del self._unknown[key]
+
+    def stats(self):
+        """
+        Return the size and counters of the table.
+
+        Returns:
+            dict: links, homes, negative, hits, misses, negative_hits
+        """
+        return {
+            'links': len(self._links),
+            'homes': len(self._homes),
+            'negative': len(self._unknown),
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits,
+        }
@@ -16,6 +16,13 @@ sys.path.insert(0, project_root)
 
 from server.modern_server_ui import Stats, global_ms
 from server.server_network import ServerSocket
+from server.async_server_network import AsyncServerSocket
+from server.connection import (DEFAULT_MAX_QUEUE, DEFAULT_BLOCK_TIMEOUT, SLOW_CONSUMER_DISCONNECT,
+                               SLOW_CONSUMER_POLICIES)
+from modules.PackingandUnpacking import wire_logger
+from modules.Translator import set_backend
+from server.translation_service import BATCH_DELAY
+from modules.reminder_journal import ReminderJournal
 import argparse
 
 def parse_args():
@@ -27,19 +34,62 @@ def parse_args():
             - serverid (str): Server ID, default is 'Server_4'
             - udpport (int): UDP listening port, default is 9999
             - tcpport (int): TCP listening port, default is 65433
+            - wire_log (str): Frame logging level 'off', 'sampled[:N]' or 'full', default is 'off'
+            - framing (str): Frame format offered to peers, 'binary' or 'ascii', default is 'binary'
+            - engine (str): Network engine, 'thread' (one thread per connection) or 'asyncio', default is 'thread'
+            - send_queue (int): Outbound frames queued per connection, default is 1024
+            - slow_consumer (str): Policy when a queue is full, 'drop', 'disconnect' or 'block', default is 'disconnect'
+            - send_block_timeout (float): Seconds a sender waits with the 'block' policy, default is 2.0
+            - translation_backend (str): 'google', 'dictionary[:latency]' or 'noop', default is 'google'
+            - translation_batch_delay (float): Milliseconds translation requests are collected into a batch, default is 5
+            - reminder_journal (str): Path of the reminder journal files without extension, default is $IK_REMINDER_JOURNAL or none
     """
     parser = argparse.ArgumentParser(description='IK Server startup parameters')
     parser.add_argument('--serverid', type=str, default='Server_4', help='This group serverId')
     parser.add_argument('--udpport', type=int, default=9999, help='UDP listening port')
     parser.add_argument('--tcpport', type=int, default=65433, help='TCP listening port')
+    parser.add_argument('--wire-log', type=str, default=None,
+                        help="Log sent/received frames: off, sampled[:N] (1 in N) or full (default: $IK_WIRE_LOG or off)")
+    parser.add_argument('--framing', choices=['binary', 'ascii'], default='binary',
+                        help='Frame format offered to clients and servers, binary is only used with peers that support it')
+    parser.add_argument('--engine', choices=['thread', 'asyncio'], default='thread',
+                        help='TCP engine: one thread per connection, or a single asyncio event loop for many clients')
+    parser.add_argument('--send-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help='Outbound frames queued per connection before the slow consumer policy applies')
+    parser.add_argument('--slow-consumer', choices=SLOW_CONSUMER_POLICIES, default=SLOW_CONSUMER_DISCONNECT,
+                        help='When a receiver falls behind: drop new frames, disconnect it with HANGUP, or block senders')
+    parser.add_argument('--send-block-timeout', type=float, default=DEFAULT_BLOCK_TIMEOUT,
+                        help="Seconds a sender waits for room with --slow-consumer block before disconnecting")
+    parser.add_argument('--translation-backend', type=str, default=None,
+                        help="Translate with google, dictionary[:latency] (offline, latency in seconds) or noop "
+                             "(default: $IK_TRANSLATION_BACKEND or google)")
+    parser.add_argument('--translation-batch-delay', type=float, default=BATCH_DELAY * 1000,
+                        help='Milliseconds a translation worker collects requests for one backend call, 0 disables batching')
+    parser.add_argument('--reminder-journal', type=str, default=None,
+                        help="Keep pending reminders across restarts in <path>.log and <path>.snapshot "
+                             "(default: $IK_REMINDER_JOURNAL or not kept)")
     return parser.parse_args()
 
 if __name__ == '__main__':
     args = parse_args()
+    if args.wire_log is not None:
+        wire_logger.configure(level=args.wire_log)
+    if args.translation_backend is not None:
+        set_backend(args.translation_backend)
     app = QApplication([])
     main = Stats()
-    server_socket = ServerSocket(server_id=args.serverid, udp_port=args.udpport, tcp_port=args.tcpport)
+    server_class = AsyncServerSocket if args.engine == 'asyncio' else ServerSocket
+    server_socket = server_class(server_id=args.serverid, udp_port=args.udpport, tcp_port=args.tcpport)
+    server_socket.binary_framing = args.framing == 'binary'
+    server_socket.send_queue_size = args.send_queue
+    server_socket.slow_consumer_policy = args.slow_consumer
+    server_socket.send_block_timeout = args.send_block_timeout
+    server_socket.translations.batch_delay = args.translation_batch_delay / 1000
+    if args.reminder_journal:
+        server_socket.reminder_manager.journal = ReminderJournal(args.reminder_journal)
     main.server_socket = server_socket  # Inject server_socket to UI
     server_socket.ui = main.ui  # Compatibility retention
     main.ui.show()
     app.exec()
+    # Writes the reminders still buffered for the journal
+    server_socket.reminder_manager.stop()
@@ -21,10 +21,23 @@ from socket import *
 from proto import Message_pb2
 from modules.PackingandUnpacking import *
 import traceback
-from modules.Translator import translator
 from server.modern_server_ui import global_ms
 import random
 from modules.reminder import create_reminder_manager
+from modules.reminder_journal import journal_from_environment
+from server.dispatcher import Dispatcher
+from server.routing import RoutingTable
+from server.user_directory import UserDirectory
+from server.pending_search import PendingSearchTable
+from server.ack_tracker import AckTracker
+from server.fanout import GroupFanout, readdress
+from server.group_table import GroupTable
+from server.client_registry import ClientEntry, ClientRegistry
+from server.heartbeat import HeartbeatWheel
+from server.translation_service import TranslationService, gather, language_name
+from modules.snowflake import generator_for
+from server.connection import (Connection, FramedPayload, DEFAULT_MAX_QUEUE, DEFAULT_BLOCK_TIMEOUT,
+                               SLOW_CONSUMER_DISCONNECT)
 
 class ServerSocket:
     """
@@ -39,9 +52,10 @@ class ServerSocket:
         server_id (str): Server ID
         udp_port (int): UDP listening port
         tcp_port (int): TCP listening port
-        client_info (dict): Client information dictionary
+        clients (ClientRegistry): Connected clients in lock-striped shards
         server_info (dict): Server information dictionary
-        group_info (dict): Group information dictionary
+        groups (GroupTable): Copy-on-write group snapshots, read without locking
+        translations (TranslationService): Worker pool that translates off the receive loops
         ui (QWidget): UI interface reference
     """
     # BROADCAST_IP = '10.181.104.115'  # Broadcast IP, easy to modify later
@@ -58,27 +72,92 @@ class ServerSocket:
             self.udp_ports = self.UDP_PORTS
         self.udp_socket = None
         self.tcp_socket = None
-        self.heartbeat_interval = 10   # Heartbeat cycle seconds
-        self.heartbeat_timeout = 30    # Client timeout seconds
-        self.client_info = {}
-        self.client_info_lock = Lock()
-        self.pending_acks = {}
-        self.pending_acks_lock = threading.Lock()
-        self.group_info = {}
-        self.group_info_lock = Lock()
+        self.heartbeat_interval = 10   # Seconds of inactivity before a connection gets a PING
+        self.heartbeat_timeout = 30    # Seconds of inactivity before a connection is dropped
+        self.heartbeats = HeartbeatWheel(self.heartbeat_interval, self.heartbeat_timeout)  # Idle deadline per connection
+        self.max_frame_size = FrameDecoder.DEFAULT_MAX_FRAME_SIZE  # Larger frames are answered with HANGUP
+        self.zero_copy = True  # Decode in place and hand payloads around as memoryviews
+        self.binary_framing = True  # Offer BINARY_FRAMING and use it with peers that support it
+        self.send_queue_size = DEFAULT_MAX_QUEUE  # Frames queued per connection before the slow consumer policy applies
+        self.slow_consumer_policy = SLOW_CONSUMER_DISCONNECT  # 'drop', 'disconnect' or 'block'
+        self.send_block_timeout = DEFAULT_BLOCK_TIMEOUT  # Seconds a sender waits with the 'block' policy
+        self.directory = UserDirectory()  # Search index of the connected clients, kept in step with clients
+        self.clients = ClientRegistry(on_add=lambda entry: self.directory.add(entry.user_id, entry.server_id),
+                                      on_remove=lambda entry: self.directory.remove(entry.user_id))
+        self.snowflakes = generator_for(server_id)  # Handles of requests this server originates
+        self.pending_searches = PendingSearchTable(self.deliver_search, next_handle=self.snowflakes.next_id)  # Searches waiting for other servers
+        self.acks = AckTracker(self.deliver_ack)  # Routed messages waiting for their recipients' ACKs
+        self.translations = TranslationService()  # Worker pool for MESSAGE and TRANSLATE translations
+        self.groups = GroupTable()  # groupId -> immutable membership snapshot
         self.server_list = {}  # Other server information
         self.server_list_lock = Lock()
+        self.routes = RoutingTable()  # serverId -> link and userId -> home server for forwarding
+        self.fanout = GroupFanout(self.local_connections, self.routes.resolve)  # Group message delivery
         self.ui = ui_ref  # Compatibility retention
 
-        # Initialize reminder manager
-        self.reminder_manager = create_reminder_manager(self, use_heap=True)
+        # Purpose -> handler tables for frames from clients and from linked servers
+        self.client_dispatcher = Dispatcher('client', fallback=self.on_client_unhandled)
+        self.server_dispatcher = Dispatcher('server', fallback=self.on_server_unhandled)
+        self.register_handlers()
+
+        # Initialize reminder manager, journaled when IK_REMINDER_JOURNAL names a path
+        self.reminder_manager = create_reminder_manager(self, use_wheel=True, journal=journal_from_environment())
+
+    def register_handlers(self):
+        """Register the built-in purpose handlers, subclasses and features may add more"""
+        for purpose, handler in {
+            'PING': self.on_client_ping,
+            'PONG': self.on_client_pong,
+            'MESSAGE': self.on_client_message,
+            'MESSAGE_ACK': self.on_client_message_ack,
+            'MODIFY_GROUP': self.on_client_modify_group,
+            'LEAVE_GROUP': self.on_client_leave_group,
+            'INVITE_GROUP': self.on_client_invite_group,
+            'QUERY_GROUP_MEMBERS': self.on_client_query_group_members,
+            'JOIN_GROUP': self.on_client_join_group,
+            'SEARCH_USERS': self.on_client_search_users,
+            'SEARCH_USERS_RESP': self.on_client_search_users_resp,
+            'SET_REMINDER': self.on_client_set_reminder,
+            'TRANSLATE': self.on_client_translate,
+        }.items():
+            self.client_dispatcher.register(purpose, handler)
+        for purpose, handler in {
+            'PING': self.on_server_ping,
+            'PONG': self.on_server_pong,
+            'SEARCH_USERS': self.on_server_search_users,
+            'SEARCH_USERS_RESP': self.on_server_search_users_resp,
+            'MESSAGE': self.on_server_message,
+            'MESSAGE_ACK': self.on_server_message_ack,
+            'REMINDER': self.on_server_reminder,
+        }.items():
+            self.server_dispatcher.register(purpose, handler)
+
+    def dispatch_stats(self):
+        """
+        Return the per-purpose counters of both dispatchers.
+
+        Returns:
+            dict: {'client': {purpose: counters}, 'server': {purpose: counters}}
+        """
+        return {'client': self.client_dispatcher.stats(), 'server': self.server_dispatcher.stats()}
+
+    def translation_stats(self):
+        """
+        Return the counters of the translation worker pool and its cache.
+
+        Returns:
+            dict: See TranslationService.stats().
+        """
+        return self.translations.stats()
 
     def start_all(self):
+        # Start reminder service first, it replays its journal before SET_REMINDERs can arrive
+        self.reminder_manager.start()
         Thread(target=self.start_udp_listener, daemon=True).start()
         Thread(target=self.hanle_udp_boardcast, daemon=True).start()
         Thread(target=self.start_tcp_server, daemon=True).start()
-        # Start reminder service
-        self.reminder_manager.start()
+        self.pending_searches.start()
+        self.acks.start()
 
     def discover_servers(self):
         # Actively broadcast DISCOVER_SERVER to all known UDP ports
@@ -162,42 +241,26 @@ class ServerSocket:
             s = socket(AF_INET, SOCK_STREAM)
             s.settimeout(10)  # Set connection timeout
             s.connect((ip, port))
+            # Only switch to binary frames when the peer announced support for them
+            s = self.new_connection(s, (ip, port), negotiate_codec([f[0] for f in features], self.binary_framing))
 
-            # Construct CONNECT_SERVER message
-            connect_server = Message_pb2.ConnectServer()
-            connect_server.serverId = self.server_id  # Use instance variable
-            connect_server.features.extend([f[0] for f in features])
-            payload = connect_server.SerializeToString()
-            msg = Packing('CONNECT_SERVER', payload)
-            s.send(msg)
+            s.send(self.connect_server_request(features))
 
-            # Wait for CONNECTED reply
+            # Wait for CONNECTED reply, frames coalesced with it stay in the decoder
             try:
-                data = s.recv(1024)
-                if data:
-                    purpose, length, payload = Unpacking(data)
+                frames = iter_frames(s.sock, self.new_frame_decoder())
+                first_frame = next(frames, None)
+                if first_frame:
+                    purpose, length, payload = first_frame
                     if purpose == 'CONNECTED':
                         connect_response = Message_pb2.ConnectResponse()
                         connect_response.ParseFromString(payload)
                         if connect_response.result == Message_pb2.ConnectResponse.CONNECTED:
                             # Connection successful, save socket
-                            with self.server_list_lock:
-                                if server_id in self.server_list:
-                                    self.server_list[server_id]['socket'] = s
-                                    self.server_list[server_id]['last_active'] = time.time()
-                                else:
-                                    self.server_list[server_id] = {
-                                        'ip': ip,
-                                        'features': features,
-                                        'port': port,
-                                        'last_active': time.time(),
-                                        'socket': s,
-                                    }
-                            global_ms.log_signal.emit(f"[Server] Successfully connected to server {server_id}@{ip}:{port}")
-                            global_ms.refresh_list_signal.emit()
+                            self.add_server_link(server_id, ip, port, features, s)
 
                             # Start dedicated message handling thread
-                            Thread(target=self.handle_server_messages, args=(s, server_id), daemon=True).start()
+                            Thread(target=self.handle_server_messages, args=(s, server_id, frames), daemon=True).start()
                         else:
                             global_ms.log_signal.emit(f"[Server] Connection to server {server_id} rejected: {connect_response.result}")
                             s.close()
@@ -215,6 +278,77 @@ class ServerSocket:
             print(f"[Debug] Failed to connect to server {server_id}@{ip}:{port}: {e}")
             global_ms.log_signal.emit(f"[Server] Failed to connect to server {server_id}@{ip}:{port}: {e}")
 
+    def connect_server_request(self, features):
+        """Build the CONNECT_SERVER frame that opens a link to another server"""
+        connect_server = Message_pb2.ConnectServer()
+        connect_server.serverId = self.server_id  # Use instance variable
+        connect_server.features.extend([f[0] for f in features if f[0] != BINARY_FRAMING_FEATURE])
+        if self.binary_framing:
+            connect_server.features.append(BINARY_FRAMING_FEATURE)
+        payload = connect_server.SerializeToString()
+        return Packing('CONNECT_SERVER', payload)
+
+    def add_server_link(self, server_id, ip, port, features, server_socket):
+        """Save an outgoing link to another server after it answered CONNECTED"""
+        with self.server_list_lock:
+            if server_id in self.server_list:
+                self.server_list[server_id]['socket'] = server_socket
+                self.server_list[server_id]['last_active'] = time.time()
+            else:
+                self.server_list[server_id] = {
+                    'ip': ip,
+                    'features': features,
+                    'port': port,
+                    'last_active': time.time(),
+                    'socket': server_socket,
+                }
+        self.routes.add_link(server_id, server_socket)
+        self.watch_server(server_id, server_socket)
+        global_ms.log_signal.emit(f"[Server] Successfully connected to server {server_id}@{ip}:{port}")
+        global_ms.refresh_list_signal.emit()
+
+    def new_connection(self, sock, addr, codec=ASCII_CODEC):
+        """Wrap an accepted or connected socket with its outbound queue and writer thread"""
+        return Connection(sock, addr, codec, max_queue=self.send_queue_size,
+                          policy=self.slow_consumer_policy, block_timeout=self.send_block_timeout)
+
+    def client_connection(self, user_id):
+        """Return the connection of a local user, None if the user is not connected"""
+        return self.clients.connection(user_id)
+
+    def local_connections(self, user_ids):
+        """Return {userId: connection} for the given users that are connected to this server"""
+        return self.clients.connections(user_ids)
+
+    def server_connections(self):
+        """Return (server_id, server_info, connection) for every linked server"""
+        with self.server_list_lock:
+            return [(server_id, dict(info), info['socket'])
+                    for server_id, info in self.server_list.items() if info.get('socket')]
+
+    def send_safely(self, connection, purpose, payload):
+        """
+        Queue a frame on a connection that may have been closed in the meantime.
+
+        Args:
+            connection (Connection): The target connection.
+            purpose (str): The message purpose/type.
+            payload (bytes | memoryview): The message payload data.
+
+        Returns:
+            bool: True if the frame was queued.
+        """
+        try:
+            return connection.send_frame(purpose, payload)
+        except ConnectionError:
+            return False
+
+    def new_frame_decoder(self):
+        """Create the per-connection frame decoder for the configured codec mode"""
+        if self.zero_copy:
+            return ZeroCopyFrameDecoder(self.max_frame_size)
+        return FrameDecoder(self.max_frame_size)
+
     def Feature(self):
         announce = Message_pb2.ServerAnnounce()
         announce.serverId = self.server_id  # Use instance variable
@@ -227,6 +361,10 @@ class ServerSocket:
         feature3 = announce.feature.add()
         feature3.featureName = 'MESSAGES'
         feature3.port = self.tcp_port
+        if self.binary_framing:
+            feature4 = announce.feature.add()
+            feature4.featureName = BINARY_FRAMING_FEATURE
+            feature4.port = self.tcp_port
         return Packing('SERVER_ANNOUNCE', announce.SerializeToString())
 
     def start_tcp_server(self):
@@ -235,8 +373,8 @@ class ServerSocket:
         self.tcp_socket.bind(('0.0.0.0', self.tcp_port))
         self.tcp_socket.listen(5)
         global_ms.log_signal.emit(f"[Server] TCP Server started at port {self.tcp_port}")
-        Thread(target=self.heartbeat_monitor, daemon=True).start()
-        Thread(target=self.server_heartbeat_monitor, daemon=True).start()
+        self.heartbeats.start()
+        self.translations.start()
         while True:
             try:
                 client_socket, client_addr = self.tcp_socket.accept()
@@ -248,1061 +386,900 @@ class ServerSocket:
 
     def handle_tcp_client(self, client_socket, client_addr):
         user_id = None
+        client_socket = self.new_connection(client_socket, client_addr)
         try:
-            data = client_socket.recv(1024)
-            if not data:
+            frames = iter_frames(client_socket.sock, self.new_frame_decoder())
+            first_frame = next(frames, None)
+            if first_frame is None:
                 global_ms.log_signal.emit(f"[Server] Client {client_addr} disconnected (no data on connect)")
                 client_socket.close()
                 return
 
-            purpose, length, payload = Unpacking(data)
-            print(Unpacking(data))
+            purpose, length, payload = first_frame
             if purpose == 'CONNECT_CLIENT':
-                connect_client = Message_pb2.ConnectClient()
-                connect_client.ParseFromString(payload)
-                user_id = connect_client.user.userId
-                server_id = connect_client.user.serverId
-
-                with self.client_info_lock:
-                    if user_id in self.client_info:
-                        ConnectResponse = Message_pb2.ConnectResponse()
-                        ConnectResponse.result = Message_pb2.ConnectResponse.IS_ALREADY_CONNECTED_ERROR
-                        payload = ConnectResponse.SerializeToString()
-                        tosend = Packing('CONNECTED', payload)
-                        client_socket.send(tosend)
-                        global_ms.log_signal.emit(
-                            f"[Server] Reject duplicate connection for userId {user_id} from {client_addr[0]}:{client_addr[1]}"
-                        )
-                        client_socket.close()
-                        return
-                    else:
-                        ConnectResponse = Message_pb2.ConnectResponse()
-                        ConnectResponse.result = Message_pb2.ConnectResponse.CONNECTED
-                        payload = ConnectResponse.SerializeToString()
-                        tosend = Packing('CONNECTED', payload)
-                        client_socket.send(tosend)
-                        global_ms.log_signal.emit(
-                            f"[Server] User {user_id} connection established from {client_addr[0]}:{client_addr[1]}"
-                        )
-                        self.client_info[user_id] = {
-                            'socket': client_socket,
-                            'last_active': time.time(),
-                            'thread': threading.current_thread(),
-                            'server_id': server_id,
-                            'ip': client_addr[0],
-                            'port': client_addr[1],
-                        }
-                global_ms.refresh_list_signal.emit()
+                user_id = self.register_client(client_socket, payload)
+                if user_id is None:
+                    client_socket.close()
+                    return
             elif purpose == 'CONNECT_SERVER':
-                connect_server = Message_pb2.ConnectServer()
-                connect_server.ParseFromString(payload)
-                server_id = connect_server.serverId
-                features = connect_server.features
-
-                # Check if connection already exists to this server
-                with self.server_list_lock:
-                    if server_id in self.server_list and self.server_list[server_id].get('socket'):
-                        # Connection already exists, reject duplicate connection
-                        global_ms.log_signal.emit(f"[Server] Rejecting duplicate connection for server {server_id}")
-                        client_socket.close()
-                        return
-
-                # Reply CONNECTED message
-                ConnectResponse = Message_pb2.ConnectResponse()
-                ConnectResponse.result = Message_pb2.ConnectResponse.CONNECTED
-                payload = ConnectResponse.SerializeToString()
-                tosend = Packing('CONNECTED', payload)
-                client_socket.send(tosend)
-
-                global_ms.log_signal.emit(
-                    f"[Server] Server {server_id} connection established from {client_addr[0]}:{client_addr[1]}"
-                )
-
-                # Update socket information in server_list
-                with self.server_list_lock:
-                    if server_id in self.server_list:
-                        self.server_list[server_id]['socket'] = client_socket
-                        self.server_list[server_id]['last_active'] = time.time()
-                    else:
-                        # If not in server_list, add new entry
-                        self.server_list[server_id] = {
-                            'ip': client_addr[0],
-                            'features': [(f, self.tcp_port) for f in features],
-                            'port': client_addr[1],
-                            'last_active': time.time(),
-                            'socket': client_socket,
-                        }
-
-                global_ms.refresh_list_signal.emit()
+                server_id = self.register_server(client_socket, payload)
+                if server_id is None:
+                    client_socket.close()
+                    return
 
                 # Server connection enters dedicated message handling loop
-                self.handle_server_messages(client_socket, server_id)
+                self.handle_server_messages(client_socket, server_id, frames)
                 return
 
             elif purpose == 'SEARCH_USERS':
-                # Handle client user search request
-                QueryUsers = Message_pb2.QueryUsers()
-                QueryUsers.ParseFromString(payload)
-                query = QueryUsers.query
-                handle = QueryUsers.handle
-
-                                    # First collect local users
-                QueryUsersResponse = Message_pb2.QueryUsersResponse()
-                QueryUsersResponse.handle = handle
-
-                                    # Add local users
-                with self.client_info_lock:
-                    for uid, info in self.client_info.items():
-                        user = Message_pb2.User()
-                        user.userId = str(uid)
-                        user.serverId = str(info['server_id'])
-                        QueryUsersResponse.users.append(user)
-
-                                    # Forward search request to other servers
-                with self.server_list_lock:
-                    for server_id, server_info in self.server_list.items():
-                        server_socket = server_info.get('socket')
-                        if server_socket:
-                            try:
-                                # Forward SEARCH_USERS to other servers
-                                forward_query = Message_pb2.QueryUsers()
-                                forward_query.query = query
-                                forward_query.handle = handle  # Keep same handle for response matching
-                                forward_msg = Packing('SEARCH_USERS', forward_query.SerializeToString())
-                                server_socket.send(forward_msg)
-                                global_ms.log_signal.emit(f"[Server] Forwarding SEARCH_USERS to server {server_id}")
-                            except Exception as e:
-                                global_ms.log_signal.emit(f"[Server] Failed to forward SEARCH_USERS to server {server_id}: {e}")
-
-                # Reply local results first
-                tosend = Packing('SEARCH_USERS_RESP', QueryUsersResponse.SerializeToString())
-                client_socket.send(tosend)
-
-                # Save request information for later aggregation of remote server responses
-                with self.client_info_lock:
-                    if user_id in self.client_info:
-                        self.client_info[user_id]['pending_search'] = {
-                            'handle': handle,
-                            'query': query,
-                            'socket': client_socket
-                        }
+                self.handle_client_frame(client_socket, user_id, purpose, payload)
 
             else:
-                global_ms.log_signal.emit(f"[Server] First packet is neither CONNECT_CLIENT nor CONNECT_SERVER, closing.")
+                global_ms.log_signal.emit("[Server] First packet is neither CONNECT_CLIENT nor CONNECT_SERVER, closing.")
                 client_socket.close()
                 return
 
-            while True:
-                data = client_socket.recv(1024)
-                if not data:
-                    global_ms.log_signal.emit(f"[Server] Client {user_id} disconnected")
-                    break
-                with self.client_info_lock:
-                    if user_id in self.client_info:
-                        self.client_info[user_id]['last_active'] = time.time()
-                purpose, length, payload = Unpacking(data)
+            for purpose, length, payload in frames:
+                self.touch_client(client_socket)
                 # print(purpose)  # Commented out to avoid console printing of ping/pong messages
+                self.handle_client_frame(client_socket, user_id, purpose, payload)
 
-                if purpose == 'PING':
-                    pong_msg = Packing('PONG', b'')
-                    client_socket.send(pong_msg)
-                    print(f"[Server] Received PING from {user_id}, sent PONG")
-                elif purpose == 'PONG':
-                    print(f"[Server] Received PONG from {user_id}")
-                    pass
-
-                elif purpose == 'MESSAGE':
-                    msg = Message_pb2.ChatMessage()
-                    msg.ParseFromString(payload)
-                    which = msg.WhichOneof('recipient')
-                    msg_snowflake = msg.messageSnowflake
-                    source_user_id = user_id
-                    source_server_id = self.client_info[source_user_id]['server_id']
-
-                    # Check if translation is needed
-                    content_type = msg.WhichOneof('content')
-                    if content_type == 'translation':
-                        # Handle translation request
-                        translation_msg = msg.translation
-                        if translation_msg.original_text and not translation_msg.translated_text:
-                            # Only original text without translation, perform translation
-                            try:
-                                from modules.Translator import translator
-
-                                # Convert protobuf Language enum to string
-                                language_map = {
-                                    0: 'Deutsch',   # DE
-                                    1: 'English',   # EN
-                                    2: 'Chinese' ,      # ZH
-                                    3: 'Türkçe',
-                                    'DE': 'Deutsch',  # DE
-                                    'EN': 'English',  # EN
-                                    'ZH': 'Chinese',
-                                    'TR': 'Türkçe'
-                                }
-                                target_language = language_map.get(translation_msg.target_language, 'English')
-
-                                # Perform translation
-                                translated_text = translator(translation_msg.original_text, target_language)
-
-                                # Fill in translation result
-                                msg.translation.translated_text = translated_text
-
-                                # Re-serialize message
-                                payload = msg.SerializeToString()
-
-                                global_ms.log_signal.emit(f"[Server] Translating message: '{translation_msg.original_text}' -> '{translated_text}' ({target_language})")
-
-                            except Exception as e:
-                                global_ms.log_signal.emit(f"[Server] Translation failed: {e}")
-                                # When translation fails, forward as is
-
-                    with self.pending_acks_lock:
-                        self.pending_acks[msg_snowflake] = {
-                            'source_user': source_user_id,
-                            'source_server': source_server_id,
-                        }
-
-                    if which == 'user':
-                        target_user = msg.user.userId
-                        target_server = msg.user.serverId
-
-                        # First check if target user is local
-                        with self.client_info_lock:
-                            if target_user in self.client_info:
-                                # Local user, forward directly
-                                tosend = Packing('MESSAGE', payload)
-                                self.client_info[target_user]['socket'].send(tosend)
-                                global_ms.log_signal.emit(f"[Server] Forwarding message to local user {target_user}")
-                            else:
-                                # User not local, need to forward to other servers
-                                message_forwarded = False
-                                with self.server_list_lock:
-                                    for server_id, server_info in self.server_list.items():
-                                        server_socket = server_info.get('socket')
-                                        if server_socket and (target_server == server_id or target_server in str(server_info)):
-                                            try:
-                                                forward_msg = Packing('MESSAGE', payload)
-                                                server_socket.send(forward_msg)
-                                                global_ms.log_signal.emit(f"[Server] Forwarding message to server {server_id} user {target_user}")
-                                                message_forwarded = True
-                                                break
-                                            except Exception as e:
-                                                global_ms.log_signal.emit(f"[Server] Failed to forward message to server {server_id}: {e}")
-
-                                if not message_forwarded:
-                                    # If target server not found, try broadcasting to all connected servers
-                                    with self.server_list_lock:
-                                        for server_id, server_info in self.server_list.items():
-                                            server_socket = server_info.get('socket')
-                                            if server_socket:
-                                                try:
-                                                    forward_msg = Packing('MESSAGE', payload)
-                                                    server_socket.send(forward_msg)
-                                                    global_ms.log_signal.emit(f"[Server] Broadcasting message to server {server_id}")
-                                                except Exception as e:
-                                                    global_ms.log_signal.emit(f"[Server] Failed to broadcast message to server {server_id}: {e}")
-
-                    elif which == 'group':
-                        groupId = msg.group.groupId
-                        with self.group_info_lock:
-                            if groupId not in self.group_info:
-                                global_ms.log_signal.emit(f"[Server] Group {groupId} not found for group message.")
-                                return
-                            members = self.group_info[groupId]['members']
-                            with self.client_info_lock:
-                                for member_id in members:
-                                    if member_id != user_id and member_id in self.client_info:
-                                        tosend = Packing('MESSAGE', payload)
-                                        self.client_info[member_id]['socket'].send(tosend)
-
-                elif purpose == 'MESSAGE_ACK':
-                    ack = Message_pb2.ChatMessageResponse()
-                    ack.ParseFromString(payload)
-                    msg_snowflake = ack.messageSnowflake
-
-                    with self.pending_acks_lock:
-                        if msg_snowflake in self.pending_acks:
-                            source_info = self.pending_acks[msg_snowflake]
-                            source_user_id = source_info['source_user']
-
-                            with self.client_info_lock:
-                                if source_user_id in self.client_info:
-                                    self.client_info[source_user_id]['socket'].send(
-                                        Packing('MESSAGE_ACK', payload)
-                                    )
-                            del self.pending_acks[msg_snowflake]
-
-                elif purpose == 'MODIFY_GROUP':
-                    try:
-                        modify_group = Message_pb2.ModifyGroup()
-                        modify_group.ParseFromString(payload)
-
-                        groupId = modify_group.groupId
-                        displayName = modify_group.displayName
-                        deleteGroup = modify_group.deleteGroup
-                        admin_ids = {admin.userId for admin in modify_group.admins}
-
-                        resp = Message_pb2.ModifyGroupResponse()
-                        resp.handle = modify_group.handle
-
-                        with self.group_info_lock:
-                            if deleteGroup:
-                                if groupId in self.group_info:
-                                    del self.group_info[groupId]
-                                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
-                                else:
-                                    resp.result = Message_pb2.ModifyGroupResponse.NOT_FOUND
-                            else:
-                                if groupId in self.group_info:
-                                    self.group_info[groupId]['displayName'] = displayName
-                                    self.group_info[groupId]['admins'] = admin_ids
-                                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
-                                else:
-                                    self.group_info[groupId] = {
-                                        'displayName': displayName,
-                                        'admins': set(admin_ids),
-                                        'members': set(admin_ids),
-                                    }
-                                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
-
-                        tosend = Packing('MODIFY_GROUP_RESP', resp.SerializeToString())
-                        client_socket.send(tosend)
-                        global_ms.log_signal.emit(f"[Server] MODIFY_GROUP {groupId} by {user_id}, result={resp.result}")
-
-                    except Exception as e:
-                        resp = Message_pb2.ModifyGroupResponse()
-                        resp.handle = modify_group.handle if 'modify_group' in locals() else 0
-                        resp.result = Message_pb2.ModifyGroupResponse.UNKNOWN_ERROR
-                        tosend = Packing('MODIFY_GROUP_RESP', resp.SerializeToString())
-                        client_socket.send(tosend)
-                        global_ms.log_signal.emit(f"[Server] MODIFY_GROUP error: {e}")
-
-                elif purpose == 'LEAVE_GROUP':
-                    try:
-                        leave_msg = Message_pb2.LeaveGroup()
-                        leave_msg.ParseFromString(payload)
-                        group_id = leave_msg.group.groupId
-                        user_leaving = leave_msg.user.userId
-                        with self.group_info_lock:
-                            if group_id in self.group_info:
-                                # Remove leaving user
-                                self.group_info[group_id]['members'].discard(user_leaving)
-                                self.group_info[group_id]['admins'].discard(user_leaving)
-
-                                # Get remaining group members
-                                remaining_members = self.group_info[group_id]['members'].copy()
-                                global_ms.log_signal.emit(f"[Server] {user_leaving} has left group {group_id}")
-
-                                # Send updated GROUP_MEMBERS message to remaining group members
-                                if remaining_members:
-                                    group_members_msg = Message_pb2.GroupMembers()
-                                    group_members_msg.group.groupId = group_id
-                                    group_members_msg.group.serverId = self.server_id
-                                    group_members_msg.result = Message_pb2.GroupMembers.SUCCESS
-
-                                    # Add remaining group members to message
-                                    for member_id in remaining_members:
-                                        member_user = group_members_msg.user.add()
-                                        member_user.userId = member_id
-                                        with self.client_info_lock:
-                                            member_user.serverId = self.client_info[member_id][
-                                                'server_id'] if member_id in self.client_info else ""
-
-                                    # Serialize message
-                                    group_members_data = group_members_msg.SerializeToString()
-                                    group_members_packet = Packing('GROUP_MEMBERS', group_members_data)
-
-                                    # Send update message to all remaining members
-                                    with self.client_info_lock:
-                                        for remaining_member_id in remaining_members:
-                                            if remaining_member_id in self.client_info:
-                                                try:
-                                                    self.client_info[remaining_member_id]['socket'].send(
-                                                        group_members_packet)
-                                                    global_ms.log_signal.emit(
-                                                        f"[Server] Sending GROUP_MEMBERS update to remaining members {remaining_member_id}")
-                                                except Exception as e:
-                                                    global_ms.log_signal.emit(
-                                                        f"[Server] Failed to send GROUP_MEMBERS update to member {remaining_member_id}: {e}")
-                                else:
-                                    # If group has no remaining members, consider deleting the group
-                                    del self.group_info[group_id]
-                                    global_ms.log_signal.emit(f"[Server] Group {group_id} deleted (no remaining members)")
-                            else:
-                                global_ms.log_signal.emit(f"[Server] Group {group_id} not found for LEAVE_GROUP")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] LEAVE_GROUP error: {e}")
-
-                elif purpose == 'INVITE_GROUP':
-                    try:
-                        invite = Message_pb2.InviteToGroup()
-                        invite.ParseFromString(payload)
-                        group_id = invite.groupId
-                        invited_user_id = invite.user.userId
-                        invited_user_server = invite.user.serverId
-
-                        with self.group_info_lock:
-                            if group_id not in self.group_info:
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP failed: Group {group_id} does not exist")
-                                return
-
-                            admins = self.group_info[group_id]['admins']
-                            if user_id not in admins:
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP denied: {user_id} is not admin of {group_id}")
-                                return
-
-                        with self.client_info_lock:
-                            if invited_user_id in self.client_info:
-                                notify = Message_pb2.NotifyGroupInvite()
-                                notify.handle = invite.handle
-                                notify.group.groupId = group_id
-                                notify.group.serverId = self.client_info[user_id]['server_id']
-                                packet = Packing('NOTIFY_GROUP_INVITE', notify.SerializeToString())
-                                self.client_info[invited_user_id]['socket'].send(packet)
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP: {user_id} invited {invited_user_id} to group {group_id}")
-                            else:
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP: Invited user {invited_user_id} offline (invite dropped)")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] INVITE_GROUP error: {e}")
-
-                elif purpose == 'QUERY_GROUP_MEMBERS':
-                    try:
-                        query = Message_pb2.ListGroupMembers()
-                        query.ParseFromString(payload)
-                        group_id = query.group.groupId
-                        group_server_id = query.group.serverId
-                        resp = Message_pb2.GroupMembers()
-                        resp.group.groupId = group_id
-                        resp.group.serverId = self.client_info[user_id]['server_id']
-                        with self.group_info_lock:
-                            if group_id not in self.group_info:
-                                resp.result = Message_pb2.GroupMembers.NOT_FOUND
-                            else:
-                                resp.result = Message_pb2.GroupMembers.SUCCESS
-                                for uid in self.group_info[group_id]['members']:
-                                    u = resp.user.add()
-                                    u.userId = uid
-                                    u.serverId = self.client_info[uid]['server_id'] if uid in self.client_info else ""
-                        client_socket.send(Packing('GROUP_MEMBERS', resp.SerializeToString()))
-                        global_ms.log_signal.emit(f"[Server] Sent member list of {group_id} to {user_id}")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] QUERY_GROUP_MEMBERS error: {e}")
-
-                elif purpose == 'JOIN_GROUP':
-                    try:
-                        join = Message_pb2.JoinGroup()
-                        join.ParseFromString(payload)
-                        group_id = join.group.groupId
-                        new_user_id = join.user.userId
-                        with self.group_info_lock:
-                            if group_id not in self.group_info:
-                                global_ms.log_signal.emit(f"[Server] JOIN_GROUP failed: Group {group_id} not found")
-                                return
-                            self.group_info[group_id]['members'].add(new_user_id)
-                            global_ms.log_signal.emit(f"[Server] {new_user_id} joined group {group_id}")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] JOIN_GROUP error: {e}")
-
-                elif purpose == 'SEARCH_USERS':
-                    # Handle client user search request
-                    QueryUsers = Message_pb2.QueryUsers()
-                    QueryUsers.ParseFromString(payload)
-                    query = QueryUsers.query
-                    handle = QueryUsers.handle
-
-                    # First collect local users
-                    QueryUsersResponse = Message_pb2.QueryUsersResponse()
-                    QueryUsersResponse.handle = handle
-
-                    # Add local users
-                    with self.client_info_lock:
-                        for uid, info in self.client_info.items():
-                            user = Message_pb2.User()
-                            user.userId = str(uid)
-                            user.serverId = str(info['server_id'])
-                            QueryUsersResponse.users.append(user)
-
-                    # Forward search request to other servers
-                    with self.server_list_lock:
-                        for server_id, server_info in self.server_list.items():
-                            server_socket = server_info.get('socket')
-                            if server_socket:
-                                try:
-                                    # Forward SEARCH_USERS to other servers
-                                    forward_query = Message_pb2.QueryUsers()
-                                    forward_query.query = query
-                                    forward_query.handle = handle  # Keep same handle for response matching
-                                    forward_msg = Packing('SEARCH_USERS', forward_query.SerializeToString())
-                                    server_socket.send(forward_msg)
-                                    global_ms.log_signal.emit(f"[Server] Forwarding SEARCH_USERS to server {server_id}")
-                                except Exception as e:
-                                    global_ms.log_signal.emit(f"[Server] Failed to forward SEARCH_USERS to server {server_id}: {e}")
-
-                    # Reply local results first
-                    tosend = Packing('SEARCH_USERS_RESP', QueryUsersResponse.SerializeToString())
-                    client_socket.send(tosend)
-
-                    # Save request information for later aggregation of remote server responses
-                    with self.client_info_lock:
-                        if user_id in self.client_info:
-                            self.client_info[user_id]['pending_search'] = {
-                                'handle': handle,
-                                'query': query,
-                                'socket': client_socket
-                            }
-
-                elif purpose == 'SEARCH_USERS_RESP':
-                    # Handle search result response from other servers
-                    QueryUsersResponse = Message_pb2.QueryUsersResponse()
-                    QueryUsersResponse.ParseFromString(payload)
-                    handle = QueryUsersResponse.handle
-
-                    # Find client waiting for this response
-                    target_client = None
-                    with self.client_info_lock:
-                        for user_id, info in self.client_info.items():
-                            pending_search = info.get('pending_search')
-                            if pending_search and pending_search['handle'] == handle:
-                                target_client = info['socket']
-                                break
-
-                    if target_client:
-                        # Forward search results to client
-                        response_msg = Packing('SEARCH_USERS_RESP', payload)
-                        target_client.send(response_msg)
-                        global_ms.log_signal.emit(f"[Server] Forwarding search results from server {server_id} to client")
-
-                elif purpose == 'MESSAGE':
-                    # Handle message forwarding from other servers
-                    msg = Message_pb2.ChatMessage()
-                    msg.ParseFromString(payload)
-                    which = msg.WhichOneof('recipient')
-
-                    if which == 'user':
-                        target_user = msg.user.userId
-                        with self.client_info_lock:
-                            if target_user in self.client_info:
-                                # Forward message to local user
-                                forward_msg = Packing('MESSAGE', payload)
-                                self.client_info[target_user]['socket'].send(forward_msg)
-                                global_ms.log_signal.emit(f"[Server] Forwarding message from server {server_id} to user {target_user}")
-                            else:
-                                global_ms.log_signal.emit(f"[Server] Target user {target_user} not on this server")
-
-                elif purpose == 'MESSAGE_ACK':
-                    # Handle message acknowledgment from other servers
-                    ack = Message_pb2.ChatMessageResponse()
-                    ack.ParseFromString(payload)
-                    msg_snowflake = ack.messageSnowflake
-
-                    # Find local user waiting for this ACK
-                    with self.pending_acks_lock:
-                        if msg_snowflake in self.pending_acks:
-                            source_info = self.pending_acks[msg_snowflake]
-                            source_user_id = source_info['source_user']
-
-                            with self.client_info_lock:
-                                if source_user_id in self.client_info:
-                                    # Forward ACK to original sender
-                                    ack_msg = Packing('MESSAGE_ACK', payload)
-                                    self.client_info[source_user_id]['socket'].send(ack_msg)
-                                    global_ms.log_signal.emit(f"[Server] Forwarding message ACK to user {source_user_id}")
-
-                            del self.pending_acks[msg_snowflake]
-
-                elif purpose == 'MODIFY_GROUP':
-                    try:
-                        modify_group = Message_pb2.ModifyGroup()
-                        modify_group.ParseFromString(payload)
-
-                        groupId = modify_group.groupId
-                        displayName = modify_group.displayName
-                        deleteGroup = modify_group.deleteGroup
-                        admin_ids = {admin.userId for admin in modify_group.admins}
-
-                        resp = Message_pb2.ModifyGroupResponse()
-                        resp.handle = modify_group.handle
-
-                        with self.group_info_lock:
-                            if deleteGroup:
-                                if groupId in self.group_info:
-                                    del self.group_info[groupId]
-                                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
-                                else:
-                                    resp.result = Message_pb2.ModifyGroupResponse.NOT_FOUND
-                            else:
-                                if groupId in self.group_info:
-                                    self.group_info[groupId]['displayName'] = displayName
-                                    self.group_info[groupId]['admins'] = admin_ids
-                                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
-                                else:
-                                    self.group_info[groupId] = {
-                                        'displayName': displayName,
-                                        'admins': set(admin_ids),
-                                        'members': set(admin_ids),
-                                    }
-                                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
-
-                        tosend = Packing('MODIFY_GROUP_RESP', resp.SerializeToString())
-                        client_socket.send(tosend)
-                        global_ms.log_signal.emit(f"[Server] MODIFY_GROUP {groupId} by {user_id}, result={resp.result}")
-
-                    except Exception as e:
-                        resp = Message_pb2.ModifyGroupResponse()
-                        resp.handle = modify_group.handle if 'modify_group' in locals() else 0
-                        resp.result = Message_pb2.ModifyGroupResponse.UNKNOWN_ERROR
-                        tosend = Packing('MODIFY_GROUP_RESP', resp.SerializeToString())
-                        client_socket.send(tosend)
-                        global_ms.log_signal.emit(f"[Server] MODIFY_GROUP error: {e}")
-
-
-                elif purpose == 'LEAVE_GROUP':
-                    try:
-                        leave_msg = Message_pb2.LeaveGroup()
-                        leave_msg.ParseFromString(payload)
-                        group_id = leave_msg.group.groupId
-                        user_leaving = leave_msg.user.userId
-                        with self.group_info_lock:
-                            if group_id in self.group_info:
-                                # Remove leaving user
-                                self.group_info[group_id]['members'].discard(user_leaving)
-                                self.group_info[group_id]['admins'].discard(user_leaving)
-
-                                # Get remaining group members
-                                remaining_members = self.group_info[group_id]['members'].copy()
-                                global_ms.log_signal.emit(f"[Server] {user_leaving} has left group {group_id}")
-
-                                # Send updated GROUP_MEMBERS message to remaining group members
-                                if remaining_members:
-                                    group_members_msg = Message_pb2.GroupMembers()
-                                    group_members_msg.group.groupId = group_id
-                                    group_members_msg.group.serverId = self.server_id
-                                    group_members_msg.result = Message_pb2.GroupMembers.SUCCESS
-
-                                    # Add remaining group members to message
-                                    for member_id in remaining_members:
-                                        member_user = group_members_msg.user.add()
-                                        member_user.userId = member_id
-                                        with self.client_info_lock:
-                                            member_user.serverId = self.client_info[member_id][
-                                                'server_id'] if member_id in self.client_info else ""
-
-                                    # Serialize message
-                                    group_members_data = group_members_msg.SerializeToString()
-                                    group_members_packet = Packing('GROUP_MEMBERS', group_members_data)
-                                    # Send update message to all remaining members
-
-                                    with self.client_info_lock:
-                                        for remaining_member_id in remaining_members:
-                                            if remaining_member_id in self.client_info:
-                                                try:
-                                                    self.client_info[remaining_member_id]['socket'].send(
-                                                        group_members_packet)
-                                                    global_ms.log_signal.emit(
-                                                        f"[Server] Sending GROUP_MEMBERS update to remaining members {remaining_member_id}")
-                                                except Exception as e:
-                                                    global_ms.log_signal.emit(
-                                                        f"[Server] Failed to send GROUP_MEMBERS update to member {remaining_member_id}: {e}")
-
-                                else:
-                                    # If group has no remaining members, consider deleting the group
-                                    del self.group_info[group_id]
-                                    global_ms.log_signal.emit(f"[Server] Group {group_id} deleted (no remaining members)")
-                            else:
-                                global_ms.log_signal.emit(f"[Server] Group {group_id} not found for LEAVE_GROUP")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] LEAVE_GROUP error: {e}")
-
-                elif purpose == 'INVITE_GROUP':
-                    try:
-                        invite = Message_pb2.InviteToGroup()
-                        invite.ParseFromString(payload)
-                        group_id = invite.groupId
-                        invited_user_id = invite.user.userId
-                        invited_user_server = invite.user.serverId
-
-                        with self.group_info_lock:
-                            if group_id not in self.group_info:
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP failed: Group {group_id} does not exist")
-                                return
-
-                            admins = self.group_info[group_id]['admins']
-                            if user_id not in admins:
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP denied: {user_id} is not admin of {group_id}")
-                                return
-
-                        with self.client_info_lock:
-                            if invited_user_id in self.client_info:
-                                notify = Message_pb2.NotifyGroupInvite()
-                                notify.handle = invite.handle
-                                notify.group.groupId = group_id
-                                notify.group.serverId = self.client_info[user_id]['server_id']
-                                packet = Packing('NOTIFY_GROUP_INVITE', notify.SerializeToString())
-                                self.client_info[invited_user_id]['socket'].send(packet)
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP: {user_id} invited {invited_user_id} to group {group_id}")
-                            else:
-                                global_ms.log_signal.emit(
-                                    f"[Server] INVITE_GROUP: Invited user {invited_user_id} offline (invite dropped)")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] INVITE_GROUP error: {e}")
-
-                elif purpose == 'QUERY_GROUP_MEMBERS':
-                    try:
-                        query = Message_pb2.ListGroupMembers()
-                        query.ParseFromString(payload)
-                        group_id = query.group.groupId
-                        group_server_id = query.group.serverId
-                        resp = Message_pb2.GroupMembers()
-                        resp.group.groupId = group_id
-                        resp.group.serverId = self.client_info[user_id]['server_id']
-                        with self.group_info_lock:
-                            if group_id not in self.group_info:
-                                resp.result = Message_pb2.GroupMembers.NOT_FOUND
-                            else:
-                                resp.result = Message_pb2.GroupMembers.SUCCESS
-                                for uid in self.group_info[group_id]['members']:
-                                    u = resp.user.add()
-                                    u.userId = uid
-                                    u.serverId = self.client_info[uid]['server_id'] if uid in self.client_info else ""
-                        client_socket.send(Packing('GROUP_MEMBERS', resp.SerializeToString()))
-                        global_ms.log_signal.emit(f"[Server] Sent member list of {group_id} to {user_id}")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] QUERY_GROUP_MEMBERS error: {e}")
-
-                elif purpose == 'JOIN_GROUP':
-                    try:
-                        join = Message_pb2.JoinGroup()
-                        join.ParseFromString(payload)
-                        group_id = join.group.groupId
-                        new_user_id = join.user.userId
-                        with self.group_info_lock:
-                            if group_id not in self.group_info:
-                                global_ms.log_signal.emit(f"[Server] JOIN_GROUP failed: Group {group_id} not found")
-                                return
-                            self.group_info[group_id]['members'].add(new_user_id)
-                            global_ms.log_signal.emit(f"[Server] {new_user_id} joined group {group_id}")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] JOIN_GROUP error: {e}")
-
-                elif purpose == 'SET_REMINDER':
-                    try:
-                        set_reminder = Message_pb2.SetReminder()
-                        set_reminder.ParseFromString(payload)
+            global_ms.log_signal.emit(f"[Server] Client {user_id} disconnected")
 
-                        reminder_user_id = set_reminder.user.userId
-                        reminder_server_id = set_reminder.user.serverId
-                        event = set_reminder.event
-                        countdown_seconds = set_reminder.countdownSeconds
+        except FrameError as e:
+            global_ms.log_signal.emit(f"[Server] Closing connection of {user_id or client_addr}: {e}")
+            self.send_hangup(client_socket, e)
+        except BaseException as e:
+            global_ms.log_signal.emit(f"[Server] handle_tcp_client error: {e}\n{traceback.format_exc()}")
+        finally:
+            self.unregister_client(user_id, client_socket)
+            try:
+                client_socket.close()
+            except:
+                pass
 
-                        # Verify user can only set reminders for themselves
-                        if reminder_user_id != user_id:
-                            global_ms.log_signal.emit(f"[Server] User {user_id} attempted to set reminder for another user {reminder_user_id}, rejected.")
-                            continue
+    def register_client(self, client_socket, payload):
+        """
+        Handle the CONNECT_CLIENT handshake of a new client connection.
+
+        Args:
+            client_socket (Connection): The connection the handshake arrived on.
+            payload (bytes): The ConnectClient payload.
+
+        Returns:
+            str | None: The userId on success, None if the connection was rejected.
+        """
+        connect_client = Message_pb2.ConnectClient()
+        connect_client.ParseFromString(payload)
+        user_id = connect_client.user.userId
+        server_id = connect_client.user.serverId
+        client_addr = client_socket.addr
+
+        def accept(entry):
+            # Runs before the client is visible to other threads, so CONNECTED is its first frame
+            ConnectResponse = Message_pb2.ConnectResponse()
+            ConnectResponse.result = Message_pb2.ConnectResponse.CONNECTED
+            payload = ConnectResponse.SerializeToString()
+            tosend = Packing('CONNECTED', payload)
+            client_socket.send(tosend)
+            # CONNECTED itself always goes out as ASCII, the client switches after reading it
+            client_socket.codec = negotiate_codec(connect_client.features, self.binary_framing)
+
+        entry = ClientEntry(user_id, client_socket, server_id, client_addr[0], client_addr[1],
+                            threading.current_thread())
+        if not self.clients.add(entry, accept):
+            ConnectResponse = Message_pb2.ConnectResponse()
+            ConnectResponse.result = Message_pb2.ConnectResponse.IS_ALREADY_CONNECTED_ERROR
+            payload = ConnectResponse.SerializeToString()
+            tosend = Packing('CONNECTED', payload)
+            client_socket.send(tosend)
+            global_ms.log_signal.emit(
+                f"[Server] Reject duplicate connection for userId {user_id} from {client_addr[0]}:{client_addr[1]}"
+            )
+            return None
+        global_ms.log_signal.emit(
+            f"[Server] User {user_id} connection established from {client_addr[0]}:{client_addr[1]}"
+        )
+        self.watch_client(user_id, client_socket)
+        # The user is local now, messages must no longer go to a remote home
+        self.routes.forget_user(user_id)
+        global_ms.refresh_list_signal.emit()
+        return user_id
+
+    def register_server(self, client_socket, payload):
+        """
+        Handle the CONNECT_SERVER handshake of a server that connected to us.
+
+        Args:
+            client_socket (Connection): The connection the handshake arrived on.
+            payload (bytes): The ConnectServer payload.
+
+        Returns:
+            str | None: The serverId on success, None if a link to that server already exists.
+        """
+        connect_server = Message_pb2.ConnectServer()
+        connect_server.ParseFromString(payload)
+        server_id = connect_server.serverId
+        features = connect_server.features
+        client_addr = client_socket.addr
+
+        # Check if connection already exists to this server
+        with self.server_list_lock:
+            if server_id in self.server_list and self.server_list[server_id].get('socket'):
+                # Connection already exists, reject duplicate connection
+                global_ms.log_signal.emit(f"[Server] Rejecting duplicate connection for server {server_id}")
+                return None
+
+        # Reply CONNECTED message
+        ConnectResponse = Message_pb2.ConnectResponse()
+        ConnectResponse.result = Message_pb2.ConnectResponse.CONNECTED
+        payload = ConnectResponse.SerializeToString()
+        tosend = Packing('CONNECTED', payload)
+        client_socket.send(tosend)
+        client_socket.codec = negotiate_codec(features, self.binary_framing)
+
+        global_ms.log_signal.emit(
+            f"[Server] Server {server_id} connection established from {client_addr[0]}:{client_addr[1]}"
+        )
+
+        # Update socket information in server_list
+        with self.server_list_lock:
+            if server_id in self.server_list:
+                self.server_list[server_id]['socket'] = client_socket
+                self.server_list[server_id]['last_active'] = time.time()
+            else:
+                # If not in server_list, add new entry
+                self.server_list[server_id] = {
+                    'ip': client_addr[0],
+                    'features': [(f, self.tcp_port) for f in features if f != BINARY_FRAMING_FEATURE],
+                    'port': client_addr[1],
+                    'last_active': time.time(),
+                    'socket': client_socket,
+                }
+        self.routes.add_link(server_id, client_socket)
+        self.watch_server(server_id, client_socket)
+
+        global_ms.refresh_list_signal.emit()
+        return server_id
+
+    def touch_client(self, client_socket):
+        """Record activity of a client connection, postpones its PING and timeout"""
+        self.heartbeats.touch(client_socket)
+
+    def watch_client(self, user_id, client_socket):
+        """Start the heartbeat deadlines of a registered client"""
+        self.heartbeats.add(client_socket,
+                            lambda connection: self.ping_client(user_id, connection),
+                            lambda connection: self.expire_client(user_id, connection))
+
+    def ping_client(self, user_id, client_socket):
+        """Send a PING to a client that has been idle for heartbeat_interval"""
+        try:
+            client_socket.send_frame('PING', b'')
+            print(f"[Server] Sent PING to {user_id}")
+        except Exception as e:
+            print(f"[Server] Heartbeat send error for {user_id}: {e}")
+            try:
+                client_socket.close()
+            except:
+                pass
+            self.unregister_client(user_id, client_socket)
 
-                        # Construct complete user identifier including server information for cross-server reminders
-                        if reminder_server_id and reminder_server_id != self.server_id:
-                            # Cross-server reminder: user on other server, use format userId@serverId
-                            full_user_id = f"{reminder_user_id}@{reminder_server_id}"
-                            global_ms.log_signal.emit(f"[Server] Received cross-server reminder request: User {user_id} on server {reminder_server_id} setting reminder: {event} (countdown {countdown_seconds} seconds)")
-                        else:
-                            # Local server user, use userId directly
-                            full_user_id = reminder_user_id
-                            global_ms.log_signal.emit(f"[Server] User {user_id} setting reminder for self: {event} (countdown {countdown_seconds} seconds)")
+    def expire_client(self, user_id, client_socket):
+        """Drop a client that has been idle for heartbeat_timeout"""
+        global_ms.log_signal.emit(f"[Server] User {user_id} heartbeat timeout, disconnecting.")
+        try:
+            client_socket.abort()  # The peer is gone, do not wait for queued frames
+        except:
+            pass
+        self.unregister_client(user_id, client_socket)
+
+    def unregister_client(self, user_id, client_socket):
+        """Remove a disconnected client unless it already reconnected on another connection"""
+        self.heartbeats.remove(client_socket)
+        if user_id:
+            self.clients.remove(user_id, client_socket)
+            self.pending_searches.drop_connection(client_socket)
+            global_ms.refresh_list_signal.emit()
 
-                        # Add reminder to manager
-                        self.reminder_manager.add_reminder(full_user_id, event, countdown_seconds)
+    def unregister_server(self, server_id, server_socket=None):
+        """Remove the link of a disconnected server, unless it was already replaced by another connection"""
+        if server_socket is not None:
+            self.heartbeats.remove(server_socket)
+        with self.server_list_lock:
+            if server_id in self.server_list and (server_socket is None or
+                                                  self.server_list[server_id].get('socket') in (server_socket, None)):
+                del self.server_list[server_id]
+        self.routes.remove_link(server_id, server_socket)
+        global_ms.refresh_list_signal.emit()
+
+    def handle_client_frame(self, client_socket, user_id, purpose, payload):
+        """
+        Handle one frame received from a connected client.
+
+        Shared by the threaded and the asyncio engine, so handlers must not block on the connection.
+
+        Args:
+            client_socket (Connection): The connection of the client.
+            user_id (str | None): The client's userId, None before CONNECT_CLIENT.
+            purpose (str): The message purpose/type.
+            payload (bytes | memoryview): The message payload data.
+        """
+        self.client_dispatcher.dispatch(purpose, client_socket, user_id, payload)
+
+    def on_client_ping(self, client_socket, user_id, payload):
+        """Answer a heartbeat PING of a client"""
+        client_socket.send_frame('PONG', b'')
+
+    def on_client_pong(self, client_socket, user_id, payload):
+        """Heartbeat answer of a client, activity is already recorded by the receive loop"""
+
+    def on_client_message(self, client_socket, user_id, payload):
+        """Route a chat message of a client to a user, a group or another server"""
+        msg = Message_pb2.ChatMessage()
+        msg.ParseFromString(payload)
+
+        # Translation requests are answered by the worker pool, the message is routed once its text is ready
+        if msg.WhichOneof('content') == 'translation':
+            translation = msg.translation
+            if msg.WhichOneof('recipient') == 'group':
+                # The author reads the group in the language they translate into
+                self.groups.set_language(msg.group.groupId, user_id, translation.target_language)
+                if translation.original_text and not translation.translated_text:
+                    self.route_group_translation(user_id, msg)
+                    return
+            elif translation.original_text and not translation.translated_text:
+                future = self.translations.submit(translation.original_text, language_name(translation.target_language))
+                future.add_done_callback(lambda done: self.route_translated_message(user_id, msg, done))
+                return
 
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] SET_REMINDER error: {e}")
+        self.route_client_message(user_id, msg, payload)
 
-                elif purpose == 'TRANSLATE':
-                    # Handle new TRANSLATE message protocol
+    def route_translated_message(self, user_id, msg, future):
+        """Fill in the translated text of a MESSAGE and route it, called when its translation finished"""
+        translation = msg.translation
+        try:
+            translation.translated_text = future.result()
+            global_ms.log_signal.emit(
+                f"[Server] Translating message: '{translation.original_text}' -> '{translation.translated_text}' "
+                f"({language_name(translation.target_language)})")
+        except Exception as e:
+            # When translation fails, forward as is
+            global_ms.log_signal.emit(f"[Server] Translation failed: {e}")
+        self.route_client_message(user_id, msg, msg.SerializeToString())
+
+    def route_client_message(self, user_id, msg, payload):
+        """
+        Route a parsed chat message of a local client to a user, a group or another server.
+
+        Args:
+            user_id (str): userId of the author.
+            msg (ChatMessage): The parsed message.
+            payload (bytes | memoryview): The serialized message as it is forwarded.
+        """
+        which = msg.WhichOneof('recipient')
+        msg_snowflake = msg.messageSnowflake
+
+        if which == 'user':
+            target_user = msg.user.userId
+            target_server = msg.user.serverId
+            self.acks.track(msg_snowflake, user_id, (target_user,))
+
+            # First check if target user is local
+            target_socket = self.client_connection(target_user)
+            if target_socket:
+                # Local user, forward directly
+                if not self.send_safely(target_socket, 'MESSAGE', payload):
+                    self.acks.report_status(msg_snowflake, msg.user, Message_pb2.ChatMessageResponse.USER_AWAY)
+                global_ms.log_signal.emit(f"[Server] Forwarding message to local user {target_user}")
+            else:
+                # User not local, forward to the server the routing table knows for the target
+                route = self.routes.resolve(target_user, '' if target_server == self.server_id else target_server)
+                forwarded = False
+                if route:
+                    server_id, server_socket = route
                     try:
-                        translate_msg = Message_pb2.Translate()
-                        translate_msg.ParseFromString(payload)
-
-                        # Perform translation processing
-                        if translate_msg.original_text:
-                            try:
-                                from modules.Translator import translator
-
-                                # Convert protobuf Language enum to string
-                                language_map = {
-                                    0: 'Deutsch',   # DE
-                                    1: 'English',   # EN
-                                    2: 'Chinese',       # ZH
-                                    3: 'Türkçe',
-                                }
-                                target_language = language_map.get(translate_msg.target_language, 'English')
-
-                                # Perform translation
-                                translated_text = translator(translate_msg.original_text, target_language)
-
-                                # Create TRANSLATED message response
-                                translated_msg = Message_pb2.Translated()
-                                translated_msg.target_language = translate_msg.target_language
-                                translated_msg.original_text = translate_msg.original_text
-                                translated_msg.translated_text = translated_text
-
-                                # Send TRANSLATED message to requesting client
-                                response_data = translated_msg.SerializeToString()
-                                response_packet = Packing('TRANSLATED', response_data)
-                                client_socket.send(response_packet)
-
-                                global_ms.log_signal.emit(f"[Server] Processing TRANSLATE request: '{translate_msg.original_text}' -> '{translated_text}' ({target_language})")
-
-                            except Exception as e:
-                                global_ms.log_signal.emit(f"[Server] Translation processing failed: {e}")
-                                # Send original text when translation fails
-                                translated_msg = Message_pb2.Translated()
-                                translated_msg.target_language = translate_msg.target_language
-                                translated_msg.original_text = translate_msg.original_text
-                                translated_msg.translated_text = translate_msg.original_text  # Use original text
-
-                                response_data = translated_msg.SerializeToString()
-                                response_packet = Packing('TRANSLATED', response_data)
-                                client_socket.send(response_packet)
-
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] Failed to process TRANSLATE message: {e}")
+                        server_socket.send_frame('MESSAGE', payload)
+                        global_ms.log_signal.emit(f"[Server] Forwarding message to server {server_id} user {target_user}")
+                        self.acks.forwarded(msg_snowflake, (target_user,))
+                        forwarded = True
+                    except ConnectionError as e:
+                        global_ms.log_signal.emit(f"[Server] Failed to forward message to server {server_id}: {e}")
+
+                if not forwarded:
+                    if target_server and target_server != self.server_id:
+                        status = Message_pb2.ChatMessageResponse.OTHER_SERVER_NOT_FOUND
+                    else:
+                        status = Message_pb2.ChatMessageResponse.USER_NOT_FOUND
+                    global_ms.log_signal.emit(f"[Server] No route to user {target_user}@{target_server or '?'}")
+                    self.acks.report_status(msg_snowflake, msg.user, status)
+
+        elif which == 'group':
+            groupId = msg.group.groupId
+            members = self.groups.members(groupId)
+            if members is None:
+                global_ms.log_signal.emit(f"[Server] Group {groupId} not found for group message.")
+                return
+            # Split the snapshot's members into local connections and home servers, then send outside of all locks
+            plan = self.fanout.partition(members, exclude=user_id)
+            self.send_group_variants(user_id, msg, plan, [(plan, payload)])
+
+    def route_group_translation(self, user_id, msg):
+        """
+        Translate a group MESSAGE once per language its members read and send every member its variant.
+
+        Members without a known language get the author's target_language. The
+        languages are translated in parallel by the worker pool, through the
+        translation cache, and the message is sent once all of them are done.
+
+        Args:
+            user_id (str): userId of the author.
+            msg (ChatMessage): The parsed message with translation content and a group recipient.
+        """
+        groupId = msg.group.groupId
+        group = self.groups.get(groupId)
+        if group is None:
+            global_ms.log_signal.emit(f"[Server] Group {groupId} not found for group message.")
+            return
+        plan = self.fanout.partition(group.members, exclude=user_id)
+        default = msg.translation.target_language
+        languages = group.languages
+        plans = plan.split(lambda member: languages.get(member, default))
+        if not plans:
+            # Nobody to translate for, only unreachable members are reported
+            self.send_group_variants(user_id, msg, plan, [])
+            return
+        original_text = msg.translation.original_text
+        futures = {language: self.translations.submit(original_text, language_name(language)) for language in plans}
+        global_ms.log_signal.emit(
+            f"[Server] Translating group message of {groupId} into {len(futures)} languages for {len(plan.recipients())} members")
+
+        def send(done):
+            variants = [(plans[language], self.translated_variant(msg, language, future))
+                        for language, future in futures.items()]
+            self.send_group_variants(user_id, msg, plan, variants)
+
+        gather(list(futures.values())).add_done_callback(send)
+
+    def translated_variant(self, msg, language, future):
+        """Return msg serialized with the translation of a finished future into one language, untranslated if it failed"""
+        variant = Message_pb2.ChatMessage()
+        variant.CopyFrom(msg)
+        variant.translation.target_language = language
+        try:
+            variant.translation.translated_text = future.result()
+        except Exception as e:
+            # When translation fails, forward as is
+            global_ms.log_signal.emit(f"[Server] Translation failed: {e}")
+        return variant.SerializeToString()
+
+    def send_group_variants(self, user_id, msg, plan, variants):
+        """
+        Send a group message to the members of a plan, tracking their acknowledgments.
+
+        Args:
+            user_id (str): userId of the author.
+            msg (ChatMessage): The parsed message.
+            plan (FanoutPlan): All members the message is meant for.
+            variants (list): (FanoutPlan, payload) pairs, every reachable member of plan in exactly one of them.
+        """
+        msg_snowflake = msg.messageSnowflake
+        recipients = plan.recipients()
+        if recipients:
+            # The author gets one MESSAGE_ACK once every member reported
+            self.acks.track(msg_snowflake, user_id, recipients)
+            self.acks.forwarded(msg_snowflake, plan.remote_users())
+        failed = []
+        for variant_plan, payload in variants:
+            failed.extend(self.fanout.send(variant_plan, payload, msg.group))
+        for remote_server, (link, remote_members) in plan.remote.items():
+            global_ms.log_signal.emit(
+                f"[Server] Forwarding group message of {msg.group.groupId} to {len(remote_members)} members on server {remote_server}")
+        for member_id in plan.unreachable + failed:
+            self.acks.report_status(msg_snowflake, Message_pb2.User(userId=member_id),
+                                    Message_pb2.ChatMessageResponse.USER_AWAY)
+
+    def deliver_ack(self, tracked):
+        """Send the merged MESSAGE_ACK of a message towards its author, directly or over the link it came from"""
+        if tracked.reply_server:
+            connection = self.routes.link(tracked.reply_server)
+        else:
+            connection = self.client_connection(tracked.author)
+        if connection is None or not self.send_safely(connection, 'MESSAGE_ACK', tracked.response().SerializeToString()):
+            global_ms.log_signal.emit(f"[Server] Cannot return MESSAGE_ACK of {tracked.snowflake} to {tracked.author}")
+
+    def on_client_message_ack(self, client_socket, user_id, payload):
+        """Merge a delivery acknowledgment into the status of the message"""
+        ack = Message_pb2.ChatMessageResponse()
+        ack.ParseFromString(payload)
+        statuses = ack.statuses
+        if not statuses:
+            # Plain ACK without status, it confirms delivery to the acknowledging user
+            delivery = ack.statuses.add()
+            delivery.user.userId = user_id or ''
+            delivery.user.serverId = self.server_id
+            delivery.status = Message_pb2.ChatMessageResponse.DELIVERED
+
+        if not self.acks.report(ack.messageSnowflake, statuses):
+            global_ms.log_signal.emit(f"[Server] Dropping late or unknown MESSAGE_ACK {ack.messageSnowflake} from {user_id}")
+
+    def on_client_modify_group(self, client_socket, user_id, payload):
+        """Create, rename or delete a group"""
+        try:
+            modify_group = Message_pb2.ModifyGroup()
+            modify_group.ParseFromString(payload)
+
+            groupId = modify_group.groupId
+            displayName = modify_group.displayName
+            deleteGroup = modify_group.deleteGroup
+            admin_ids = {admin.userId for admin in modify_group.admins}
+
+            resp = Message_pb2.ModifyGroupResponse()
+            resp.handle = modify_group.handle
 
+            if deleteGroup:
+                if self.groups.delete(groupId):
+                    resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
                 else:
-                    # Handle other server-server protocol messages
-                    global_ms.log_signal.emit(f"[Server] Received unhandled message from server {server_id}: {purpose}")
+                    resp.result = Message_pb2.ModifyGroupResponse.NOT_FOUND
+            else:
+                # Creates the group with its admins as members, or renames it
+                self.groups.modify(groupId, displayName, admin_ids)
+                resp.result = Message_pb2.ModifyGroupResponse.SUCCESS
 
-        except BaseException as e:
-            global_ms.log_signal.emit(f"[Server] handle_tcp_client error: {e}\n{traceback.format_exc()}")
-        finally:
-            if user_id:
-                with self.client_info_lock:
-                    if user_id in self.client_info and self.client_info[user_id]['socket'] is client_socket:
-                        del self.client_info[user_id]
-                global_ms.refresh_list_signal.emit()
+            tosend = Packing('MODIFY_GROUP_RESP', resp.SerializeToString())
+            client_socket.send(tosend)
+            global_ms.log_signal.emit(f"[Server] MODIFY_GROUP {groupId} by {user_id}, result={resp.result}")
+
+        except Exception as e:
+            resp = Message_pb2.ModifyGroupResponse()
+            resp.handle = modify_group.handle if 'modify_group' in locals() else 0
+            resp.result = Message_pb2.ModifyGroupResponse.UNKNOWN_ERROR
+            tosend = Packing('MODIFY_GROUP_RESP', resp.SerializeToString())
+            client_socket.send(tosend)
+            global_ms.log_signal.emit(f"[Server] MODIFY_GROUP error: {e}")
+
+    def on_client_leave_group(self, client_socket, user_id, payload):
+        """Remove a user from a group and send the new member list to the remaining members"""
+        try:
+            leave_msg = Message_pb2.LeaveGroup()
+            leave_msg.ParseFromString(payload)
+            group_id = leave_msg.group.groupId
+            user_leaving = leave_msg.user.userId
+            recipients = []
+            group = self.groups.remove_member(group_id, user_leaving)
+            if group is None:
+                global_ms.log_signal.emit(f"[Server] Group {group_id} not found for LEAVE_GROUP")
+            else:
+                global_ms.log_signal.emit(f"[Server] {user_leaving} has left group {group_id}")
+            if group is not None and not group.members:
+                # No remaining members, the table deleted the group
+                global_ms.log_signal.emit(f"[Server] Group {group_id} deleted (no remaining members)")
+            elif group is not None:
+                # Send updated GROUP_MEMBERS message to remaining group members
+                group_members_msg = Message_pb2.GroupMembers()
+                group_members_msg.group.groupId = group_id
+                group_members_msg.group.serverId = self.server_id
+                group_members_msg.result = Message_pb2.GroupMembers.SUCCESS
+
+                # Add remaining group members to message and collect their connections
+                for member_id in group.members:
+                    member_user = group_members_msg.user.add()
+                    member_user.userId = member_id
+                    entry = self.clients.get(member_id)
+                    member_user.serverId = entry.server_id if entry else ""
+                    if entry:
+                        recipients.append((member_id, entry.socket))
+
+                # Serialize message
+                group_members_data = group_members_msg.SerializeToString()
+                group_members_packet = Packing('GROUP_MEMBERS', group_members_data)
+
+            # Send update message to all remaining members
+            for remaining_member_id, member_socket in recipients:
+                try:
+                    member_socket.send(group_members_packet)
+                    global_ms.log_signal.emit(
+                        f"[Server] Sending GROUP_MEMBERS update to remaining members {remaining_member_id}")
+                except Exception as e:
+                    global_ms.log_signal.emit(
+                        f"[Server] Failed to send GROUP_MEMBERS update to member {remaining_member_id}: {e}")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] LEAVE_GROUP error: {e}")
+
+    def on_client_invite_group(self, client_socket, user_id, payload):
+        """Notify an invited user, only group admins may invite"""
+        try:
+            invite = Message_pb2.InviteToGroup()
+            invite.ParseFromString(payload)
+            group_id = invite.groupId
+            invited_user_id = invite.user.userId
+
+            group = self.groups.get(group_id)
+            if group is None:
+                global_ms.log_signal.emit(
+                    f"[Server] INVITE_GROUP failed: Group {group_id} does not exist")
+                return
+
+            if user_id not in group.admins:
+                global_ms.log_signal.emit(
+                    f"[Server] INVITE_GROUP denied: {user_id} is not admin of {group_id}")
+                return
+
+            invited_socket = self.clients.connection(invited_user_id)
+            inviter_server_id = self.clients.get(user_id).server_id
+            if invited_socket:
+                notify = Message_pb2.NotifyGroupInvite()
+                notify.handle = invite.handle
+                notify.group.groupId = group_id
+                notify.group.serverId = inviter_server_id
+                packet = Packing('NOTIFY_GROUP_INVITE', notify.SerializeToString())
+                invited_socket.send(packet)
+                global_ms.log_signal.emit(
+                    f"[Server] INVITE_GROUP: {user_id} invited {invited_user_id} to group {group_id}")
+            else:
+                global_ms.log_signal.emit(
+                    f"[Server] INVITE_GROUP: Invited user {invited_user_id} offline (invite dropped)")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] INVITE_GROUP error: {e}")
+
+    def on_client_query_group_members(self, client_socket, user_id, payload):
+        """Reply the member list of a group"""
+        try:
+            query = Message_pb2.ListGroupMembers()
+            query.ParseFromString(payload)
+            group_id = query.group.groupId
+            resp = Message_pb2.GroupMembers()
+            resp.group.groupId = group_id
+            members = self.groups.members(group_id)
+            resp.group.serverId = self.clients.get(user_id).server_id
+            if members is None:
+                resp.result = Message_pb2.GroupMembers.NOT_FOUND
+            else:
+                resp.result = Message_pb2.GroupMembers.SUCCESS
+                for uid in members:
+                    u = resp.user.add()
+                    u.userId = uid
+                    entry = self.clients.get(uid)
+                    u.serverId = entry.server_id if entry else ""
+            client_socket.send(Packing('GROUP_MEMBERS', resp.SerializeToString()))
+            global_ms.log_signal.emit(f"[Server] Sent member list of {group_id} to {user_id}")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] QUERY_GROUP_MEMBERS error: {e}")
+
+    def on_client_join_group(self, client_socket, user_id, payload):
+        """Add a user to a group"""
+        try:
+            join = Message_pb2.JoinGroup()
+            join.ParseFromString(payload)
+            group_id = join.group.groupId
+            new_user_id = join.user.userId
+            if join.user.serverId and join.user.serverId != self.server_id:
+                # Member on another server, group messages reach it through its home server
+                self.routes.learn_user(new_user_id, join.user.serverId)
+            if self.groups.add_member(group_id, new_user_id) is None:
+                global_ms.log_signal.emit(f"[Server] JOIN_GROUP failed: Group {group_id} not found")
+                return
+            global_ms.log_signal.emit(f"[Server] {new_user_id} joined group {group_id}")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] JOIN_GROUP error: {e}")
+
+    def on_client_search_users(self, client_socket, user_id, payload):
+        """Search local users and all linked servers, the client gets one merged reply"""
+        # Handle client user search request
+        QueryUsers = Message_pb2.QueryUsers()
+        QueryUsers.ParseFromString(payload)
+        handle = QueryUsers.handle
+
+        linked_servers = self.server_connections()
+        forward_handle = None
+        if linked_servers:
+            # Every server answers with its first offset + limit matches, the client's page is cut from the merged users
+            limit = self.directory.page_size(QueryUsers.limit)
+            window = Message_pb2.QueryUsers(query=QueryUsers.query, limit=QueryUsers.offset + limit)
+            forward_handle = self.pending_searches.open(handle, client_socket, self.search_local_users(window),
+                                                        len(linked_servers), QueryUsers.offset, limit)
+        if forward_handle is None:
+            # Nobody to ask, or too many searches waiting: answer with the page of local users
+            self.send_safely(client_socket, 'SEARCH_USERS_RESP', self.search_local_users(QueryUsers).SerializeToString())
+            return
+
+        # Forward search request to other servers, under the table's handle
+        window.handle = forward_handle
+        framed = FramedPayload('SEARCH_USERS', window.SerializeToString())
+        for server_id, server_info, server_socket in linked_servers:
             try:
-                client_socket.close()
+                # Forward SEARCH_USERS to other servers
+                server_socket.send_framed(framed)
+                global_ms.log_signal.emit(f"[Server] Forwarding SEARCH_USERS to server {server_id}")
+            except Exception as e:
+                global_ms.log_signal.emit(f"[Server] Failed to forward SEARCH_USERS to server {server_id}: {e}")
+                # Do not wait for a server that never got the query
+                self.pending_searches.add_response(Message_pb2.QueryUsersResponse(handle=forward_handle))
+
+    def search_local_users(self, query_users):
+        """
+        Answer a user search from the directory of local users.
+
+        Args:
+            query_users (QueryUsers): The search with query, limit and offset.
+
+        Returns:
+            QueryUsersResponse: One page of matching users.
+        """
+        response = Message_pb2.QueryUsersResponse()
+        response.handle = query_users.handle
+        users, has_more = self.directory.search(query_users.query, query_users.limit, query_users.offset)
+        response.hasMore = has_more
+        for uid, server_id in users:
+            user = response.users.add()
+            user.userId = str(uid)
+            user.serverId = str(server_id)
+        return response
+
+    def deliver_search(self, search):
+        """Send the merged result of a search once all servers answered or its deadline passed"""
+        self.send_safely(search.connection, 'SEARCH_USERS_RESP', search.response().SerializeToString())
+
+    def on_client_search_users_resp(self, client_socket, user_id, payload):
+        """Merge search results into the search waiting for them"""
+        # Handle search result response from other servers
+        QueryUsersResponse = Message_pb2.QueryUsersResponse()
+        QueryUsersResponse.ParseFromString(payload)
+
+        if not self.pending_searches.add_response(QueryUsersResponse):
+            global_ms.log_signal.emit(f"[Server] Dropping late or unknown search results from {user_id}")
+
+    def on_client_set_reminder(self, client_socket, user_id, payload):
+        """Schedule a reminder for the requesting user"""
+        try:
+            set_reminder = Message_pb2.SetReminder()
+            set_reminder.ParseFromString(payload)
+
+            reminder_user_id = set_reminder.user.userId
+            reminder_server_id = set_reminder.user.serverId
+            event = set_reminder.event
+            countdown_seconds = set_reminder.countdownSeconds
+
+            # Verify user can only set reminders for themselves
+            if reminder_user_id != user_id:
+                global_ms.log_signal.emit(f"[Server] User {user_id} attempted to set reminder for another user {reminder_user_id}, rejected.")
+                return
+
+            # Construct complete user identifier including server information for cross-server reminders
+            if reminder_server_id and reminder_server_id != self.server_id:
+                # Cross-server reminder: user on other server, use format userId@serverId
+                full_user_id = f"{reminder_user_id}@{reminder_server_id}"
+                global_ms.log_signal.emit(f"[Server] Received cross-server reminder request: User {user_id} on server {reminder_server_id} setting reminder: {event} (countdown {countdown_seconds} seconds)")
+            else:
+                # Local server user, use userId directly
+                full_user_id = reminder_user_id
+                global_ms.log_signal.emit(f"[Server] User {user_id} setting reminder for self: {event} (countdown {countdown_seconds} seconds)")
+
+            # Add reminder to manager
+            self.reminder_manager.add_reminder(full_user_id, event, countdown_seconds)
+
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] SET_REMINDER error: {e}")
+
+    def on_client_translate(self, client_socket, user_id, payload):
+        """Queue a text for translation, TRANSLATED is sent once the worker pool finished it"""
+        translate_msg = Message_pb2.Translate()
+        try:
+            translate_msg.ParseFromString(payload)
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Failed to process TRANSLATE message: {e}")
+            return
+        if translate_msg.original_text:
+            future = self.translations.submit(translate_msg.original_text, language_name(translate_msg.target_language))
+            future.add_done_callback(lambda done: self.reply_translated(client_socket, translate_msg, done))
+
+    def reply_translated(self, client_socket, translate_msg, future):
+        """Answer a TRANSLATE request with TRANSLATED, called when its translation finished"""
+        translated_msg = Message_pb2.Translated()
+        translated_msg.target_language = translate_msg.target_language
+        translated_msg.original_text = translate_msg.original_text
+        try:
+            translated_msg.translated_text = future.result()
+            global_ms.log_signal.emit(
+                f"[Server] Processing TRANSLATE request: '{translate_msg.original_text}' -> "
+                f"'{translated_msg.translated_text}' ({language_name(translate_msg.target_language)})")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Translation processing failed: {e}")
+            # Send original text when translation fails
+            translated_msg.translated_text = translate_msg.original_text
+        if not self.send_safely(client_socket, 'TRANSLATED', translated_msg.SerializeToString()):
+            global_ms.log_signal.emit("[Server] Client left before its TRANSLATED reply was ready")
+
+    def on_client_unhandled(self, purpose, client_socket, user_id, payload):
+        """Log frames of purposes without a client handler"""
+        global_ms.log_signal.emit(f"[Server] Received unhandled message from client {user_id}: {purpose}")
+
+    def send_hangup(self, sock, error):
+        """Tell the peer why its connection is being closed after a framing error"""
+        hangup = Message_pb2.HangUp()
+        if isinstance(error, FrameTooLargeError):
+            hangup.reason = Message_pb2.HangUp.PAYLOAD_LIMIT_EXCEEDED
+        else:
+            hangup.reason = Message_pb2.HangUp.MESSAGE_MALFORMED
+        try:
+            sock.send(Packing('HANGUP', hangup.SerializeToString()))
+        except Exception:
+            pass
+
+    def watch_server(self, server_id, server_socket):
+        """Start the heartbeat deadlines of a server link"""
+        self.heartbeats.add(server_socket,
+                            lambda connection: self.ping_server(server_id, connection),
+                            lambda connection: self.expire_server(server_id, connection))
+
+    def ping_server(self, server_id, server_socket):
+        """Send a PING to a server link that has been idle for heartbeat_interval"""
+        try:
+            server_socket.send_frame('PING', b'')
+            print(f"[Server] Sending PING to server {server_id}")
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Failed to send heartbeat to server {server_id}: {e}")
+            try:
+                server_socket.close()
             except:
                 pass
+            self.unregister_server(server_id, server_socket)
 
-    def heartbeat_monitor(self):
-        while True:
-            time.sleep(self.heartbeat_interval)
-            now = time.time()
-            to_remove = []
-            with self.client_info_lock:
-                for user_id, info in list(self.client_info.items()):
-                    s = info['socket']
-                    last_active = info['last_active']
-                    if now - last_active > self.heartbeat_timeout:
-                        global_ms.log_signal.emit(f"[Server] User {user_id} heartbeat timeout, disconnecting.")
-                        try:
-                            s.close()
-                        except:
-                            pass
-                        to_remove.append(user_id)
-                        continue
-                    try:
-                        ping_msg = Packing('PING', b'')
-                        s.send(ping_msg)
-                        print(f"[Server] Sent PING to {user_id}")
-                    except Exception as e:
-                        print(f"[Server] Heartbeat send error for {user_id}: {e}")
-                        try:
-                            s.close()
-                        except:
-                            pass
-                        to_remove.append(user_id)
-            with self.client_info_lock:
-                for user_id in to_remove:
-                    if user_id in self.client_info:
-                        del self.client_info[user_id]
-
-    def server_heartbeat_monitor(self):
-        """Heartbeat monitoring thread between servers"""
-        while True:
-            time.sleep(self.heartbeat_interval)
-            now = time.time()
-            to_remove = []
-            with self.server_list_lock:
-                for server_id, info in list(self.server_list.items()):
-                    s = info.get('socket')
-                    last_active = info.get('last_active', 0)
-                    if not s:
-                        continue
-                    if now - last_active > self.heartbeat_timeout:
-                        global_ms.log_signal.emit(f"[Server] Server {server_id} heartbeat timeout, disconnecting.")
-                        try:
-                            s.close()
-                        except:
-                            pass
-                        to_remove.append(server_id)
-                        continue
-                    try:
-                        ping_msg = Packing('PING', b'')
-                        s.send(ping_msg)
-                        print(f"[Server] Sending PING to server {server_id}")
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] Failed to send heartbeat to server {server_id}: {e}")
-                        try:
-                            s.close()
-                        except:
-                            pass
-                        to_remove.append(server_id)
-            with self.server_list_lock:
-                for server_id in to_remove:
-                    if server_id in self.server_list:
-                        del self.server_list[server_id]
-            global_ms.refresh_list_signal.emit()
+    def expire_server(self, server_id, server_socket):
+        """Drop a server link that has been idle for heartbeat_timeout"""
+        global_ms.log_signal.emit(f"[Server] Server {server_id} heartbeat timeout, disconnecting.")
+        try:
+            server_socket.abort()  # The peer is gone, do not wait for queued frames
+        except:
+            pass
+        self.unregister_server(server_id, server_socket)
 
-    def handle_server_messages(self, server_socket, server_id):
+    def handle_server_messages(self, server_socket, server_id, frames=None):
         """Handle message interaction between servers"""
+        if frames is None:
+            frames = iter_frames(server_socket.sock, self.new_frame_decoder())
         try:
-            while True:
-                data = server_socket.recv(1024)
-                if not data:
-                    global_ms.log_signal.emit(f"[Server] Server {server_id} disconnected")
-                    break
-
-                # Update server's last active time
-                with self.server_list_lock:
-                    if server_id in self.server_list:
-                        self.server_list[server_id]['last_active'] = time.time()
-
-                purpose, length, payload = Unpacking(data)
-                # print(f"[Server] Received message from server {server_id}: {purpose}")  # Commented out, to avoid console printing of ping/pong messages
-
-                if purpose == 'PING':
-                    pong_msg = Packing('PONG', b'')
-                    server_socket.send(pong_msg)
-                    print(f"[Server] Received PING from server {server_id}, replied PONG")
-                elif purpose == 'PONG':
-                    print(f"[Server] Received PONG from server {server_id} (heartbeat normal)")
-
-                elif purpose == 'SEARCH_USERS':
-                    # Handle user search request from other servers
-                    QueryUsers = Message_pb2.QueryUsers()
-                    QueryUsers.ParseFromString(payload)
-                    query = QueryUsers.query
-                    handle = QueryUsers.handle
-
-                    # Collect local user information
-                    QueryUsersResponse = Message_pb2.QueryUsersResponse()
-                    QueryUsersResponse.handle = handle
-
-                    with self.client_info_lock:
-                        for user_id, info in self.client_info.items():
-                            user = Message_pb2.User()
-                            user.userId = str(user_id)
-                            user.serverId = str(info['server_id'])
-                            QueryUsersResponse.users.append(user)
-
-                    # Reply search results to requesting server
-                    response_msg = Packing('SEARCH_USERS_RESP', QueryUsersResponse.SerializeToString())
-                    server_socket.send(response_msg)
-                    global_ms.log_signal.emit(f"[Server] Replying SEARCH_USERS_RESP to server {server_id}, user count: {len(QueryUsersResponse.users)}")
-
-                elif purpose == 'SEARCH_USERS_RESP':
-                    # Handle search result response from other servers
-                    QueryUsersResponse = Message_pb2.QueryUsersResponse()
-                    QueryUsersResponse.ParseFromString(payload)
-                    handle = QueryUsersResponse.handle
-
-                    # Find client waiting for this response
-                    target_client = None
-                    with self.client_info_lock:
-                        for user_id, info in self.client_info.items():
-                            pending_search = info.get('pending_search')
-                            if pending_search and pending_search['handle'] == handle:
-                                target_client = info['socket']
-                                break
-
-                    if target_client:
-                        # Forward search results to client
-                        response_msg = Packing('SEARCH_USERS_RESP', payload)
-                        target_client.send(response_msg)
-                        global_ms.log_signal.emit(f"[Server] Forwarding search results from server {server_id} to client")
-
-                elif purpose == 'MESSAGE':
-                    # Handle message forwarding from other servers
-                    msg = Message_pb2.ChatMessage()
-                    msg.ParseFromString(payload)
-                    which = msg.WhichOneof('recipient')
-
-                    if which == 'user':
-                        target_user = msg.user.userId
-                        with self.client_info_lock:
-                            if target_user in self.client_info:
-                                # Forward message to local user
-                                forward_msg = Packing('MESSAGE', payload)
-                                self.client_info[target_user]['socket'].send(forward_msg)
-                                global_ms.log_signal.emit(f"[Server] Forwarding message from server {server_id} to user {target_user}")
-                            else:
-                                global_ms.log_signal.emit(f"[Server] Target user {target_user} not on this server")
-
-                elif purpose == 'MESSAGE_ACK':
-                    # Handle message acknowledgment from other servers
-                    ack = Message_pb2.ChatMessageResponse()
-                    ack.ParseFromString(payload)
-                    msg_snowflake = ack.messageSnowflake
-
-                    # Find local user waiting for this ACK
-                    with self.pending_acks_lock:
-                        if msg_snowflake in self.pending_acks:
-                            source_info = self.pending_acks[msg_snowflake]
-                            source_user_id = source_info['source_user']
-
-                            with self.client_info_lock:
-                                if source_user_id in self.client_info:
-                                    # Forward ACK to original sender
-                                    ack_msg = Packing('MESSAGE_ACK', payload)
-                                    self.client_info[source_user_id]['socket'].send(ack_msg)
-                                    global_ms.log_signal.emit(f"[Server] Forwarding message ACK to user {source_user_id}")
-
-                            del self.pending_acks[msg_snowflake]
-
-                elif purpose == 'REMINDER':
-                    # Handle REMINDER message from reminder server
-                    try:
-                        reminder = Message_pb2.Reminder()
-                        reminder.ParseFromString(payload)
-
-                        target_user_id = reminder.user.userId
-                        event = reminder.reminderContent
-
-                        # Check if target user is on this server (as homeserver)
-                        with self.client_info_lock:
-                            if target_user_id in self.client_info:
-                                # User on this server, forward reminder to user
-                                client_socket = self.client_info[target_user_id]['socket']
-                                forward_msg = Packing('REMINDER', payload)
-                                client_socket.send(forward_msg)
-                                global_ms.log_signal.emit(f"[Server] Forwarding reminder from reminder server {server_id} to user {target_user_id}: {event}")
-                            else:
-                                global_ms.log_signal.emit(f"[Server] Target user {target_user_id} not on this server, cannot forward reminder")
-
-                    except Exception as e:
-                        global_ms.log_signal.emit(f"[Server] Failed to process REMINDER message from server {server_id}: {e}")
+            for purpose, length, payload in frames:
+                self.touch_server(server_socket)
+                self.handle_server_frame(server_socket, server_id, purpose, payload)
 
-                else:
-                    # Handle other server-server protocol messages
-                    global_ms.log_signal.emit(f"[Server] Received unhandled message from server {server_id}: {purpose}")
+            global_ms.log_signal.emit(f"[Server] Server {server_id} disconnected")
 
+        except FrameError as e:
+            global_ms.log_signal.emit(f"[Server] Closing link to server {server_id}: {e}")
+            self.send_hangup(server_socket, e)
         except Exception as e:
             global_ms.log_signal.emit(f"[Server] Error handling messages from server {server_id}: {e}")
         finally:
             # Clean up server connection information
-            with self.server_list_lock:
-                if server_id in self.server_list:
-                    del self.server_list[server_id]
-            global_ms.refresh_list_signal.emit()
+            self.unregister_server(server_id, server_socket)
             try:
                 server_socket.close()
             except:
-                pass 
\ No newline at end of file
+                pass
+
+    def touch_server(self, server_socket):
+        """Record activity of a server link, postpones its PING and timeout"""
+        self.heartbeats.touch(server_socket)
+
+    def handle_server_frame(self, server_socket, server_id, purpose, payload):
+        """
+        Handle one frame received on a link to another server.
+
+        Args:
+            server_socket (Connection): The link to the other server.
+            server_id (str): The other server's serverId.
+            purpose (str): The message purpose/type.
+            payload (bytes | memoryview): The message payload data.
+        """
+        # print(f"[Server] Received message from server {server_id}: {purpose}")  # Commented out, to avoid console printing of ping/pong messages
+        self.server_dispatcher.dispatch(purpose, server_socket, server_id, payload)
+
+    def on_server_ping(self, server_socket, server_id, payload):
+        """Answer a heartbeat PING of a linked server"""
+        server_socket.send_frame('PONG', b'')
+
+    def on_server_pong(self, server_socket, server_id, payload):
+        """Heartbeat answer of a linked server, activity is already recorded by the receive loop"""
+
+    def on_server_search_users(self, server_socket, server_id, payload):
+        """Reply the local users to a search forwarded by another server"""
+        # Handle user search request from other servers
+        QueryUsers = Message_pb2.QueryUsers()
+        QueryUsers.ParseFromString(payload)
+
+        # Collect local user information
+        QueryUsersResponse = self.search_local_users(QueryUsers)
+
+        # Reply search results to requesting server
+        response_msg = Packing('SEARCH_USERS_RESP', QueryUsersResponse.SerializeToString())
+        server_socket.send(response_msg)
+        global_ms.log_signal.emit(f"[Server] Replying SEARCH_USERS_RESP to server {server_id}, user count: {len(QueryUsersResponse.users)}")
+
+    def on_server_search_users_resp(self, server_socket, server_id, payload):
+        """Merge search results of another server into the search waiting for them"""
+        # Handle search result response from other servers
+        QueryUsersResponse = Message_pb2.QueryUsersResponse()
+        QueryUsersResponse.ParseFromString(payload)
+
+        # The listed users are reachable through this link
+        for user in QueryUsersResponse.users:
+            self.routes.learn_user(user.userId, server_id)
+
+        # Merge into the search waiting for this response, it is sent once complete
+        if self.pending_searches.add_response(QueryUsersResponse):
+            global_ms.log_signal.emit(f"[Server] Received search results from server {server_id}")
+        else:
+            global_ms.log_signal.emit(f"[Server] Dropping late or unknown search results from server {server_id}")
+
+    def on_server_message(self, server_socket, server_id, payload):
+        """Deliver a message forwarded by another server to a local user"""
+        # Handle message forwarding from other servers
+        msg = Message_pb2.ChatMessage()
+        msg.ParseFromString(payload)
+        which = msg.WhichOneof('recipient')
+        # Replies to the author go back over this link
+        if msg.author.userId:
+            self.routes.learn_user(msg.author.userId, server_id)
+
+        if which == 'user':
+            target_user = msg.user.userId
+            # The recipient's ACK goes back over this link
+            self.acks.track(msg.messageSnowflake, msg.author.userId, (target_user,), reply_server=server_id)
+            target_socket = self.client_connection(target_user)
+            if target_socket and self.send_safely(target_socket, 'MESSAGE', payload):
+                # Forward message to local user
+                global_ms.log_signal.emit(f"[Server] Forwarding message from server {server_id} to user {target_user}")
+            else:
+                global_ms.log_signal.emit(f"[Server] Target user {target_user} not on this server")
+                self.acks.report_status(msg.messageSnowflake, msg.user, Message_pb2.ChatMessageResponse.USER_NOT_FOUND)
+
+        elif which == 'userOfGroup':
+            # One member of a group hosted on the sending server
+            target = msg.userOfGroup.user
+            self.acks.track(msg.messageSnowflake, msg.author.userId, (target.userId,), reply_server=server_id)
+            target_socket = self.client_connection(target.userId)
+            # Clients expect group messages addressed to the group
+            if target_socket and self.send_safely(target_socket, 'MESSAGE', readdress(payload, group=msg.userOfGroup.group)):
+                global_ms.log_signal.emit(
+                    f"[Server] Forwarding group message of {msg.userOfGroup.group.groupId} from server {server_id} to user {target.userId}")
+            else:
+                self.acks.report_status(msg.messageSnowflake, target, Message_pb2.ChatMessageResponse.USER_NOT_FOUND)
+
+    def on_server_message_ack(self, server_socket, server_id, payload):
+        """Merge a delivery acknowledgment from another server into the status of the message"""
+        # Handle message acknowledgment from other servers
+        ack = Message_pb2.ChatMessageResponse()
+        ack.ParseFromString(payload)
+
+        # Merge into the message waiting for this ACK, the author is answered once complete
+        if not self.acks.report(ack.messageSnowflake, ack.statuses):
+            global_ms.log_signal.emit(f"[Server] Dropping late or unknown MESSAGE_ACK {ack.messageSnowflake} from server {server_id}")
+
+    def on_server_reminder(self, server_socket, server_id, payload):
+        """Deliver a reminder sent by a reminder server to a local user"""
+        # Handle REMINDER message from reminder server
+        try:
+            reminder = Message_pb2.Reminder()
+            reminder.ParseFromString(payload)
+
+            target_user_id = reminder.user.userId
+            event = reminder.reminderContent
+
+            # Check if target user is on this server (as homeserver)
+            client_socket = self.client_connection(target_user_id)
+            if client_socket:
+                # User on this server, forward reminder to user
+                client_socket.send_frame('REMINDER', payload)
+                global_ms.log_signal.emit(f"[Server] Forwarding reminder from reminder server {server_id} to user {target_user_id}: {event}")
+            else:
+                global_ms.log_signal.emit(f"[Server] Target user {target_user_id} not on this server, cannot forward reminder")
+
+        except Exception as e:
+            global_ms.log_signal.emit(f"[Server] Failed to process REMINDER message from server {server_id}: {e}")
+
+    def on_server_unhandled(self, purpose, server_socket, server_id, payload):
+        """Log frames of purposes without a server handler"""
+        # Handle other server-server protocol messages
+        global_ms.log_signal.emit(f"[Server] Received unhandled message from server {server_id}: {purpose}")
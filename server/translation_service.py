@@ -0,0 +1,289 @@
+"""
+Translation worker pool
+
+Translating a text means language detection plus an HTTP round-trip to the
+translation backend, which takes hundreds of milliseconds. The MESSAGE and
+TRANSLATE handlers used to do that inline, stalling the receive loop of the
+connection, so PINGs and plain messages of the same client waited behind it.
+
+TranslationService runs translations on a fixed number of worker threads
+instead. submit() only queues the request and returns a Future, the handler
+returns right away and finishes the message in a done-callback once the text
+is translated. The queue is bounded: when it is full the request is rejected
+at once with TranslationQueueFull set on its future, and the caller falls
+back to the original text, so a slow backend can never pile up unbounded
+work.
+
+Texts found in the translation cache never enter the queue: submit() returns
+a future that is already done, and only misses are translated by the workers,
+which store their results in the cache.
+
+Requests are further combined on their way to the backend:
+
+- Single-flight: while a (text, language) is queued or being translated,
+  further submits of it get the same future instead of a request of their own
+- Micro-batching: when the backend supports batching, a worker that picked up
+  a request keeps collecting queued requests for up to batch_delay seconds or
+  max_batch requests, and translates the texts of each language with one
+  backend call
+
+Done-callbacks run on the worker thread that translated the text, or in the
+submitting thread if the future already finished.
+
+Main classes:
+- TranslationQueueFull: Future exception of requests rejected by a full queue
+- TranslationService: Bounded queue of translation requests and its worker threads
+"""
+
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
+from proto import Message_pb2
+from modules import Translator
+from modules.Translator import language_map, translation_cache
+from modules.language_detection import language_detector
+
+TRANSLATION_WORKERS = 4  # Translations running at the same time
+MAX_QUEUED_TRANSLATIONS = 1000  # Requests waiting at most, further requests are rejected
+BATCH_DELAY = 0.005  # Seconds a worker waits for more requests to batch with the first one
+MAX_BATCH = 32  # Requests translated together at most
+
+# Protobuf Language enum -> language name understood by translator()
+LANGUAGE_NAMES = {
+    Message_pb2.DE: 'Deutsch',
+    Message_pb2.EN: 'English',
+    Message_pb2.ZH: 'Chinese',
+    Message_pb2.TR: 'Türkçe',
+}
+
+
+def language_name(language):
+    """Return the translator() language name of a protobuf Language value, English if it is unknown."""
+    return LANGUAGE_NAMES.get(language, 'English')
+
+
+def gather(futures):
+    """
+    Combine futures into one that is done once all of them are done.
+
+    Args:
+        futures (list): The futures to wait for.
+
+    Returns:
+        Future: Resolves to the list of futures, whatever their outcome.
+    """
+    combined = Future()
+    remaining = [len(futures)]
+    lock = Lock()
+
+    def done(future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            combined.set_result(futures)
+
+    if not futures:
+        combined.set_result(futures)
+    for future in futures:
+        future.add_done_callback(done)
+    return combined
+
+
+class TranslationQueueFull(Exception):
+    """The translation queue is full, the request was not accepted."""
+
+
+class TranslationService:
+    """
+    Bounded queue of translation requests and its worker threads.
+
+    Attributes:
+        backend (TranslationBackend | None): The backend translating on the worker threads,
+            None for the backend selected in modules/Translator.py.
+        cache (TranslationCache | None): Looked up before queueing, filled by the workers.
+        workers (int): Number of worker threads.
+        max_queue (int): Requests waiting at most.
+        batch_delay (float): Seconds a worker collects requests for a batch, 0 disables batching.
+        max_batch (int): Requests translated together at most.
+        completed (int): Requests translated so far.
+        failed (int): Requests whose translation raised.
+        rejected (int): Requests rejected because the queue was full.
+        coalesced (int): Submits that joined a request already in flight.
+        batches (int): Backend calls made for the requests.
+    """
+
+    def __init__(self, backend=None, cache=translation_cache, workers=TRANSLATION_WORKERS,
+                 max_queue=MAX_QUEUED_TRANSLATIONS, batch_delay=BATCH_DELAY, max_batch=MAX_BATCH):
+        self.backend = backend
+        self.cache = cache
+        self.workers = workers
+        self.max_queue = max_queue
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.batches = 0
+        self._queue = Queue(max_queue)
+        self._inflight = {}  # (text, language code) -> Future of the queued or running request
+        self._lock = Lock()
+        self._threads = []
+        self.running = False
+
+    def start(self):
+        """Start the worker threads, and load the language detection profiles in the background"""
+        if self.running:
+            return
+        # A detection that comes before the profiles are loaded waits for them
+        Thread(target=self._preload, name='TranslationPreload', daemon=True).start()
+        self.running = True
+        self._threads = [Thread(target=self._worker_loop, name=f'Translation-{n}', daemon=True)
+                         for n in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop the workers once they finished the requests queued so far"""
+        if not self.running:
+            return
+        self.running = False
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, text, language):
+        """
+        Queue a translation, or join the request for the same text and language that is in flight.
+
+        Args:
+            text (str): The text to translate.
+            language (str): Target language name as understood by translator(), e.g. 'English'.
+
+        Returns:
+            Future: Resolves to the translated text, or fails with the backend's exception or
+                TranslationQueueFull.
+        """
+        code = language_map.get(language)
+        if code is None:
+            # 'Original' or a language without code, nothing to translate
+            return self._done(text)
+        if self.cache is not None:
+            translation = self.cache.get(text, code)
+            if translation is not None:
+                return self._done(translation)
+        key = (text, code)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = Future()
+            try:
+                self._queue.put_nowait(key)
+            except Full:
+                self.rejected += 1
+                future.set_exception(TranslationQueueFull(f"{self.max_queue} translations are already queued"))
+                return future
+            self._inflight[key] = future
+        return future
+
+    def stats(self):
+        """
+        Return the counters of the pool and of its cache.
+
+        Returns:
+            dict: queued, in_flight, completed, failed, rejected, coalesced, batches
+                and the cache's stats() under 'cache'.
+        """
+        return {
+            'queued': self.pending(),
+            'in_flight': len(self._inflight),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'coalesced': self.coalesced,
+            'batches': self.batches,
+            'cache': self.cache.stats() if self.cache is not None else None,
+        }
+
+    def pending(self):
+        """Return the number of queued requests that no worker picked up yet"""
+        return self._queue.qsize()
+
+    @staticmethod
+    def _preload():
+        try:
+            language_detector.preload()
+        except Exception as e:
+            print(f"[Translation] Cannot preload language profiles: {e}")
+
+    @staticmethod
+    def _done(result):
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _collect(self, first):
+        """Return the first key plus the keys queued within batch_delay, at most max_batch, and whether to stop."""
+        keys = [first]
+        deadline = time.monotonic() + self.batch_delay
+        while len(keys) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                key = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except Empty:
+                break
+            if key is None:
+                return keys, True
+            keys.append(key)
+        return keys, False
+
+    def _translate(self, backend, code, texts):
+        """Translate the texts of one language with one backend call, a failed text gets its exception."""
+        self.batches += 1
+        if len(texts) == 1:
+            if self.cache is not None:
+                return [self.cache.fill(texts[0], code, backend.translate)]
+            return [backend.translate(texts[0], code)]
+        if self.cache is not None:
+            return self.cache.fill_batch(texts, code, backend.translate_batch)
+        return backend.translate_batch(texts, code)
+
+    def _worker_loop(self):
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            backend = self.backend if self.backend is not None else Translator.translation_backend
+            stop = False
+            if backend.supports_batch and self.batch_delay > 0 and self.max_batch > 1:
+                keys, stop = self._collect(key)
+            else:
+                keys = [key]
+            by_language = {}
+            for text, code in keys:
+                by_language.setdefault(code, []).append(text)
+            for code, texts in by_language.items():
+                try:
+                    results = self._translate(backend, code, texts)
+                except Exception as e:
+                    # Failed as a whole, texts the backend could not translate come back as their exception
+                    results = [e] * len(texts)
+                with self._lock:
+                    futures = [self._inflight.pop((text, code)) for text in texts]
+                for future, result in zip(futures, results):
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    if isinstance(result, Exception):
+                        self.failed += 1
+                        future.set_exception(result)
+                    else:
+                        self.completed += 1
+                        future.set_result(result)
+            if stop:
+                return
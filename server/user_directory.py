@@ -0,0 +1,131 @@
+"""
+User directory index
+
+Answers SEARCH_USERS queries from an index of the connected users instead of
+walking all connected clients for every request. The index is a list of
+case-folded userIds kept sorted on connect and disconnect, so a prefix
+search is a binary search plus a slice, and results come out in a stable
+order that paging can rely on.
+
+A query is matched in this order, without duplicates:
+
+1. the user whose userId equals the query
+2. users of the server whose serverId equals the query
+3. users whose userId starts with the query
+4. users whose userId contains the query
+
+Matching ignores case. An empty query matches every user.
+
+Main classes:
+- UserDirectory: Sorted userId index with prefix and substring search
+"""
+
+from bisect import bisect_left
+from itertools import chain, islice
+from threading import Lock
+
+DEFAULT_SEARCH_LIMIT = 100  # Users per response when the query asks for no limit
+MAX_SEARCH_LIMIT = 1000  # Upper bound for the limit a query may ask for
+
+
+class UserDirectory:
+    """
+    Sorted index of the users connected to this server.
+
+    Attributes:
+        default_limit (int): Users per response when the query gives no limit.
+        max_limit (int): Largest limit a query may ask for.
+    """
+
+    def __init__(self, default_limit=DEFAULT_SEARCH_LIMIT, max_limit=MAX_SEARCH_LIMIT):
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self._keys = []  # Sorted (folded userId, userId)
+        self._users = {}  # userId -> serverId
+        self._servers = {}  # serverId -> set of userIds
+        self._lock = Lock()
+
+    def add(self, user_id, server_id):
+        """Index a user that connected, replacing an older entry of the same userId."""
+        with self._lock:
+            if user_id in self._users:
+                self._remove(user_id)
+            key = (user_id.casefold(), user_id)
+            self._keys.insert(bisect_left(self._keys, key), key)
+            self._users[user_id] = server_id
+            self._servers.setdefault(server_id, set()).add(user_id)
+
+    def remove(self, user_id):
+        """Drop a user that disconnected."""
+        with self._lock:
+            if user_id in self._users:
+                self._remove(user_id)
+
+    def _remove(self, user_id):
+        """Drop a user, caller holds self._lock"""
+        key = (user_id.casefold(), user_id)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+        server_id = self._users.pop(user_id)
+        members = self._servers.get(server_id)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self._servers[server_id]
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def page_size(self, limit):
+        """Return the number of users a page of the given limit holds, 0 for default_limit."""
+        return min(limit or self.default_limit, self.max_limit)
+
+    def search(self, query, limit=0, offset=0):
+        """
+        Find the users matching a query.
+
+        Args:
+            query (str): userId, userId prefix or substring, or serverId.
+            limit (int): Maximum number of users to return, 0 for default_limit.
+            offset (int): Number of matching users to skip.
+
+        Returns:
+            tuple: (list of (userId, serverId), has_more)
+        """
+        limit = self.page_size(limit)
+        with self._lock:
+            page = list(islice(self._matches(query), offset, offset + limit + 1))
+            users = self._users
+            return [(user_id, users[user_id]) for user_id in page[:limit]], len(page) > limit
+
+    def _matches(self, query):
+        """Yield matching userIds in rank order, caller holds self._lock"""
+        keys = self._keys
+        users = self._users
+        seen = set()
+        if query in users:
+            seen.add(query)
+            yield query
+        if query in self._servers:
+            for _, user_id in keys:
+                if users[user_id] == query and user_id not in seen:
+                    seen.add(user_id)
+                    yield user_id
+
+        folded = query.casefold()
+        start = bisect_left(keys, (folded,))
+        end = start
+        while end < len(keys) and keys[end][0].startswith(folded):
+            user_id = keys[end][1]
+            if user_id not in seen:
+                yield user_id
+            end += 1
+
+        # Prefix matches form the range [start, end) and were reported above
+        for key, user_id in chain(islice(keys, start), islice(keys, end, None)):
+            if folded in key and user_id not in seen:
+                yield user_id